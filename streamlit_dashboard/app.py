@@ -1,13 +1,28 @@
 import streamlit as st
-import time
 
 from components.agent_table import show_agents
+from components.debug_panel import show_debug_panel
+from components.occupancy import show_occupancy
 from components.patient_list import show_patients
-from utils.data_handler import load_json, simulate_updates
+from models.schemas import Agent, Patient
+from models.validation import FILE_ERROR, validate_file
+from utils.aggregates import GroupCounts
+from utils.change_tracker import ChangeSet, ChangeTracker
+from utils.file_watcher import DataSource
+from utils.ingestion import IngestionWorker
+from utils.instrumentation import METRICS
+from utils.query_engine import RecordTable
+from utils.repository import DEFAULT_PATHS, get_repository
+from utils.simulation import AGENT_STATUSES, AGENT_TRANSITIONS, PATIENT_STATUSES, PATIENT_TRANSITIONS, StatusSimulator
+from utils.snapshot_broker import get_broker_source
+from utils.snapshot_store import SNAPSHOTS
 
 # Configure the Streamlit app page
 st.set_page_config(layout="wide", page_title="Hospital Dashboard")
 
+# Collect the stage timings of this rerun (only while profiling is switched on)
+METRICS.start_run()
+
 # Display the main header and description of the dashboard
 st.title("🏥 Winniio Hospital Dashboard")
 st.markdown("Real-time patient and agent monitoring interface")
@@ -18,39 +33,195 @@ st.sidebar.header("Filters")
 # Refresh interval in seconds for the dashboard updates
 REFRESH_INTERVAL = 2  # seconds
 
-# Placeholder container to dynamically update the dashboard content (rerun every 2 seconds)
-placeholder = st.empty()
-
-# Main application loop to refresh the dashboard continuously
-while True:
-    with placeholder.container():
-        # Load agent and patient data from JSON files and simulate status updates
-        agents = simulate_updates(load_json("shared_data/agents.json"), "status", ["On Duty", "Off Duty"])
-        patients = simulate_updates(load_json("shared_data/patient.json"), "status", ["Active", "Idle", "Completed"])
-
-        # Extract unique room names from agents for filtering dropdown
-        rooms = sorted(set(agent["current_room"] for agent in agents))
-        # Extract unique patient statuses for filtering dropdown
-        statuses = sorted(set(patient["status"] for patient in patients))
-
-        # Sidebar dropdown filters for room selection (agents) and patient status
-        selected_room = st.sidebar.selectbox("Select Room for Agents", rooms, key="room")
-        selected_status = st.sidebar.selectbox("Select Patient Status", statuses, key="status")
-
-        # Two-column layout to display filtered agent and patient information side by side
-        col1, col2 = st.columns(2)
-        with col1:
-            show_agents(agents, selected_room)
-        with col2:
-            show_patients(patients, selected_status)
-
-    # Pause execution for the refresh interval before rerunning the app
-    time.sleep(REFRESH_INTERVAL)
-    # Trigger a rerun of the Streamlit app to refresh displayed data
-    st.rerun()
-
-
-
-
-
-
+# Grouping fields of the materialized agent and patient counts
+AGENT_GROUPS = ("current_room", "role", "status")
+PATIENT_GROUPS = ("location", "status")
+
+
+@st.cache_resource
+def get_data_source():
+    """Shared, change-aware view of the data files for every session in this process."""
+    paths = {"agents": "shared_data/agents.json", "patients": "shared_data/patient.json"}
+    # Multi-process mode (DASHBOARD_BROKER set): subscribe to the ingestion process instead
+    return get_broker_source(paths) or DataSource(paths)
+
+
+source = get_data_source()
+
+# JSON files by default; DASHBOARD_BACKEND=sqlite serves the tables straight from the database
+repo = get_repository()
+
+
+@st.cache_resource
+def get_ingestion_worker():
+    """Background poller shared by every session; it does all file and database I/O."""
+    def poll_files():
+        source.poll()
+        return source.version
+
+    sources = {"database": repo.version} if repo.pushdown else {"files": poll_files}
+    return IngestionWorker(sources, interval=REFRESH_INTERVAL).start()
+
+
+worker = get_ingestion_worker()
+
+# Simulated status changes make every refresh differ; without them the tables only change with the data
+simulate = not repo.pushdown and st.sidebar.checkbox("Simulate status updates", value=True, key="simulate")
+
+
+def refresh_views():
+    """
+    Bring this session's views up to date with the data published by the worker.
+
+    Returns:
+        dict: agent/patient views, their change sets since the previous refresh, the
+        room/role/status aggregates and the dropdown options (rooms, statuses).
+    """
+    if repo.pushdown:
+        # SQL backend: aggregates are GROUP BY queries over the indexes, filters and paging run in the database
+        agent_counts = GroupCounts.from_groups(AGENT_GROUPS, repo.group_counts("agents", AGENT_GROUPS))
+        patient_counts = GroupCounts.from_groups(PATIENT_GROUPS, repo.group_counts("patients", PATIENT_GROUPS))
+        return {
+            "agents": repo, "patients": repo, "agent_changes": None, "patient_changes": None,
+            "agent_counts": agent_counts, "patient_counts": patient_counts,
+            "rooms": agent_counts.distinct("current_room"), "statuses": patient_counts.distinct("status"),
+        }
+
+    # The worker already re-parsed any changed file; this only picks up the shared snapshots
+    version, data = source.snapshot()
+    agents = data["agents"]
+    patients = data["patients"]
+
+    # Indexed tables persist across reruns and only re-index records that changed.
+    # A full sync only happens when the files (or the simulation switch) changed.
+    if "agent_table" not in st.session_state:
+        st.session_state.agent_table = RecordTable("agent_id", indexed=("current_room", "status", "role"))
+        st.session_state.patient_table = RecordTable("patient_id", indexed=("status", "location"))
+        # Counts per room x role x status and location x status, adjusted by every upsert and delete
+        st.session_state.agent_counts = st.session_state.agent_table.attach(GroupCounts(AGENT_GROUPS))
+        st.session_state.patient_counts = st.session_state.patient_table.attach(GroupCounts(PATIENT_GROUPS))
+    agent_view = st.session_state.agent_table
+    patient_view = st.session_state.patient_table
+    token = (version, simulate)
+    agent_view.sync(agents, token=token)
+    patient_view.sync(patients, token=token)
+
+    if simulate:
+        # Per-session Markov simulation over the shared snapshots, restarted whenever they are
+        # re-synced. Each tick only upserts the records whose status changed.
+        simulators = st.session_state.get("simulators")
+        if simulators is None or simulators[0] != token:
+            simulators = st.session_state.simulators = (token, (
+                (agent_view, StatusSimulator(agents, "agent_id", "status", AGENT_STATUSES, AGENT_TRANSITIONS, group_field="role")),
+                (patient_view, StatusSimulator(patients, "patient_id", "status", PATIENT_STATUSES, PATIENT_TRANSITIONS)),
+            ))
+        for table, simulator in simulators[1]:
+            for record in simulator.changed_records(simulator.tick()):
+                table.upsert(record)
+
+    # Diff both tables by key against the previous refresh: components show what changed
+    # and reuse their rendered page when none of its rows did
+    if "agent_changes" not in st.session_state:
+        st.session_state.agent_changes = ChangeTracker("agent_id")
+        st.session_state.patient_changes = ChangeTracker("patient_id")
+    agent_counts, patient_counts = st.session_state.agent_counts, st.session_state.patient_counts
+    return {
+        "agents": agent_view, "patients": patient_view,
+        "agent_changes": st.session_state.agent_changes.diff_table(agent_view),
+        "patient_changes": st.session_state.patient_changes.diff_table(patient_view),
+        "agent_counts": agent_counts, "patient_counts": patient_counts,
+        # Unique room names and patient statuses for the filtering dropdowns, read from the aggregates
+        "rooms": agent_counts.distinct("current_room"), "statuses": patient_counts.distinct("status"),
+    }
+
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def live_dashboard(selected_room, selected_status, rooms, statuses):
+    """
+    The two live tables, re-run on their own every REFRESH_INTERVAL seconds.
+
+    Only this fragment re-executes on a refresh, and no script thread sleeps between
+    refreshes; the rest of the page (and its sidebar) is only re-run on user input,
+    or when the dropdown options it shows went out of date. While the worker has
+    published nothing new since the last refresh (and no simulation is running),
+    the views of that refresh are shown again without syncing or diffing anything.
+    A fragment run must still send its elements, since Streamlit removes the ones
+    a run leaves out; the tables reuse their cached pages for that.
+    """
+    version = (worker.version, simulate)
+    views = st.session_state.get("views")
+    if simulate or views is None or st.session_state.get("shown_version") != version:
+        views = st.session_state.views = refresh_views()
+        st.session_state.shown_version = version
+    elif views["agent_changes"] or views["patient_changes"]:
+        # Nothing changed since the refresh that reported these changes
+        views = st.session_state.views = dict(views, agent_changes=ChangeSet(), patient_changes=ChangeSet())
+    st.session_state.dropdowns = (views["rooms"], views["statuses"])
+    if views["rooms"] != rooms or views["statuses"] != statuses:
+        # New rooms or statuses: re-run the whole page so the sidebar dropdowns show them.
+        # The tables were not rendered, so their changes are reported again by the next refresh.
+        if not repo.pushdown:
+            st.session_state.agent_changes.defer()
+            st.session_state.patient_changes.defer()
+        del st.session_state.views
+        st.rerun()
+
+    # Two-column layout to display filtered agent and patient information side by side
+    col1, col2 = st.columns(2)
+    with col1:
+        show_agents(views["agents"], selected_room, changes=views["agent_changes"])
+    with col2:
+        show_patients(views["patients"], selected_status, changes=views["patient_changes"])
+
+    # Emergency overview: patients and available staff per room, from the aggregates
+    show_occupancy(views["agent_counts"], views["patient_counts"])
+
+
+# Dropdown options of the last refresh (a first refresh when the session starts)
+if "dropdowns" not in st.session_state:
+    first = refresh_views()
+    st.session_state.dropdowns = (first["rooms"], first["statuses"])
+rooms, statuses = st.session_state.dropdowns
+
+# Sidebar dropdown filters for room selection (agents) and patient status
+selected_room = st.sidebar.selectbox("Select Room for Agents", rooms, key="room")
+selected_status = st.sidebar.selectbox("Select Patient Status", statuses, key="status")
+
+live_dashboard(selected_room, selected_status, rooms, statuses)
+
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def journey_panel():
+    """Patient journeys, extended with the events appended since the last refresh."""
+    # Imported on first use: most sessions never open the panel
+    from components.journey_view import show_journeys
+    from utils.patient_journey import get_journey_engine
+
+    show_journeys(get_journey_engine(DEFAULT_PATHS["events"]))
+
+
+# Journeys are reconstructed from the NDJSON event log (JSON backend)
+if not repo.pushdown and st.sidebar.checkbox("Show patient journeys", value=False, key="journeys"):
+    journey_panel()
+
+# Opt-in schema validation; reports are cached per file version so unchanged files cost a lookup
+if st.sidebar.checkbox("Validate records", value=False, key="validate"):
+    columnar = st.sidebar.checkbox("Fast columnar checks", value=False, key="validate_columnar")
+    for label, path, model in (("Agents", "shared_data/agents.json", Agent), ("Patients", "shared_data/patient.json", Patient)):
+        report = validate_file(path, model, columnar=columnar)
+        with st.sidebar.expander(f"{label}: {len(report.errors)} invalid of {report.total}"):
+            for index, messages in list(report.errors.items())[:50]:
+                where = "File" if index == FILE_ERROR else f"Record {index}"
+                st.markdown(f"**{where}:** " + "; ".join(messages))
+
+# Process-wide snapshot cache counters, shared by every session
+with st.sidebar.expander("Snapshot cache"):
+    st.json(SNAPSHOTS.stats())
+
+# Background ingestion counters, shared by every session
+with st.sidebar.expander("Ingestion"):
+    st.json(worker.stats())
+
+# Timings of this full rerun; the stages of fragment refreshes go to the process-wide histograms
+with st.sidebar:
+    show_debug_panel(METRICS.end_run())
@@ -0,0 +1,161 @@
+"""
+Throughput of the multi-process deployment with the snapshot broker.
+
+Starts a broker process over a synthetic data set, then 1, 2, 4 and 8 worker
+processes. Every worker runs what a Streamlit process does: an IngestionWorker
+polls the data source in the background while the main loop performs session
+refreshes (take the snapshot, sync the indexed table, filter, decode one page).
+Meanwhile patient.json is rewritten periodically, and every worker reports how
+long a new version took to reach it. The same run with every worker watching
+the files itself (mode "files") is the baseline.
+
+Run from the streamlit_dashboard directory:
+
+    python -m benchmarks.bench_broker --records 100000 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import secrets
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks import datagen
+
+
+def _serve(paths, address, authkey, interval, ready):
+    from utils.snapshot_broker import BrokerServer, LocalBroker
+    server = BrokerServer(LocalBroker(paths), address, authkey, interval).start()
+    ready.set()
+    while True:
+        time.sleep(3600)
+
+
+def _worker(mode, paths, address, authkey, interval, duration, start_at, results):
+    from utils.file_watcher import DataSource
+    from utils.ingestion import IngestionWorker
+    from utils.query_engine import RecordTable
+    from utils.snapshot_broker import BrokerClient, BrokerDataSource
+
+    names = {"agents": paths["agents"], "patients": paths["patients"]}
+    if mode == "broker":
+        source = BrokerDataSource(BrokerClient(address, authkey), names)
+    else:
+        source = DataSource(names)
+
+    def poll():
+        source.poll()
+        return source.version
+
+    IngestionWorker({"data": poll}, interval=interval).start()
+    table = RecordTable("patient_id", ("status", "location"))
+    while time.time() < start_at:
+        time.sleep(0.01)
+
+    refreshes, seen, delays = 0, None, []
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        version, data = source.snapshot()
+        if version != seen:
+            seen = version
+            written_at = data["patients"][0].get("written_at") if data["patients"] else None
+            if written_at:
+                delays.append(time.time() - written_at)
+        table.sync(data["patients"], token=version)
+        table.select(table.filter(status="Active")[:25])
+        refreshes += 1
+    results.put((refreshes, delays))
+
+
+def _rewrite(path, patients, every, stop):
+    from utils.atomic_io import atomic_write_json
+    n = 0
+    while not stop.wait(every):
+        n += 1
+        records = [dict(record) for record in patients]
+        records[0]["written_at"] = time.time()
+        records[n % len(records)]["status"] = "Idle" if records[n % len(records)]["status"] == "Active" else "Active"
+        atomic_write_json(path, records)
+
+
+def measure(mode, n_workers, paths, address, authkey, interval, duration, change_every):
+    """
+    Run `n_workers` worker processes for `duration` seconds.
+
+    Returns:
+        dict: Refreshes per second in total and per worker, and the median delay
+        until a new file version reached a worker.
+    """
+    from utils.json_codec import load
+    patients = load(paths["patients"])
+    results = mp.Queue()
+    start_at = time.time() + 2.0  # let every worker parse the data set before timing
+    workers = [
+        mp.Process(target=_worker, args=(mode, paths, address, authkey, interval, duration, start_at, results))
+        for _ in range(n_workers)
+    ]
+    for process in workers:
+        process.start()
+    stop = threading.Event()
+    writer = threading.Thread(target=_rewrite, args=(paths["patients"], patients, change_every, stop))
+    while time.time() < start_at:
+        time.sleep(0.01)
+    writer.start()
+    reports = [results.get() for _ in workers]
+    stop.set()
+    writer.join()
+    for process in workers:
+        process.join()
+
+    total = sum(refreshes for refreshes, _ in reports)
+    delays = [delay for _, worker_delays in reports for delay in worker_delays]
+    return {
+        "mode": mode,
+        "workers": n_workers,
+        "refreshes_per_s": total / duration,
+        "per_worker": total / duration / n_workers,
+        "delay_ms": statistics.median(delays) * 1000 if delays else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the broker deployment with several worker processes.")
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per measurement")
+    parser.add_argument("--interval", type=float, default=0.2, help="Poll interval of broker and workers")
+    parser.add_argument("--change-every", type=float, default=1.0, help="Seconds between two rewrites of patient.json")
+    parser.add_argument("--modes", nargs="+", default=["files", "broker"], choices=["files", "broker"])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="dashboard-broker-")
+    broker = None
+    try:
+        paths = datagen.write_dataset(directory, args.records)
+        address = os.path.join(directory, "broker.sock")
+        authkey = secrets.token_bytes(32)
+        ready = mp.Event()
+        broker = mp.Process(target=_serve, args=(paths, address, authkey, args.interval, ready), daemon=True)
+        broker.start()
+        ready.wait(30)
+
+        print(f"{os.cpu_count()} CPUs, {args.records} records, {args.duration:.0f} s per run")
+        print(f"{'mode':<7} {'workers':>7} {'refreshes/s':>12} {'per worker':>11} {'delay ms':>9}")
+        for mode in args.modes:
+            for n_workers in args.workers:
+                row = measure(mode, n_workers, paths, address, authkey, args.interval, args.duration, args.change_every)
+                print(
+                    f"{row['mode']:<7} {row['workers']:>7} {row['refreshes_per_s']:>12.0f} "
+                    f"{row['per_worker']:>11.0f} {row['delay_ms']:>9.1f}"
+                )
+    finally:
+        if broker is not None:
+            broker.terminate()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
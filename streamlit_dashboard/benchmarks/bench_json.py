@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of the JSON decoding paths.
+
+Compares, on synthetic patient files of increasing size, the stdlib decoder with
+the fast backend selected by utils.json_codec, and the typed decoding paths
+(dict list + model validation vs. decoding straight into models or columns).
+
+Run from the streamlit_dashboard directory:
+
+    python -m benchmarks.bench_json --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.datagen import make_patients
+from models.schemas import Patient
+from models.validation import get_list_adapter
+from utils.json_codec import BACKEND, decode_columns, decode_models, loads
+
+FIELDS = ("patient_id", "event", "location", "timestamp", "status")
+
+
+def _transpose(records):
+    return {field: [record.get(field) for record in records] for field in FIELDS}
+
+
+def best_of(func, repeat):
+    """Return the fastest wall time of `repeat` calls of func, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeat=3):
+    """
+    Time every decoding path for each file size.
+
+    Returns:
+        list: One dict per (size, path) with the best time in milliseconds.
+    """
+    adapter = get_list_adapter(Patient)
+    results = []
+    for n in sizes:
+        raw = json.dumps(make_patients(n)).encode("utf-8")
+        paths = {
+            "json.loads": lambda: json.loads(raw),
+            f"{BACKEND}.loads": lambda: loads(raw),
+            "json.loads + validate_python": lambda: adapter.validate_python(json.loads(raw)),
+            "decode_models": lambda: decode_models(raw, Patient),
+            "json.loads + transpose": lambda: _transpose(json.loads(raw)),
+            "decode_columns": lambda: decode_columns(raw, FIELDS),
+        }
+        # Fewer repeats for the large files so the run stays short
+        rounds = repeat if n < 1_000_000 else 1
+        for name, func in paths.items():
+            results.append({"records": n, "path": name, "ms": round(best_of(func, rounds) * 1000, 2)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    print(f"backend: {BACKEND}")
+    for row in results:
+        print(f"{row['records']:>9,}  {row['path']:<32} {row['ms']:>10.2f} ms")
+    if args.output:
+        directory = os.path.dirname(os.path.abspath(args.output))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as f:
+            json.dump({"backend": BACKEND, "results": results}, f, indent=2)
+        os.replace(f.name, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cold start and time-to-first-paint of the dashboard entry points.
+
+Every measurement runs in a fresh Python process, the way a newly started
+Streamlit server meets its first session: the entry point is executed with
+Streamlit's AppTest harness and the probe records
+
+    import      importing Streamlit itself (the same for every entry point)
+    paint       from the start of the run to the first element sent to the browser
+    cold        the whole first run: module imports, data loading, rendering
+    warm        a rerun in the same process (what every later interaction costs)
+
+plus the heavy libraries (pandas, matplotlib) the first run had to import. The
+entry points read a synthetic data set written to a temporary directory; the
+columnar snapshot of patients.json is built once beforehand, as it is after the
+first start of a real deployment.
+
+Run from the streamlit_dashboard directory:
+
+    python -m benchmarks.bench_startup --records 100000 --repeat 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ("app.py", "status_bar.py", "utils/phaser_data_handler.py")
+HEAVY_MODULES = ("pandas", "matplotlib")
+
+
+def probe(script):
+    """
+    Run one entry point twice in this (fresh) process and print the timings as JSON.
+
+    Only the standard library is imported before the clock starts.
+    """
+    started = time.perf_counter()
+    from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+    from streamlit.testing.v1 import AppTest
+    imported = time.perf_counter()
+
+    # The first delta a run enqueues is the first element the browser can paint
+    painted = []
+    enqueue = ScriptRunContext.enqueue
+
+    def timed_enqueue(self, msg):
+        if not painted and msg.HasField("delta"):
+            painted.append(time.perf_counter())
+        return enqueue(self, msg)
+
+    ScriptRunContext.enqueue = timed_enqueue
+
+    def run(app):
+        painted.clear()
+        start = time.perf_counter()
+        app.run()
+        end = time.perf_counter()
+        if app.exception:
+            raise RuntimeError(f"{script} failed: {app.exception[0].message}")
+        return (painted[0] if painted else end) - start, end - start
+
+    app = AppTest.from_file(os.path.join(DASHBOARD_DIR, script), default_timeout=120)
+    cold_paint, cold = run(app)
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    _, warm = run(app)
+    print(json.dumps({
+        "import_s": imported - started,
+        "paint_s": cold_paint,
+        "cold_s": cold,
+        "warm_s": warm,
+        "loaded": loaded,
+    }))
+
+
+def measure(script, directory, repeat):
+    """
+    Probe an entry point in `repeat` fresh processes.
+
+    Returns:
+        dict: Median of every timing, and the heavy modules the first run imported.
+    """
+    env = dict(os.environ, PYTHONPATH=DASHBOARD_DIR)
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--probe", script],
+            cwd=directory, env=env, capture_output=True, text=True, check=False,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Probing {script} failed:\n{result.stderr}")
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    row = {key: statistics.median(sample[key] for sample in samples) for key in samples[0] if key.endswith("_s")}
+    row["loaded"] = samples[0]["loaded"]
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start and time-to-first-paint of the entry points.")
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per entry point (median reported)")
+    parser.add_argument("--entry-points", nargs="+", default=list(ENTRY_POINTS))
+    parser.add_argument("--probe", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        probe(args.probe)
+        return
+
+    from benchmarks import datagen
+    from utils.columnar_snapshot import compact
+
+    directory = tempfile.mkdtemp(prefix="dashboard-startup-")
+    try:
+        paths = datagen.write_dataset(os.path.join(directory, "shared_data"), args.records)
+        health = os.path.join(directory, "patients.json")
+        os.replace(paths["health"], health)
+        compact(health)
+
+        print(f"{args.records} records, median of {args.repeat} fresh processes, times in ms")
+        print(f"{'entry point':<30} {'import':>7} {'paint':>7} {'cold':>7} {'warm':>7}  loaded on first run")
+        for script in args.entry_points:
+            row = measure(script, directory, args.repeat)
+            print(
+                f"{script:<30} {row['import_s'] * 1000:>7.0f} {row['paint_s'] * 1000:>7.0f} "
+                f"{row['cold_s'] * 1000:>7.0f} {row['warm_s'] * 1000:>7.0f}  {', '.join(row['loaded']) or '-'}"
+            )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
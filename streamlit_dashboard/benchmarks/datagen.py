@@ -0,0 +1,225 @@
+"""
+Synthetic hospital-scale data generator.
+
+Produces the files the dashboard reads, at any scale and with a fixed seed so the
+same arguments always give byte-identical files:
+
+    agents.json          Agent records (models.schemas.Agent)
+    patient.json         Patient records (models.schemas.Patient)
+    event_log.ndjson     Patient events, one JSON record per line
+    patients.json        Health series for status_bar.py ({"id", "timestamp", "value", "room"})
+
+Run from the streamlit_dashboard directory:
+
+    python -m benchmarks.datagen out_dir --records 100000 --rooms 40 --statuses 3
+"""
+import argparse
+import os
+
+import numpy as np
+
+from utils.atomic_io import atomic_write_bytes, atomic_write_json
+from utils.event_store import encode_event
+
+PATIENT_STATUSES = ["Active", "Idle", "Completed"]
+AGENT_STATUSES = ["On Duty", "Off Duty"]
+ROLES = ["Doctor", "Nurse", "EMT", "Surgeon", "Technician"]
+EVENTS = ["admitted", "transferred", "examined", "treated", "discharged"]
+ROOM_KINDS = ["ward", "icu_zone", "er_bay", "surgery", "radiology", "reception"]
+
+START = np.datetime64("2025-05-15T00:00:00", "s")
+
+
+def room_names(n):
+    """Return `n` distinct room names such as ward_1, icu_zone_1, er_bay_1, ..."""
+    return [f"{ROOM_KINDS[i % len(ROOM_KINDS)]}_{i // len(ROOM_KINDS) + 1}" for i in range(n)]
+
+
+def status_names(n, base=PATIENT_STATUSES):
+    """Return `n` status names: the real ones first, then synthetic extras."""
+    return list(base[:n]) + [f"Status_{i}" for i in range(len(base), n)]
+
+
+def _timestamps(rng, n, span_s):
+    # Sorted ISO-8601 UTC timestamps spread over `span_s` seconds
+    offsets = np.sort(rng.integers(0, span_s, size=n))
+    return [f"{t}Z" for t in np.datetime_as_string(START + offsets.astype("timedelta64[s]"))]
+
+
+def make_agents(n, rooms=20, seed=0):
+    """
+    Generate agent records.
+
+    Args:
+        n (int): Number of agents.
+        rooms (int): Number of distinct rooms.
+        seed (int): Random seed.
+
+    Returns:
+        list: Agent records.
+    """
+    rng = np.random.default_rng(seed)
+    room = rng.integers(0, rooms, size=n)
+    role = rng.integers(0, len(ROLES), size=n)
+    status = rng.integers(0, len(AGENT_STATUSES), size=n)
+    names = room_names(rooms)
+    return [
+        {
+            "agent_id": f"A{i:07d}",
+            "name": f"Agent {i}",
+            "current_room": names[room[i]],
+            "role": ROLES[role[i]],
+            "status": AGENT_STATUSES[status[i]],
+        }
+        for i in range(n)
+    ]
+
+
+def make_patients(n, rooms=20, statuses=3, seed=0):
+    """
+    Generate patient records.
+
+    Args:
+        n (int): Number of patients.
+        rooms (int): Number of distinct rooms.
+        statuses (int): Number of distinct statuses.
+        seed (int): Random seed.
+
+    Returns:
+        list: Patient records.
+    """
+    rng = np.random.default_rng(seed + 1)
+    names, labels = room_names(rooms), status_names(statuses)
+    room = rng.integers(0, rooms, size=n)
+    status = rng.integers(0, statuses, size=n)
+    event = rng.integers(0, len(EVENTS), size=n)
+    timestamps = _timestamps(rng, n, 7 * 24 * 3600)
+    return [
+        {
+            "patient_id": f"P{i:07d}",
+            "event": EVENTS[event[i]],
+            "location": names[room[i]],
+            "timestamp": timestamps[i],
+            "status": labels[status[i]],
+        }
+        for i in range(n)
+    ]
+
+
+def make_events(n, patients=1000, agents=100, rooms=20, statuses=3, seed=0):
+    """
+    Generate a time-ordered event log.
+
+    Args:
+        n (int): Number of events.
+        patients (int): Number of distinct patients referenced.
+        agents (int): Number of distinct agents referenced.
+        rooms (int): Number of distinct rooms.
+        statuses (int): Number of distinct statuses.
+        seed (int): Random seed.
+
+    Returns:
+        list: Event records, sorted by timestamp.
+    """
+    rng = np.random.default_rng(seed + 2)
+    names, labels = room_names(rooms), status_names(statuses)
+    patient = rng.integers(0, max(1, patients), size=n)
+    agent = rng.integers(0, max(1, agents), size=n)
+    room = rng.integers(0, rooms, size=n)
+    status = rng.integers(0, statuses, size=n)
+    event = rng.integers(0, len(EVENTS), size=n)
+    timestamps = _timestamps(rng, n, 30 * 24 * 3600)
+    return [
+        {
+            "patient_id": f"P{patient[i]:07d}",
+            "agent_id": f"A{agent[i]:07d}",
+            "event": EVENTS[event[i]],
+            "location": names[room[i]],
+            "timestamp": timestamps[i],
+            "status": labels[status[i]],
+        }
+        for i in range(n)
+    ]
+
+
+def make_health_series(n, patients=100, rooms=20, seed=0):
+    """
+    Generate health score records for status_bar.py.
+
+    Every patient gets a bounded random walk between 0 and 10, sampled once a
+    minute; records are shuffled like a log merged from several sources.
+
+    Args:
+        n (int): Total number of records.
+        patients (int): Number of distinct patients.
+        rooms (int): Number of distinct rooms.
+        seed (int): Random seed.
+
+    Returns:
+        list: {"id", "timestamp", "value", "room"} records.
+    """
+    rng = np.random.default_rng(seed + 3)
+    names = room_names(rooms)
+    patients = max(1, min(patients, n))
+    patient = np.arange(n) % patients
+    minute = np.arange(n) // patients
+    # Cumulative walk per patient: records of one patient are `patients` apart, so
+    # one row of the reshaped matrix is one minute of every patient
+    rows = -(-n // patients)
+    walk = rng.normal(0, 0.4, size=rows * patients).reshape(rows, patients).cumsum(axis=0).ravel()[:n]
+    values = np.clip(5 + walk, 0, 10).round(1)
+    room = rng.integers(0, rooms, size=n)
+    times = np.datetime_as_string(START + (minute * 60).astype("timedelta64[s]"))
+    order = rng.permutation(n)
+    return [
+        {"id": f"P{patient[i]:07d}", "timestamp": f"{times[i]}Z", "value": float(values[i]), "room": names[room[i]]}
+        for i in order
+    ]
+
+
+def write_dataset(directory, records=1000, rooms=20, statuses=3, seed=0):
+    """
+    Write a complete synthetic data set.
+
+    Args:
+        directory (str): Output directory (created if missing).
+        records (int): Number of patient records and of events; agents and
+            health-series patients scale down from it.
+        rooms (int): Number of distinct rooms.
+        statuses (int): Number of distinct patient statuses.
+        seed (int): Random seed.
+
+    Returns:
+        dict: Mapping of file kind to the written path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    n_agents = max(1, records // 10)
+    n_series = max(1, records // 100)
+    paths = {
+        "agents": os.path.join(directory, "agents.json"),
+        "patients": os.path.join(directory, "patient.json"),
+        "events": os.path.join(directory, "event_log.ndjson"),
+        "health": os.path.join(directory, "patients.json"),
+    }
+    atomic_write_json(paths["agents"], make_agents(n_agents, rooms, seed))
+    atomic_write_json(paths["patients"], make_patients(records, rooms, statuses, seed))
+    events = make_events(records, records, n_agents, rooms, statuses, seed)
+    atomic_write_bytes(paths["events"], b"".join(encode_event(event) for event in events))
+    atomic_write_json(paths["health"], make_health_series(records, n_series, rooms, seed))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic hospital data set.")
+    parser.add_argument("directory", help="Output directory")
+    parser.add_argument("--records", type=int, default=1000, help="Patient records and events (100 to 1M)")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--statuses", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for kind, path in write_dataset(args.directory, args.records, args.rooms, args.statuses, args.seed).items():
+        print(f"{kind:<9} {path} ({os.path.getsize(path):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+Benchmark suite for the dashboard's hot paths.
+
+Every benchmark runs against a synthetic data set generated with a fixed seed
+(benchmarks.datagen), so two runs of the same scale measure the same work. Each
+benchmark is calibrated like pytest-benchmark: it is repeated until `--min-time`
+seconds have passed (at least `--min-rounds` times) and min/median/mean/stddev
+are reported. Results are written as JSON; pass a previous result file with
+`--compare` to flag regressions.
+
+Run from the streamlit_dashboard directory:
+
+    python -m benchmarks.suite --records 100000 --output results.json
+    python -m benchmarks.suite --records 100000 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import datagen
+
+# Registered benchmarks: (group, name, function taking the fixtures dict)
+BENCHMARKS = []
+
+
+def benchmark(group, name=None):
+    """Register a function as a benchmark of `group`."""
+    def register(func):
+        BENCHMARKS.append((group, name or func.__name__, func))
+        return func
+    return register
+
+
+class Fixtures(dict):
+    """
+    Lazily built, cached inputs shared by the benchmarks.
+
+    Building an input (parsing a file, indexing a table) is never part of the
+    timed code of a benchmark that only needs it as an input.
+    """
+
+    def __init__(self, paths, factories):
+        super().__init__()
+        self.paths = paths
+        self._factories = factories
+
+    def __missing__(self, name):
+        value = self[name] = self._factories[name](self)
+        return value
+
+
+def _fixture_factories():
+    from utils.aggregates import GroupCounts
+    from utils.columnar_snapshot import write_columnar
+    from utils.event_index import EventIndex
+    from utils.event_store import read_events
+    from utils.health_series import HealthSeriesStore
+    from utils.json_codec import load, load_columns
+    from utils.patient_journey import get_journey_engine
+    from utils.query_engine import RecordTable
+    from utils.simulation import PATIENT_STATUSES, PATIENT_TRANSITIONS, StatusSimulator
+
+    def health_columns(fx):
+        return load_columns(fx.paths["health"], ("id", "timestamp", "value", "room"))
+
+    def health_store(fx):
+        columns = fx["health_columns"]
+        return HealthSeriesStore(columns["id"], columns["timestamp"], columns["value"], columns["room"])
+
+    def health_snapshot(fx):
+        directory = os.path.join(os.path.dirname(fx.paths["health"]), "health.columns")
+        return write_columnar(fx["health_store"], directory)
+
+    def agent_counts(fx):
+        return fx["agent_table"].attach(GroupCounts(("current_room", "role", "status")))
+
+    return {
+        "agents": lambda fx: load(fx.paths["agents"]),
+        "agent_table": lambda fx: RecordTable("agent_id", ("current_room", "status", "role"), fx["agents"]),
+        "agent_counts": agent_counts,
+        "patients": lambda fx: load(fx.paths["patients"]),
+        "patient_frame": lambda fx: pd.DataFrame(fx["patients"]),
+        "patient_table": lambda fx: RecordTable("patient_id", ("location", "status"), fx["patients"]),
+        "patient_simulator": lambda fx: StatusSimulator(
+            fx["patients"], "patient_id", "status", PATIENT_STATUSES, PATIENT_TRANSITIONS, seed=0
+        ),
+        "event_index": lambda fx: EventIndex(fx.paths["events"]),
+        "events": lambda fx: read_events(fx.paths["events"]),
+        "journeys": lambda fx: get_journey_engine(fx.paths["events"]),
+        "health_columns": health_columns,
+        "health_store": health_store,
+        "health_snapshot": health_snapshot,
+    }
+
+
+# --- load ---
+
+@benchmark("load")
+def load_patients_stdlib(fx):
+    with open(fx.paths["patients"]) as f:
+        json.load(f)
+
+
+@benchmark("load")
+def load_patients_codec(fx):
+    from utils.json_codec import load
+    load(fx.paths["patients"])
+
+
+@benchmark("load")
+def load_patients_snapshot(fx):
+    from utils.snapshot_store import SnapshotStore
+    SnapshotStore().get(fx.paths["patients"])
+
+
+@benchmark("load")
+def validate_patients(fx):
+    from models.schemas import Patient
+    from models.validation import validate_file
+    # Measure the validation, not the report cache
+    validate_file(fx.paths["patients"], Patient, use_cache=False)
+
+
+@benchmark("load")
+def load_events(fx):
+    from utils.event_store import read_events
+    read_events(fx.paths["events"])
+
+
+@benchmark("load")
+def load_health_store(fx):
+    from utils.health_series import HealthSeriesStore
+    columns = fx["health_columns"]
+    HealthSeriesStore(columns["id"], columns["timestamp"], columns["value"], columns["room"])
+
+
+@benchmark("load")
+def open_health_columnar(fx):
+    from utils.columnar_snapshot import ColumnarHealthStore
+    store = ColumnarHealthStore(fx["health_snapshot"])
+    store.latest(store.patient_ids()[0])
+
+
+# --- filter ---
+
+@benchmark("filter")
+def filter_patients_pandas(fx):
+    df = fx["patient_frame"]
+    df[df["status"] == "Active"]
+
+
+@benchmark("filter")
+def filter_patients_record_table(fx):
+    fx["patient_table"].filter(status="Active")
+
+
+@benchmark("filter")
+def build_record_table(fx):
+    from utils.query_engine import RecordTable
+    RecordTable("patient_id", ("location", "status"), fx["patients"])
+
+
+@benchmark("filter")
+def room_options_scan(fx):
+    sorted({agent["current_room"] for agent in fx["agents"]})
+
+
+@benchmark("filter")
+def room_options_aggregate(fx):
+    fx["agent_counts"].distinct("current_room")
+
+
+@benchmark("filter")
+def aggregate_upsert(fx):
+    # One status change through a table maintaining room x role x status counts
+    fx["agent_counts"]  # attaches the aggregate to the table
+    table, agents = fx["agent_table"], fx["agents"]
+    fx["upserts"] = n = fx.get("upserts", 0) + 1
+    record = dict(agents[n % len(agents)])
+    record["status"] = f"status-{n % 3}"
+    table.upsert(record)
+
+
+@benchmark("filter")
+def health_window(fx):
+    store = fx["health_store"]
+    patient_id = store.patient_ids()[0]
+    start, end = store.time_bounds(patient_id)
+    store.window(patient_id, start, start + (end - start) // 2)
+
+
+@benchmark("filter")
+def patient_events_scan(fx):
+    from utils.event_store import iter_events
+    patient_id = fx["patients"][0]["patient_id"]
+    sorted((e for e in iter_events(fx.paths["events"]) if e.get("patient_id") == patient_id),
+           key=lambda e: e.get("timestamp") or "")
+
+
+@benchmark("filter")
+def patient_events_index(fx):
+    list(fx["event_index"].query(fx["patients"][0]["patient_id"]))
+
+
+@benchmark("filter")
+def build_event_index(fx):
+    from utils.event_index import EventIndex
+    if os.path.exists(fx.paths["scratch_index"]):
+        os.remove(fx.paths["scratch_index"])
+    EventIndex(fx.paths["events"], fx.paths["scratch_index"])
+
+
+@benchmark("filter")
+def build_journeys(fx):
+    from utils.patient_journey import JourneyEngine
+    JourneyEngine(fx.paths["events"]).build(fx["events"])
+
+
+@benchmark("filter")
+def journey_summary_cached(fx):
+    fx["journeys"].summary()
+
+
+# --- classify ---
+
+@benchmark("classify")
+def classify_values(fx):
+    from utils.health_status import classify
+    classify(fx["health_store"].values)
+
+
+# --- plot ---
+
+@benchmark("plot")
+def downsample_series(fx):
+    from utils.health_series import downsample
+    store = fx["health_store"]
+    timestamps, values, _ = store.series(store.patient_ids()[0])
+    downsample(timestamps, values, 1000)
+
+
+@benchmark("plot")
+def render_chart(fx):
+    from components.health_chart import _plot_points, render_health_png
+    store = fx["health_store"]
+    patient_id = store.patient_ids()[0]
+    times, values = _plot_points(store, patient_id, store.time_bounds(patient_id))
+    render_health_png(times, values, patient_id)
+
+
+# --- append ---
+
+@benchmark("append")
+def append_event_single(fx):
+    from utils.event_store import append_event
+    append_event(fx.paths["scratch_log"], fx["patients"][0])
+
+
+@benchmark("append")
+def append_events_batch_100(fx):
+    from utils.event_store import append_events
+    append_events(fx.paths["scratch_log"], fx["patients"][:100])
+
+
+@benchmark("append")
+def rewrite_json_array_append(fx):
+    # The former append path: read the whole array, add one entry, rewrite it
+    from utils.atomic_io import atomic_write_json
+    from utils.json_codec import load
+    data = load(fx.paths["scratch_array"])
+    data.append(fx["patients"][0])
+    atomic_write_json(fx.paths["scratch_array"], data)
+
+
+@benchmark("append")
+def batch_update_100(fx):
+    # 100 record changes applied in one transaction, with one rewrite of the file
+    from utils.batch_ops import commit_batch
+    changes = [("update", {"patient_id": patient["patient_id"], "status": "Idle"}) for patient in fx["patients"][:100]]
+    commit_batch(fx.paths["scratch_array"], changes, "patient_id")
+
+
+# --- simulate ---
+
+@benchmark("simulate")
+def simulate_tick_delta(fx):
+    fx["patient_simulator"].tick()
+
+
+@benchmark("simulate")
+def simulate_100_ticks(fx):
+    fx["patient_simulator"].run(100)
+
+
+def measure(func, fx, min_time=0.5, min_rounds=3, max_rounds=1000):
+    """
+    Time repeated calls of a benchmark.
+
+    Returns:
+        dict: rounds and min/max/mean/median/stddev in seconds.
+    """
+    func(fx)  # warm-up: imports, lazy fixtures, caches
+    times = []
+    started = time.perf_counter()
+    while len(times) < min_rounds or (time.perf_counter() - started < min_time and len(times) < max_rounds):
+        start = time.perf_counter()
+        func(fx)
+        times.append(time.perf_counter() - start)
+    return {
+        "rounds": len(times),
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.fmean(times),
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def run(records=10_000, rooms=20, statuses=3, seed=0, groups=None, select=None, min_time=0.5, min_rounds=3):
+    """
+    Generate the data set and run the selected benchmarks.
+
+    Args:
+        records (int): Scale of the synthetic data set (see datagen.write_dataset).
+        rooms (int): Number of distinct rooms.
+        statuses (int): Number of distinct patient statuses.
+        seed (int): Random seed of the data set.
+        groups (list, optional): Only run these groups.
+        select (str, optional): Only run benchmarks whose name contains this text.
+        min_time (float): Minimum seconds spent on each benchmark.
+        min_rounds (int): Minimum number of timed calls of each benchmark.
+
+    Returns:
+        dict: Run metadata and one result entry per benchmark.
+    """
+    directory = tempfile.mkdtemp(prefix="dashboard-bench-")
+    try:
+        paths = datagen.write_dataset(directory, records, rooms, statuses, seed)
+        paths["scratch_log"] = os.path.join(directory, "scratch.ndjson")
+        paths["scratch_array"] = os.path.join(directory, "scratch.json")
+        paths["scratch_index"] = os.path.join(directory, "scratch.idx")
+        shutil.copyfile(paths["patients"], paths["scratch_array"])
+        fx = Fixtures(paths, _fixture_factories())
+
+        results = []
+        for group, name, func in BENCHMARKS:
+            if groups and group not in groups:
+                continue
+            if select and select not in name:
+                continue
+            stats = measure(func, fx, min_time, min_rounds)
+            results.append({"group": group, "name": name, **stats})
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "records": records,
+            "rooms": rooms,
+            "statuses": statuses,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Compare two result sets by their median times.
+
+    Args:
+        current (dict): Result of run().
+        baseline (dict): Earlier result of run(), e.g. from the previous release.
+        threshold (float): Relative slowdown above which a benchmark regressed.
+
+    Returns:
+        list: (name, baseline median, current median, ratio) of every regression.
+    """
+    before = {row["name"]: row["median"] for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = before.get(row["name"])
+        if old and row["median"] > old * (1 + threshold):
+            regressions.append((row["name"], old, row["median"], row["median"] / old))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the dashboard benchmark suite.")
+    parser.add_argument("--records", type=int, default=10_000, help="Scale of the data set (100 to 1M)")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--statuses", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--group", action="append", help="Only run this group (repeatable)")
+    parser.add_argument("-k", dest="select", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    parser.add_argument("--min-rounds", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    result = run(args.records, args.rooms, args.statuses, args.seed, args.group, args.select, args.min_time, args.min_rounds)
+    print(f"{'group':<9} {'name':<30} {'rounds':>7} {'min ms':>10} {'median ms':>10} {'stddev ms':>10}")
+    for row in result["results"]:
+        print(
+            f"{row['group']:<9} {row['name']:<30} {row['rounds']:>7} "
+            f"{row['min'] * 1000:>10.3f} {row['median'] * 1000:>10.3f} {row['stddev'] * 1000:>10.3f}"
+        )
+
+    if args.output:
+        from utils.atomic_io import atomic_write_bytes
+        atomic_write_bytes(args.output, json.dumps(result, indent=2).encode("utf-8"))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        for name, old, new, ratio in regressions:
+            print(f"REGRESSION {name}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
-import pandas as pd
 import streamlit as st
 
-def show_agents(agent_data, room_filter):
+from components.paginated_table import show_paginated_table, show_query_table
+from utils.instrumentation import timed
+from utils.query_engine import RecordTable, bitmap_to_rows, popcount
+from utils.repository import Repository
+
+@timed("show_agents")
+def show_agents(agent_data, room_filter, page_size=25, changes=None):
     """
     Displays a filtered table of agents based on their current room location.
     
@@ -12,8 +17,11 @@ def show_agents(agent_data, room_filter):
     
     Parameters:
     ----------
-    agent_data : list or dict
-        A collection of agent records that can be converted to a pandas DataFrame.
+    agent_data : list, dict, RecordTable or Repository
+        A collection of agent records that can be converted to a pandas DataFrame,
+        an indexed RecordTable, or a Repository. A RecordTable is filtered through
+        its bitmap index, a Repository evaluates the filter itself (e.g. in SQL);
+        in both cases only the rows of the visible page are sent to the browser.
         Each agent record should be a dictionary containing agent information.
         Expected to have a 'current_room' column for filtering.
         
@@ -21,6 +29,14 @@ def show_agents(agent_data, room_filter):
         The room identifier to filter agents by. Only agents with their
         'current_room' value matching this parameter will be displayed.
     
+    page_size : int, optional
+        Rows per page when `agent_data` is a RecordTable or Repository (default 25).
+
+    changes : ChangeSet, optional
+        Changes of a RecordTable since the last refresh, from a ChangeTracker.
+        Shows how many records of the filtered view changed, and lets the
+        unchanged page be reused instead of decoded and rebuilt.
+    
     Returns:
     -------
     None
@@ -43,18 +59,41 @@ def show_agents(agent_data, room_filter):
     >>> show_agents(agents, "101")
     # Will display a table with Dr. Smith and Dr. Lee who are in room 101
     """
-    # Convert agent data to DataFrame
-    df = pd.DataFrame(agent_data)
-    
-    # Check if required column exists
-    if "current_room" not in df.columns:
-        st.warning("Missing 'current_room' column in agent data.")
-        st.dataframe(df)
+    if isinstance(agent_data, Repository):
+        # Storage backend: the filter, sort and page are pushed down to the repository
+        st.subheader(f"👩‍⚕️ Agents in Room: {room_filter}")
+        show_query_table(agent_data, "agents", {"current_room": room_filter}, key="agents", page_size=page_size)
         return
-    
-    # Filter the dataframe by room
-    filtered_df = df[df["current_room"] == room_filter]
+
+    if isinstance(agent_data, RecordTable):
+        # Indexed table: the filter is an index lookup and only matching rows are decoded
+        if "current_room" not in agent_data.columns:
+            st.warning("Missing 'current_room' column in agent data.")
+            show_paginated_table(agent_data, agent_data.filter(), key="agents", changes=changes)
+            return
+        bitmap = agent_data.filter_bitmap(current_room=room_filter)
+        rows = bitmap_to_rows(bitmap)
+    else:
+        import pandas as pd
+
+        # Convert agent data to DataFrame
+        df = pd.DataFrame(agent_data)
+
+        # Check if required column exists
+        if "current_room" not in df.columns:
+            st.warning("Missing 'current_room' column in agent data.")
+            st.dataframe(df)
+            return
+
+        # Filter the dataframe by room
+        filtered_df = df[df["current_room"] == room_filter]
     
     # Display results
     st.subheader(f"👩‍⚕️ Agents in Room: {room_filter}")
-    st.dataframe(filtered_df, use_container_width=True)
\ No newline at end of file
+    if isinstance(agent_data, RecordTable):
+        if changes is not None:
+            st.caption(f"{popcount(bitmap & changes.bitmap)} changed in this view · {len(changes)} changed overall since last refresh")
+        # Server-side sorting and paging: only the visible window is rendered
+        show_paginated_table(agent_data, rows, key="agents", page_size=page_size, changes=changes)
+    else:
+        st.dataframe(filtered_df, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import streamlit as st
+
+from utils.instrumentation import METRICS, enabled, set_enabled, start_http_server
+
+
+def _toggle_profiling():
+    # Only an actual click changes the process-wide flag, not every rerun of every session
+    set_enabled(st.session_state.profiling)
+
+
+def show_debug_panel(run=None):
+    """
+    Renders the optional profiling panel (meant for the sidebar).
+
+    A toggle turns stage timing on or off for the whole process. While it is on,
+    the panel lists the stages of the given run (time, calls, bytes read, rows
+    rendered) and the process-wide latency percentiles, and offers the metrics as
+    Prometheus text or JSON downloads.
+
+    Parameters:
+    ----------
+    run : RunRecord, optional
+        Record of the rerun to show, as returned by METRICS.end_run().
+
+    Returns:
+    -------
+    None
+        This function does not return a value; it renders UI elements
+        directly to the Streamlit app.
+    """
+    # Serve /metrics when DASHBOARD_METRICS_PORT is set; a no-op otherwise
+    start_http_server()
+
+    with st.expander("Profiling"):
+        # Show the process-wide state, which another session may have changed
+        st.session_state.profiling = enabled()
+        st.toggle("Record stage timings", key="profiling", on_change=_toggle_profiling)
+        if not enabled():
+            st.caption("Timing is off; instrumented code only checks a flag.")
+            return
+
+        import pandas as pd  # only once profiling is on
+
+        if run is not None and run.stages:
+            st.markdown(f"**Last rerun:** {run.total * 1000:.1f} ms")
+            stages = pd.DataFrame.from_dict(run.stages, orient="index")
+            stages["ms"] = (stages.pop("seconds") * 1000).round(2)
+            st.dataframe(stages.sort_values("ms", ascending=False), use_container_width=True)
+
+        metrics = METRICS.to_dict()
+        if metrics["stages"]:
+            st.markdown("**All reruns (p50 / p95 ms)**")
+            summary = pd.DataFrame(
+                {
+                    stage: {"count": h["count"], "p50": h["p50"] * 1000, "p95": h["p95"] * 1000}
+                    for stage, h in metrics["stages"].items()
+                }
+            ).T
+            st.dataframe(summary, use_container_width=True)
+
+        col_prom, col_json, col_reset = st.columns(3)
+        with col_prom:
+            st.download_button("Prometheus", METRICS.to_prometheus(), file_name="metrics.txt", key="metrics_prom")
+        with col_json:
+            st.download_button("JSON", METRICS.to_json(), file_name="metrics.json", key="metrics_json")
+        with col_reset:
+            if st.button("Reset", key="metrics_reset"):
+                METRICS.reset()
@@ -0,0 +1,171 @@
+import io
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from utils.health_series import downsample
+from utils.health_status import HEALTH_BANDS, status_colors
+from utils.instrumentation import count, stage, timed
+
+MAX_PLOT_POINTS = 1000  # Point budget for the chart: about one point per horizontal pixel
+
+
+class ChartCache:
+    """
+    Bounded, process-wide LRU cache of rendered chart images.
+
+    Parameters:
+    ----------
+    max_entries : int
+        Number of rendered charts to keep; the least recently used is dropped first.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """
+        Return the cached image for `key`, rendering it with `render()` on a miss.
+        """
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return image
+        image = render()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = image
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return image
+
+    def stats(self):
+        """Return hit/miss counters and the cached size in bytes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "nbytes": sum(len(image) for image in self._entries.values()),
+            }
+
+
+# Shared by every session: the same patient, range and data version renders once
+CHART_CACHE = ChartCache()
+
+
+def _plot_points(store, patient_id, time_range):
+    # Binary search the range, then downsample it to the pixel budget
+    window_ts, window_values, _ = store.window(patient_id, *time_range)
+    kept = downsample(window_ts, window_values, MAX_PLOT_POINTS)
+    return window_ts[kept].astype('datetime64[ns]'), window_values[kept]
+
+
+@timed("render_chart")
+def render_health_png(times, values, patient_id):
+    """
+    Render the health progression chart to PNG bytes.
+
+    The figure is created through the object-oriented `Figure` API instead of
+    `pyplot`, so it is not registered with pyplot's global figure manager and is
+    freed as soon as the PNG is written. matplotlib is imported on the first render,
+    so pages that never draw a chart (or only hit the cache) do not pay its import.
+
+    Parameters:
+    ----------
+    times : np.ndarray
+        datetime64 timestamps of the points.
+    values : np.ndarray
+        Health scores of the points.
+    patient_id : str
+        Patient shown in the title.
+
+    Returns:
+    -------
+    bytes
+        The rendered PNG image.
+    """
+    import matplotlib.patches as mpatches
+    from matplotlib.figure import Figure
+
+    # Generate colors for all data points in one vectorized classification
+    colors = status_colors(values)
+    count("render_chart", rows=len(values))
+
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.scatter(times, values, color=colors, s=100)  # s=point size
+    ax.plot(times, values, color='lightgray', linestyle='--', alpha=0.5)
+
+    ax.set_ylim(0, 10)  # Set y-axis limits for health score
+    ax.set_title(f"Health Progression for {patient_id}")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Health Score (0–10)")
+
+    # --- Custom legend creation ---
+    legend_patches = [
+        mpatches.Patch(color=color, label=label) for _, label, color, _ in reversed(HEALTH_BANDS)
+    ]
+    ax.legend(handles=legend_patches, title="Status")
+
+    ax.tick_params(axis='x', labelrotation=45)  # Rotate x-axis labels for better readability
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def show_health_chart(store, patient_id, time_range, data_version, interactive=False):
+    """
+    Displays the health progression chart of one patient.
+
+    In the default image mode the chart is rendered with matplotlib and served from
+    a bounded cache keyed by (patient, time range, data version), so reruns and other
+    sessions looking at the same view reuse the PNG. In interactive mode only the
+    downsampled point arrays are sent and the browser draws the chart.
+
+    Parameters:
+    ----------
+    store : HealthSeriesStore
+        Per-patient health series.
+    patient_id : str
+        Patient to plot.
+    time_range : tuple
+        (start, end) datetimes of the range to plot.
+    data_version : hashable
+        Version of the underlying data, e.g. the file signature.
+    interactive : bool
+        Send arrays to a client-side chart instead of a rendered image.
+
+    Returns:
+    -------
+    None
+        This function does not return a value; it renders UI elements
+        directly to the Streamlit app.
+    """
+    if interactive:
+        import pandas as pd
+        times, values = _plot_points(store, patient_id, time_range)
+        chart_data = pd.DataFrame({
+            "Time": times,
+            "Health Score": values,
+            "color": status_colors(values),
+        })
+        with stage("st.scatter_chart"):
+            st.scatter_chart(chart_data, x="Time", y="Health Score", color="color")
+        count("st.scatter_chart", rows=len(chart_data))
+        return
+
+    key = (str(patient_id), time_range[0], time_range[1], data_version)
+    png = CHART_CACHE.get_or_render(key, lambda: render_health_png(*_plot_points(store, patient_id, time_range), patient_id))
+    with stage("st.image"):
+        st.image(png, use_container_width=True)
+    count("st.image", bytes_read=len(png))
@@ -0,0 +1,86 @@
+import time
+
+import streamlit as st
+
+from utils.instrumentation import count, timed
+
+# Gantt-style timeline: one bar per stay, one row per location
+TIMELINE_SPEC = {
+    "mark": {"type": "bar", "cornerRadius": 2},
+    "encoding": {
+        "x": {"field": "start", "type": "temporal", "title": None},
+        "x2": {"field": "end"},
+        "y": {"field": "location", "type": "nominal", "sort": None, "title": None},
+        "color": {"field": "event", "type": "nominal"},
+        "tooltip": [
+            {"field": "event", "type": "nominal"},
+            {"field": "location", "type": "nominal"},
+            {"field": "start", "type": "temporal", "format": "%Y-%m-%d %H:%M"},
+            {"field": "dwell_h", "type": "quantitative", "format": ".1f", "title": "hours"},
+        ],
+    },
+}
+
+
+SUMMARY_PAGE_SIZE = 25
+
+
+@timed("show_journeys")
+def show_journeys(engine, key="journey"):
+    """
+    Renders the patient journey summary and the timeline of one patient.
+
+    The summary table comes from the engine's cache and is shown one page at a
+    time, and the timeline only holds the selected patient's stays, so the view
+    costs the same for ten or ten thousand patients. Open stays are measured up to
+    the same instant in the timeline and in the dwell table.
+
+    Parameters:
+    ----------
+    engine : JourneyEngine
+        Journeys reconstructed from the event log, already refreshed.
+
+    key : str, optional
+        Widget key of the patient selector, and prefix of the summary page
+        cursor (default "journey").
+
+    Returns:
+    -------
+    None
+        This function does not return a value; it renders UI elements
+        directly to the Streamlit app.
+    """
+    st.subheader("🧭 Patient Journeys")
+    summary = engine.summary()
+    if summary.empty:
+        st.info("No patient events logged yet.")
+        return
+
+    in_care = int((~summary["discharged"]).sum())
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Patients in care", in_care)
+    col2.metric("Discharged", len(summary) - in_care)
+    col3.metric("Median transfers", f"{summary['transfers'].median():.0f}")
+
+    n_pages = max(1, -(-len(summary) // SUMMARY_PAGE_SIZE))
+    page_key = f"{key}_summary_page"
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    page = st.number_input("Summary page", min_value=1, max_value=n_pages, step=1, key=page_key)
+    start = (page - 1) * SUMMARY_PAGE_SIZE
+    rows = summary.iloc[start:start + SUMMARY_PAGE_SIZE]
+    st.caption(f"Page {page} of {n_pages} · {len(summary)} patients")
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    count("show_journeys", rows=len(rows))
+
+    patient_id = st.selectbox("Journey of patient", summary["patient_id"], key=key)
+    journey = engine.journey(patient_id)
+    if journey is None:
+        return
+    # An ongoing stay is drawn and counted up to now
+    now_ns = time.time_ns()
+    stays = journey.stays(now_ns=now_ns)
+    st.vega_lite_chart(stays, TIMELINE_SPEC, use_container_width=True)
+    st.markdown(f"**{journey.transfers} transfers** · {len(journey)} events")
+    dwell = journey.dwell_by_location(now_ns=now_ns)
+    st.dataframe(dwell.rename("hours").round(1), use_container_width=True)
@@ -0,0 +1,78 @@
+import numpy as np
+import streamlit as st
+
+from utils.aggregates import room_summary
+from utils.instrumentation import timed
+
+# End points of the heatmap shading, from an empty cell to the fullest one
+LOW_RGB = np.array([255, 245, 240])
+HIGH_RGB = np.array([165, 15, 21])
+
+
+def _shade(matrix):
+    """
+    Return one CSS background per cell, shaded linearly by count.
+
+    Computed with numpy so the heatmap does not pull in matplotlib, which
+    `Styler.background_gradient` imports on every call.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    peak = matrix.max() if matrix.size else 0
+    scale = matrix / peak if peak > 0 else np.zeros_like(matrix)
+    rgb = np.rint(LOW_RGB + scale[..., None] * (HIGH_RGB - LOW_RGB)).astype(int)
+    # Light text on the darker half of the scale
+    text = np.where(scale > 0.5, "#ffffff", "#000000")
+    return np.array([
+        [f"background-color: #{r:02x}{g:02x}{b:02x}; color: {t}" for (r, g, b), t in zip(row, text_row)]
+        for row, text_row in zip(rgb, text)
+    ], dtype=object).reshape(matrix.shape)
+
+
+@timed("show_occupancy")
+def show_occupancy(agent_counts, patient_counts):
+    """
+    Renders the room occupancy heatmap and the available staff per room.
+
+    Both views are read from materialized aggregates, so their cost depends on
+    the number of rooms, roles and statuses, not on the number of records.
+
+    Parameters:
+    ----------
+    agent_counts : GroupCounts
+        Agent counts grouped by ("current_room", "role", "status").
+
+    patient_counts : GroupCounts
+        Patient counts grouped by ("location", "status").
+
+    Returns:
+    -------
+    None
+        This function does not return a value; it renders UI elements
+        directly to the Streamlit app.
+    """
+    import pandas as pd
+    st.subheader("🗺️ Room Occupancy")
+    summary = room_summary(agent_counts, patient_counts)
+    if not summary:
+        st.info("No rooms to show yet.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        # Patients per location and status, shaded by count
+        rooms, statuses, matrix = patient_counts.pivot("location", "status")
+        heatmap = pd.DataFrame(matrix, index=rooms, columns=statuses)
+        st.markdown("**Patients by location and status**")
+        st.dataframe(heatmap.style.apply(lambda df: _shade(df.to_numpy()), axis=None), use_container_width=True)
+    with col2:
+        st.markdown("**Available staff by room**")
+        df = pd.DataFrame(summary).set_index("room")
+        st.dataframe(
+            df,
+            use_container_width=True,
+            column_config={
+                "available": st.column_config.ProgressColumn(
+                    "available", format="%d", min_value=0, max_value=int(df["staff"].max()) or 1
+                ),
+            },
+        )
@@ -0,0 +1,212 @@
+import streamlit as st
+
+from utils.instrumentation import count, stage
+from utils.repository import SCHEMAS
+
+def _sort_ranks(table, field):
+    """
+    Map every category code of a field to its rank in sorted value order.
+
+    Sorting rows then compares small integers instead of decoded values, and only
+    the distinct values of the field are ever compared with each other.
+    """
+    categories = table.categories[field]
+    try:
+        order = sorted(range(len(categories)), key=lambda code: (categories[code] is None, categories[code]))
+    except TypeError:
+        # Mixed value types: fall back to comparing their string forms
+        order = sorted(range(len(categories)), key=lambda code: (categories[code] is None, str(categories[code])))
+    ranks = [0] * len(categories)
+    for rank, code in enumerate(order):
+        ranks[code] = rank
+    return ranks
+
+
+def paginate(table, rows, sort_by=None, descending=False, page=1, page_size=25):
+    """
+    Sort row ids server-side and cut out one page.
+
+    Parameters:
+    ----------
+    table : RecordTable
+        Table the row ids belong to.
+    rows : list
+        Row ids to paginate, e.g. the result of table.filter().
+    sort_by : str, optional
+        Field to sort by. Rows keep their table order when omitted.
+    descending : bool
+        Sort in descending order.
+    page : int
+        1-based page number; clamped to the valid range.
+    page_size : int
+        Number of rows per page.
+
+    Returns:
+    -------
+    tuple
+        (row ids of the page, clamped page number, total number of pages)
+    """
+    n_pages = max(1, -(-len(rows) // page_size))
+    page = min(max(1, page), n_pages)
+    if sort_by in table.columns:
+        ranks = _sort_ranks(table, sort_by)
+        column = table.columns[sort_by]
+        rows = sorted(rows, key=lambda row: ranks[column[row]], reverse=descending)
+    start = (page - 1) * page_size
+    return rows[start:start + page_size], page, n_pages
+
+
+def show_paginated_table(table, rows, key, page_size=25, changes=None):
+    """
+    Renders one sorted page of a RecordTable instead of the whole result.
+
+    Only the rows of the visible page are decoded and sent to the browser, so the
+    payload stays the same size however many rows match. The page cursor and the
+    sort settings live in `st.session_state` under keys prefixed with `key`, and so
+    survive the periodic reruns. Rows whose values changed since the page was last
+    shown are highlighted.
+
+    This is not an incremental update: `st.dataframe` has no way to patch single
+    rows, so whenever a page changes the whole page is sent again and the change
+    tracking only decides which rows are highlighted. The payload is bounded by
+    `page_size`, not by the number of changes.
+
+    When a ChangeSet is given, the changed rows are read from it instead of comparing
+    the page with its previous values, and a page showing the same rows as on the
+    previous rerun with none of them changed reuses the DataFrame built back then
+    instead of decoding the rows again.
+
+    Parameters:
+    ----------
+    table : RecordTable
+        Table holding the records.
+    rows : list
+        Row ids to display, e.g. the result of table.filter().
+    key : str
+        Unique prefix for the widget and session state keys of this table.
+    page_size : int
+        Number of rows per page.
+    changes : ChangeSet, optional
+        Changes of `table` since the last refresh, from a ChangeTracker.
+
+    Returns:
+    -------
+    None
+        This function does not return a value; it renders UI elements
+        directly to the Streamlit app.
+
+    Example:
+    -------
+    >>> show_paginated_table(agent_table, agent_table.filter(current_room="ward_A"), key="agents")
+    """
+    import pandas as pd  # imported on the first table rendered, not at startup
+    page_key, sort_key, desc_key, last_key = (f"{key}_page", f"{key}_sort", f"{key}_desc", f"{key}_last_page")
+    render_key = f"{key}_render"
+    fields = list(table.columns)
+
+    # Clamp a stored page cursor that points past the end after rows disappeared
+    n_pages = max(1, -(-len(rows) // page_size))
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+
+    col_sort, col_desc, col_page = st.columns([3, 2, 2])
+    with col_sort:
+        sort_by = st.selectbox("Sort by", fields, key=sort_key) if fields else None
+    with col_desc:
+        descending = st.checkbox("Descending", key=desc_key)
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    page_rows, page, n_pages = paginate(table, rows, sort_by, descending, page, page_size)
+
+    if changes is not None:
+        # The change set names the changed rows; an unchanged page is reused as is
+        changed = {position for position, row in enumerate(page_rows) if changes.bitmap >> row & 1}
+        signature = (id(table), tuple(page_rows), tuple(table.columns))
+        cached = st.session_state.get(render_key)
+        if not changed and cached is not None and cached[0] == signature:
+            df = cached[1]
+        else:
+            with stage("build_dataframe"):
+                df = pd.DataFrame(table.select(page_rows))
+            st.session_state[render_key] = (signature, df)
+    else:
+        with stage("build_dataframe"):
+            columns = table.select(page_rows)
+            df = pd.DataFrame(columns)
+
+        # Compare with the page pushed on the previous rerun to find rows whose values changed
+        previous = st.session_state.get(last_key, {})
+        current = {}
+        changed = set()
+        if table.key in columns:
+            for position, values in enumerate(zip(*columns.values())):
+                record_key = columns[table.key][position]
+                current[record_key] = values
+                if record_key in previous and previous[record_key] != values:
+                    changed.add(position)
+        st.session_state[last_key] = current
+
+    st.caption(f"Page {page} of {n_pages} · {len(rows)} rows · {len(changed)} changed on this page since last refresh")
+    if changed:
+        df = df.style.apply(
+            lambda row: ["background-color: #fff3cd" if row.name in changed else "" for _ in row], axis=1
+        )
+    with stage("st.dataframe"):
+        st.dataframe(df, use_container_width=True)
+    count("st.dataframe", rows=len(page_rows))
+
+
+def show_query_table(repo, dataset, filters, key, page_size=25):
+    """
+    Renders one sorted page of a repository query.
+
+    The filter, sort order and page window are passed to the repository, so a SQL
+    backend only reads the rows of the visible page. The page cursor and the sort
+    settings live in `st.session_state` under keys prefixed with `key`.
+
+    Parameters:
+    ----------
+    repo : Repository
+        Storage backend holding the records.
+    dataset : str
+        "agents" or "patients".
+    filters : dict
+        field=value predicates to apply.
+    key : str
+        Unique prefix for the widget and session state keys of this table.
+    page_size : int
+        Number of rows per page.
+
+    Returns:
+    -------
+    None
+        This function does not return a value; it renders UI elements
+        directly to the Streamlit app.
+    """
+    import pandas as pd
+    page_key, sort_key, desc_key = (f"{key}_page", f"{key}_sort", f"{key}_desc")
+    total = repo.count(dataset, **filters)
+    n_pages = max(1, -(-total // page_size))
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+
+    col_sort, col_desc, col_page = st.columns([3, 2, 2])
+    with col_sort:
+        sort_by = st.selectbox("Sort by", SCHEMAS[dataset][1], key=sort_key)
+    with col_desc:
+        descending = st.checkbox("Descending", key=desc_key)
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    with stage("query"):
+        rows = repo.records(
+            dataset, order_by=sort_by, descending=descending,
+            limit=page_size, offset=(page - 1) * page_size, **filters
+        )
+    st.caption(f"Page {page} of {n_pages} · {total} rows")
+    with stage("build_dataframe"):
+        df = pd.DataFrame(rows)
+    with stage("st.dataframe"):
+        st.dataframe(df, use_container_width=True)
+    count("st.dataframe", rows=len(rows))
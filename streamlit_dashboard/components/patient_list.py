@@ -1,10 +1,15 @@
 #Set-ExecutionPolicy -Scope Process -ExecutionPolicy RemoteSigned
 #..\venv\Scripts\Activate
 
-import pandas as pd
 import streamlit as st
 
-def show_patients(patient_data, status_filter):
+from components.paginated_table import show_paginated_table, show_query_table
+from utils.instrumentation import timed
+from utils.query_engine import RecordTable, bitmap_to_rows, popcount
+from utils.repository import Repository
+
+@timed("show_patients")
+def show_patients(patient_data, status_filter, page_size=25, changes=None):
     """
     Displays a filtered table of patients based on their current status.
     
@@ -15,8 +20,11 @@ def show_patients(patient_data, status_filter):
     
     Parameters:
     ----------
-    patient_data : list or dict
-        A collection of patient records that can be converted to a pandas DataFrame.
+    patient_data : list, dict, RecordTable or Repository
+        A collection of patient records that can be converted to a pandas DataFrame,
+        an indexed RecordTable, or a Repository. A RecordTable is filtered through
+        its bitmap index, a Repository evaluates the filter itself (e.g. in SQL);
+        in both cases only the rows of the visible page are sent to the browser.
         Each patient record should be a dictionary containing patient information.
         Expected to have a 'status' column for filtering (e.g., 'critical', 'stable').
         
@@ -24,6 +32,14 @@ def show_patients(patient_data, status_filter):
         The status value to filter patients by. Only patients with their
         'status' value matching this parameter will be displayed.
     
+    page_size : int, optional
+        Rows per page when `patient_data` is a RecordTable or Repository (default 25).
+
+    changes : ChangeSet, optional
+        Changes of a RecordTable since the last refresh, from a ChangeTracker.
+        Shows how many records of the filtered view changed, and lets the
+        unchanged page be reused instead of decoded and rebuilt.
+    
     Returns:
     -------
     None
@@ -46,18 +62,41 @@ def show_patients(patient_data, status_filter):
     >>> show_patients(patients, "critical")
     # Will display a table with John Doe and Robert Johnson who have critical status
     """
-    # Convert patient data to DataFrame
-    df = pd.DataFrame(patient_data)
-    
-    # Check if required column exists
-    if "status" not in df.columns:
-        st.warning("Missing 'status' column in patient data.")
-        st.dataframe(df)
+    if isinstance(patient_data, Repository):
+        # Storage backend: the filter, sort and page are pushed down to the repository
+        st.subheader(f"🧑‍🦽 Patients with Status: {status_filter}")
+        show_query_table(patient_data, "patients", {"status": status_filter}, key="patients", page_size=page_size)
         return
-    
-    # Filter the dataframe by status
-    filtered_df = df[df["status"] == status_filter]
+
+    if isinstance(patient_data, RecordTable):
+        # Indexed table: the filter is an index lookup and only matching rows are decoded
+        if "status" not in patient_data.columns:
+            st.warning("Missing 'status' column in patient data.")
+            show_paginated_table(patient_data, patient_data.filter(), key="patients", changes=changes)
+            return
+        bitmap = patient_data.filter_bitmap(status=status_filter)
+        rows = bitmap_to_rows(bitmap)
+    else:
+        import pandas as pd
+
+        # Convert patient data to DataFrame
+        df = pd.DataFrame(patient_data)
+
+        # Check if required column exists
+        if "status" not in df.columns:
+            st.warning("Missing 'status' column in patient data.")
+            st.dataframe(df)
+            return
+
+        # Filter the dataframe by status
+        filtered_df = df[df["status"] == status_filter]
     
     # Display results
     st.subheader(f"🧑‍🦽 Patients with Status: {status_filter}")
-    st.dataframe(filtered_df, use_container_width=True)
\ No newline at end of file
+    if isinstance(patient_data, RecordTable):
+        if changes is not None:
+            st.caption(f"{popcount(bitmap & changes.bitmap)} changed in this view · {len(changes)} changed overall since last refresh")
+        # Server-side sorting and paging: only the visible window is rendered
+        show_paginated_table(patient_data, rows, key="patients", page_size=page_size, changes=changes)
+    else:
+        st.dataframe(filtered_df, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,207 @@
+import threading
+from collections import OrderedDict
+from typing import Literal, get_args, get_origin
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from utils.json_codec import DecodeError, loads, read_bytes
+from utils.snapshot_store import file_signature
+
+
+class ValidationReport:
+    """
+    Result of validating a batch of records.
+
+    Attributes:
+        total: Number of records checked.
+        valid: Records that passed validation (model instances, or dicts in columnar mode).
+        errors: Mapping of record index to the list of error messages for that record;
+            FILE_ERROR holds problems of the file as a whole (invalid JSON, not a list).
+    """
+
+    def __init__(self, total, valid, errors):
+        self.total = total
+        self.valid = valid
+        self.errors = errors
+
+    @property
+    def ok(self):
+        """True if every record passed validation."""
+        return not self.errors
+
+    def summary(self):
+        """Return a short dict with the valid/invalid counts."""
+        return {"total": self.total, "valid": len(self.valid), "invalid": len(self.errors)}
+
+
+# Key of the errors that concern the whole file rather than one record
+FILE_ERROR = -1
+
+_adapters = {}
+
+
+def get_list_adapter(model):
+    """
+    Return the (cached) TypeAdapter validating a whole list of `model` at once.
+
+    Args:
+        model: Pydantic model class, e.g. Agent.
+
+    Returns:
+        TypeAdapter: Adapter for list[model].
+    """
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters[model] = TypeAdapter(list[model])
+    return adapter
+
+
+def _group_errors(exc):
+    # ValidationError locations start with the list index of the failing record
+    errors = {}
+    for error in exc.errors():
+        loc = error["loc"]
+        index = loc[0] if loc and isinstance(loc[0], int) else -1
+        field = ".".join(str(part) for part in loc[1:]) or "record"
+        errors.setdefault(index, []).append(f"{field}: {error['msg']}")
+    return errors
+
+
+def validate_records(records, model):
+    """
+    Validate a list of records in one bulk call, without aborting on bad records.
+
+    The whole list goes through a single list[model] adapter. Records without errors
+    are then built with model_construct(), which skips a second validation.
+
+    Args:
+        records (list): Records (dicts) to validate.
+        model: Pydantic model class, e.g. Agent or Patient.
+
+    Returns:
+        ValidationReport: Valid model instances and per-record errors.
+    """
+    adapter = get_list_adapter(model)
+    try:
+        return ValidationReport(len(records), adapter.validate_python(records), {})
+    except ValidationError as exc:
+        errors = _group_errors(exc)
+    valid = [
+        model.model_construct(**record)
+        for index, record in enumerate(records)
+        if index not in errors and isinstance(record, dict)
+    ]
+    return ValidationReport(len(records), valid, errors)
+
+
+def validate_columns(records, model):
+    """
+    Validate records column by column with array operations.
+
+    Cheaper than building models: every field is checked once for the whole batch.
+    Literal fields (such as `status`) are checked with a vectorized membership test
+    against the allowed values, other fields for presence and type.
+
+    Args:
+        records (list): Records (dicts) to validate.
+        model: Pydantic model class, e.g. Agent or Patient.
+
+    Returns:
+        ValidationReport: Valid records (as dicts) and per-record errors.
+    """
+    errors = {}
+    for field, info in model.model_fields.items():
+        present = np.fromiter((isinstance(record, dict) and field in record for record in records), dtype=bool, count=len(records))
+        column = np.array([record.get(field) if isinstance(record, dict) else None for record in records], dtype=object)
+        if get_origin(info.annotation) is Literal:
+            allowed = list(get_args(info.annotation))
+            bad = present & ~np.isin(column, allowed)
+            message = f"{field}: Input should be " + " or ".join(repr(value) for value in allowed)
+        else:
+            expected = info.annotation if isinstance(info.annotation, type) else object
+            bad = present & np.fromiter((not isinstance(value, expected) for value in column), dtype=bool, count=len(column))
+            message = f"{field}: Input should be a valid {getattr(expected, '__name__', 'value')}"
+        for index in np.flatnonzero(~present):
+            errors.setdefault(int(index), []).append(f"{field}: Field required")
+        for index in np.flatnonzero(bad):
+            errors.setdefault(int(index), []).append(message)
+    valid = [record for index, record in enumerate(records) if index not in errors]
+    return ValidationReport(len(records), valid, errors)
+
+
+class _ReportCache:
+    # Bounded LRU of validation reports keyed by file version
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            report = self._entries.get(key)
+            if report is not None:
+                self._entries.move_to_end(key)
+            return report
+
+    def put(self, key, report):
+        with self._lock:
+            self._entries[key] = report
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_reports = _ReportCache()
+
+
+def validate_file(path, model, columnar=False, use_cache=True):
+    """
+    Validate a JSON file of records, caching the report per file version.
+
+    The bulk path hands the raw bytes straight to pydantic-core (validate_json), so
+    no intermediate list of dicts is built when the file is valid. Re-validating an
+    unchanged file is a cache lookup.
+
+    Args:
+        path (str): Path to the JSON file (a list of records).
+        model: Pydantic model class, e.g. Agent or Patient.
+        columnar (bool): Use the column-wise array checks instead of building models.
+        use_cache (bool): Look the report up in, and store it into, the report cache.
+            Pass False to always validate the file again.
+
+    Returns:
+        ValidationReport: The report, or an empty report if the file is missing.
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return ValidationReport(0, [], {})
+    key = (path, signature, model, columnar)
+    report = _reports.get(key) if use_cache else None
+    if report is not None:
+        return report
+
+    try:
+        raw = read_bytes(path)
+    except FileNotFoundError:
+        return ValidationReport(0, [], {})
+    try:
+        report = _validate_raw(raw, model, columnar)
+    except DecodeError as e:
+        # Truncated or otherwise broken file: report it instead of failing the page
+        report = ValidationReport(0, [], {FILE_ERROR: [f"Invalid JSON: {e}"]})
+    if use_cache:
+        _reports.put(key, report)
+    return report
+
+
+def _validate_raw(raw, model, columnar):
+    if not columnar:
+        try:
+            valid = get_list_adapter(model).validate_json(raw)
+            return ValidationReport(len(valid), valid, {})
+        except ValidationError:
+            pass  # some records are bad (or the file is): fall back to the per-record report
+    records = loads(raw)
+    if not isinstance(records, list):
+        return ValidationReport(0, [], {FILE_ERROR: [f"Expected a list of records, got {type(records).__name__}"]})
+    return validate_columns(records, model) if columnar else validate_records(records, model)
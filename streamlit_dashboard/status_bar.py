@@ -3,42 +3,64 @@
 # allowing healthcare providers to monitor patient status and health progression over time.
 
 import streamlit as st   # Streamlit library for web application
-import pandas as pd      # Pandas for data manipulation
-import matplotlib.pyplot as plt    # Matplotlib for creating visualizations
-import matplotlib.patches as mpatches  # For custom legend elements
-import json              # For reading the JSON data file
 import time              # For refresh functionality
 
-# Load patient data from JSON file
-with open('patients.json') as f:
-    data = json.load(f)
+from components.debug_panel import show_debug_panel
+from components.health_chart import show_health_chart
+from utils.columnar_snapshot import open_health_store
+from utils.health_status import classify, status_badge
+from utils.instrumentation import METRICS, timed
+from utils.snapshot_store import file_signature
 
-# Convert JSON data to DataFrame and prepare for analysis
-df = pd.DataFrame(data)
-df['timestamp'] = pd.to_datetime(df['timestamp'])  # Convert timestamp strings to datetime objects
-df = df.sort_values(by=['id', 'timestamp'])  # Sort by patient ID and timestamp
+HEALTH_DATA_FILE = 'patients.json'
+
+# Collect the stage timings of this rerun (only while profiling is switched on)
+METRICS.start_run()
+
+
+@st.cache_resource(max_entries=2)
+@timed("load_health_store")
+def load_health_store(path, signature):
+    """
+    Open the health records once per file version, shared by all sessions.
+
+    The JSON file is compacted into memory-mapped column files on first use
+    (patients.json.columns/), so later loads and other processes skip the parse.
+    Only the current and the previous version stay cached: an evicted store
+    unmaps its generation once the last session holding it moves on, so the
+    compactor's deleted files do not stay mapped for the life of the process.
+    """
+    return open_health_store(path)
+
+
+# Load patient data through its columnar snapshot into per-patient sorted time series
+data_version = file_signature(HEALTH_DATA_FILE)
+store = load_health_store(HEALTH_DATA_FILE, data_version)
 
 # Extract list of unique patient IDs for the selector
-patient_ids = df['id'].unique()
+patient_ids = store.patient_ids()
 
 # Sidebar patient selector
 selected_id = st.sidebar.selectbox("Select Patient ID", patient_ids)
-patient_data = df[df['id'] == selected_id]  # Filter data for selected patient
 
 #--------sidebar--------
 
 # Get the most recent data entry for the selected patient
-latest_entry = patient_data.iloc[-1]
-latest_value = latest_entry['value']  # Current health score
-room_location = latest_entry['room']  # Current room location
+_, latest_value, room_location = store.latest(selected_id)  # Current health score and room location
 
 # Determine health status based on the latest health score value
-if latest_value >= 7:
-    status_color = "🟢 Stable"
-elif latest_value >= 4:
-    status_color = "🟡 Moderate"
-else:
-    status_color = "🔴 Critical"
+status_color = status_badge(latest_value)
+
+# Ward-wide board: every patient's current status classified in one array operation.
+# The body only runs while the expander is open, so a collapsed board costs nothing.
+board_panel = st.sidebar.expander("Ward status board", key="ward_board", on_change="rerun")
+if board_panel.open:
+    import pandas as pd  # Pandas for the board table, loaded on first use
+    with board_panel:
+        board_ids, board_values, board_rooms = store.latest_all()
+        board = pd.DataFrame({"id": board_ids, "room": board_rooms, "value": board_values, "status": classify(board_values)})
+        st.dataframe(board["status"].value_counts(sort=False).rename("patients"))
+        st.dataframe(board, hide_index=True)
 
 # --- Auto Refresh Settings ---
 AUTO_REFRESH_INTERVAL = 10  # seconds
@@ -62,8 +84,9 @@ with col2:
         st.rerun()  # Refresh the app
 
 # Get the full time range for the selected patient
-min_time = patient_data['timestamp'].min().to_pydatetime()
-max_time = patient_data['timestamp'].max().to_pydatetime()
+min_ns, max_ns = store.time_bounds(selected_id)
+min_time = store.to_datetime(min_ns)
+max_time = store.to_datetime(max_ns)
 
 # Sidebar time range selector
 selected_time_range = st.slider(
@@ -74,46 +97,15 @@ selected_time_range = st.slider(
     format="YYYY-MM-DD HH:mm"
 )
 
-# Filter data based on selected time range
-filtered_data = patient_data[
-    (patient_data['timestamp'] >= selected_time_range[0]) &
-    (patient_data['timestamp'] <= selected_time_range[1])
-]
-    
 # --- Health Progression Graph with Color-Coded Points ---
 st.markdown("### 📈 Health State Progression")
 
-# Define color mapping function for health scores
-def get_color(value):
-    if value >= 7:
-        return 'green'   # Stable
-    elif value >= 4:
-        return 'orange'  # Moderate
-    else:
-        return 'red'     # Critical
-
-# Generate colors for each data point based on health score
-colors = filtered_data['value'].apply(get_color)
-
-# Create visualization
-fig, ax = plt.subplots(figsize=(10, 4))
-ax.scatter(filtered_data['timestamp'], filtered_data['value'], color=colors, s=100)  # s=point size
-ax.plot(filtered_data['timestamp'], filtered_data['value'], color='lightgray', linestyle='--', alpha=0.5)
-
-ax.set_ylim(0, 10)  # Set y-axis limits for health score
-ax.set_title(f"Health Progression for {selected_id}")
-ax.set_xlabel("Time")
-ax.set_ylabel("Health Score (0–10)")
-
-# --- Custom legend creation ---
-legend_patches = [
-    mpatches.Patch(color='green', label='Low'),
-    mpatches.Patch(color='orange', label='Moderate'),
-    mpatches.Patch(color='red', label='High')
-]
-ax.legend(handles=legend_patches, title="Status")
-
-plt.xticks(rotation=45)  # Rotate x-axis labels for better readability
+# Static images are cached per (patient, range, data version); the interactive mode sends only arrays
+interactive_chart = st.sidebar.toggle("Interactive chart", value=False)
 
 # Display the graph
-st.pyplot(fig)
\ No newline at end of file
+show_health_chart(store, selected_id, selected_time_range, data_version, interactive=interactive_chart)
+
+# Timings of this rerun
+with st.sidebar:
+    show_debug_panel(METRICS.end_run())
@@ -0,0 +1,202 @@
+from collections import Counter
+
+# Agent statuses that do not count as available staff
+UNAVAILABLE_STATUSES = frozenset({"Off Duty", "Error"})
+
+
+class GroupCounts:
+    """
+    Materialized record counts per combination of grouping fields.
+
+    Equivalent to `SELECT fields..., COUNT(*) GROUP BY fields...`, kept up to date
+    instead of recomputed: adding, removing or moving one record adjusts a single
+    group and one counter per field, so the cost of a change is O(1) regardless of
+    the number of records. Every query reads the (small) set of groups or the
+    per-field value counts, never the records themselves.
+
+    Attach an instance to a RecordTable (`table.attach(counts)`) to have every
+    upsert and delete of the table maintain it.
+
+    Args:
+        fields (iterable): Grouping fields, e.g. ("current_room", "role", "status").
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.groups = Counter()  # value tuple -> number of records
+        self._values = {field: Counter() for field in self.fields}  # field -> value -> number of records
+        self.total = 0
+        self.version = 0
+
+    @classmethod
+    def from_groups(cls, fields, groups):
+        """
+        Build the counts from precomputed groups, e.g. the rows of a SQL GROUP BY.
+
+        Args:
+            fields (iterable): Grouping fields.
+            groups (dict): Value tuple (in field order) to number of records.
+
+        Returns:
+            GroupCounts: The counts.
+        """
+        counts = cls(fields)
+        for key, n in groups.items():
+            counts.add(tuple(key), n)
+        return counts
+
+    def key(self, record):
+        """Return the group of a record (a tuple of its grouping field values)."""
+        return tuple(record.get(field) for field in self.fields)
+
+    def add(self, key, n=1):
+        """Add `n` records to a group (a negative `n` removes them)."""
+        if not n:
+            return
+        remaining = self.groups[key] + n
+        if remaining > 0:
+            self.groups[key] = remaining
+        else:
+            del self.groups[key]
+        for field, value in zip(self.fields, key):
+            values = self._values[field]
+            remaining = values[value] + n
+            if remaining > 0:
+                values[value] = remaining
+            else:
+                del values[value]
+        self.total += n
+        self.version += 1
+
+    def remove(self, key, n=1):
+        """Remove `n` records from a group."""
+        self.add(key, -n)
+
+    def move(self, old, new):
+        """Move one record from group `old` to group `new`."""
+        if old != new:
+            self.add(old, -1)
+            self.add(new, 1)
+
+    def distinct(self, field):
+        """
+        Return the sorted distinct non-null values of a field, e.g. dropdown options.
+
+        Args:
+            field (str): One of the grouping fields.
+
+        Returns:
+            list: Values held by at least one record.
+        """
+        return sorted(value for value in self._values[field] if value is not None)
+
+    def _matching(self, where):
+        positions = [(self.fields.index(field), value) for field, value in where.items()]
+        for key, n in self.groups.items():
+            if all(key[i] == value for i, value in positions):
+                yield key, n
+
+    def count(self, **where):
+        """
+        Return the number of records in the groups matching field=value conditions.
+
+        Args:
+            **where: Grouping field=value pairs; no conditions counts all records.
+        """
+        if not where:
+            return self.total
+        if len(where) == 1:
+            (field, value), = where.items()
+            return self._values[field].get(value, 0)
+        return sum(n for _, n in self._matching(where))
+
+    def group_by(self, *fields, **where):
+        """
+        Roll the counts up to a subset of the grouping fields.
+
+        Args:
+            *fields: Fields to keep, e.g. ("current_room", "role").
+            **where: Grouping field=value conditions applied first.
+
+        Returns:
+            dict: Value tuple (in the order of `fields`) to number of records.
+        """
+        positions = [self.fields.index(field) for field in fields]
+        result = Counter()
+        for key, n in self._matching(where):
+            result[tuple(key[i] for i in positions)] += n
+        return dict(result)
+
+    def pivot(self, row_field, column_field, **where):
+        """
+        Return the counts as a matrix, e.g. for an occupancy heatmap.
+
+        Args:
+            row_field (str): Field whose values label the rows.
+            column_field (str): Field whose values label the columns.
+            **where: Grouping field=value conditions applied first.
+
+        Returns:
+            tuple: (row values, column values, matrix as a list of row lists).
+        """
+        cells = self.group_by(row_field, column_field, **where)
+        rows = sorted({row for row, _ in cells}, key=_sort_key)
+        columns = sorted({column for _, column in cells}, key=_sort_key)
+        matrix = [[cells.get((row, column), 0) for column in columns] for row in rows]
+        return rows, columns, matrix
+
+
+def _sort_key(value):
+    # None (records missing the field) sorts last next to strings and numbers
+    return (value is None, str(value))
+
+
+def available_staff(agent_counts, unavailable=UNAVAILABLE_STATUSES):
+    """
+    Count the available agents per room and role.
+
+    Args:
+        agent_counts (GroupCounts): Agent counts grouped by ("current_room", "role", "status").
+        unavailable (iterable): Statuses that do not count as available.
+
+    Returns:
+        dict: Room to {role: number of available agents}.
+    """
+    rooms = {}
+    for (room, role, status), n in agent_counts.group_by("current_room", "role", "status").items():
+        if status in unavailable:
+            continue
+        by_role = rooms.setdefault(room, {})
+        by_role[role] = by_role.get(role, 0) + n
+    return rooms
+
+
+def room_summary(agent_counts, patient_counts, unavailable=UNAVAILABLE_STATUSES):
+    """
+    Summarize patients and staff per room.
+
+    Args:
+        agent_counts (GroupCounts): Agent counts grouped by ("current_room", "role", "status").
+        patient_counts (GroupCounts): Patient counts grouped by ("location", "status").
+        unavailable (iterable): Agent statuses that do not count as available.
+
+    Returns:
+        list: One dict per room, sorted by room, with the number of patients, of
+        agents, of available agents and of available agents of every role.
+    """
+    staff = agent_counts.group_by("current_room")
+    patients = patient_counts.group_by("location")
+    available = available_staff(agent_counts, unavailable)
+    roles = agent_counts.distinct("role")
+    rooms = {room for room, in staff} | {room for room, in patients}
+    summary = []
+    for room in sorted(rooms, key=_sort_key):
+        by_role = available.get(room, {})
+        summary.append({
+            "room": room,
+            "patients": patients.get((room,), 0),
+            "staff": staff.get((room,), 0),
+            "available": sum(by_role.values()),
+            **{f"available {role}": by_role.get(role, 0) for role in roles},
+        })
+    return summary
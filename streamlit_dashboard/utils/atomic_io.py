@@ -0,0 +1,186 @@
+import atexit
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Marker for "nothing pending" (None is a valid JSON value)
+MISSING = object()
+
+# The process umask, read once: os.umask() can only be queried by setting it
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def dumps_compact(data):
+    """
+    Serialize data as compact UTF-8 JSON (no indentation or extra spaces).
+
+    Args:
+        data: JSON-serializable value.
+
+    Returns:
+        bytes: The encoded document.
+    """
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _fsync_dir(directory):
+    # Persist the rename itself; not supported on every platform (e.g. Windows)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path, data):
+    """
+    Replace a file's content atomically.
+
+    The data is written to a temporary file in the same directory, flushed and
+    fsynced, then renamed over the target. Readers see either the old or the new
+    content, never a truncated file, even if the process crashes mid-write. The
+    file keeps its permissions (a new file gets the usual 0666 minus umask rather
+    than the temporary file's 0600), so processes running as other users can
+    still read it.
+
+    Args:
+        path (str): Target file path.
+        data (bytes): New file content.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+def atomic_write_json(path, data):
+    """
+    Atomically replace a file with the compact JSON encoding of `data`.
+
+    Args:
+        path (str): Target file path.
+        data: JSON-serializable value.
+    """
+    atomic_write_bytes(path, dumps_compact(data))
+
+
+class CoalescingWriter:
+    """
+    Debounced JSON writer that batches rapid successive saves into one flush.
+
+    A write only records the latest data for the path and arms a timer; when the
+    debounce window expires, the latest data is written once with
+    atomic_write_json(). Ten saves within the window cost one disk write. Callers
+    must not mutate the data after handing it over; pending() gives
+    read-your-writes access until the flush.
+
+    Args:
+        window (float): Debounce window in seconds.
+    """
+
+    def __init__(self, window=0.5):
+        self.window = window
+        self.flushes = 0
+        self.coalesced = 0
+        self._pending = {}
+        self._inflight = {}
+        self._timers = {}
+        self._errors = {}
+        self._path_locks = {}
+        self._lock = threading.Lock()
+
+    def write(self, path, data):
+        """
+        Schedule `data` to be written to `path` at the end of the debounce window.
+
+        Args:
+            path (str): Target file path.
+            data: JSON-serializable value.
+        """
+        with self._lock:
+            if path in self._pending:
+                self.coalesced += 1
+            self._pending[path] = data
+            if path not in self._timers:
+                timer = threading.Timer(self.window, self.flush, args=(path,))
+                timer.daemon = True
+                self._timers[path] = timer
+                timer.start()
+
+    def pending(self, path):
+        """Return the data waiting to be (or being) written to `path`, or MISSING."""
+        with self._lock:
+            return self._pending.get(path, self._inflight.get(path, MISSING))
+
+    def pop_error(self, path):
+        """Return and clear the last error raised while flushing `path`, if any."""
+        with self._lock:
+            return self._errors.pop(path, None)
+
+    def flush(self, path=None):
+        """
+        Write pending data now.
+
+        Args:
+            path (str, optional): Only flush this path; flush everything when omitted.
+        """
+        with self._lock:
+            paths = [path] if path is not None else list(self._pending)
+        for item in paths:
+            # One flush per path at a time, from taking the data through the replace,
+            # so a timer flush and an explicit flush cannot land out of order
+            with self._path_lock(item):
+                with self._lock:
+                    timer = self._timers.pop(item, None)
+                    if timer is not None:
+                        timer.cancel()
+                    if item not in self._pending:
+                        continue
+                    data = self._inflight[item] = self._pending.pop(item)
+                try:
+                    atomic_write_json(item, data)
+                    self.flushes += 1
+                except Exception as e:
+                    logger.exception("Failed to write %s", item)
+                    with self._lock:
+                        self._errors[item] = e
+                finally:
+                    with self._lock:
+                        if self._inflight.get(item) is data:
+                            del self._inflight[item]
+
+    def _path_lock(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+
+# Process-wide writer; anything still pending is flushed on interpreter exit
+WRITER = CoalescingWriter()
+atexit.register(WRITER.flush)
@@ -0,0 +1,327 @@
+"""
+Batch mutations and bulk import/export for the manager's data files.
+
+A batch is a list of (op, record) changes: "upsert" adds a record or merges its
+fields into the existing one, "update" merges into a record that must exist and
+"delete" removes one. apply_batch() applies a whole batch to the parsed content
+of a file in memory; commit_batch() does it as one transaction on the file: the
+batch is validated completely (nothing is written if any change is invalid) and
+the result is written once, however many changes it holds.
+
+apply_batch() takes a list of records carrying their key (the dashboard's
+format) or a mapping of key to fields (the manager's original format) and keeps
+its shape; commit_batch() rewrites a file of the old mapping format as a list,
+the one shape every reader expects. Events are never mutated in place:
+import_events() appends a whole batch to the event log in one write.
+
+    changes = parse_rows(uploaded.getvalue(), "csv")   # an optional "op" column, upsert by default
+    summary = commit_batch("shared_data/agents.json", changes, "agent_id")
+"""
+import csv
+import io
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+
+from utils.atomic_io import MISSING, WRITER
+from utils.event_store import encode_event
+from utils.json_codec import DecodeError, load, loads
+
+OPS = ("upsert", "update", "delete")
+FORMATS = ("csv", "ndjson")
+# Column of an import file that selects the operation of its row
+OP_FIELD = "op"
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class BatchError(ValueError):
+    """
+    A batch was rejected as a whole; nothing was written.
+
+    Attributes:
+        errors (list): (number, message) of every invalid row or change, counted from 1.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        row, message = errors[0]
+        more = f" (and {len(errors) - 1} more)" if len(errors) > 1 else ""
+        super().__init__(f"Row {row}: {message}{more}")
+
+
+def _path_lock(path):
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def parse_rows(raw, fmt):
+    """
+    Decode an uploaded CSV or NDJSON file into a list of changes.
+
+    Every row is a record; its "op" field, if present, selects the operation
+    and is not stored. Empty CSV cells are left out, so a CSV with only some
+    columns updates only those fields.
+
+    Args:
+        raw (bytes): File content.
+        fmt (str): "csv" or "ndjson".
+
+    Returns:
+        list: (op, record) tuples in file order.
+
+    Raises:
+        BatchError: If a line is not a JSON object or an op is unknown.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    text = raw.decode("utf-8-sig")
+    if fmt == "csv":
+        rows = [
+            (number, {field: value for field, value in row.items() if field and value not in ("", None)})
+            for number, row in enumerate(csv.DictReader(io.StringIO(text)), start=1)
+        ]
+    else:
+        rows = []
+        errors = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((number, loads(line)))
+            except DecodeError as e:
+                errors.append((number, f"invalid JSON: {e}"))
+        if errors:
+            raise BatchError(errors)
+
+    changes = []
+    errors = []
+    for number, record in rows:
+        if not isinstance(record, dict):
+            errors.append((number, "not an object"))
+            continue
+        op = str(record.pop(OP_FIELD, None) or "upsert").lower()
+        if op not in OPS:
+            errors.append((number, f"unknown op {op!r}"))
+            continue
+        changes.append((op, record))
+    if errors:
+        raise BatchError(errors)
+    return changes
+
+
+def apply_batch(data, changes, key):
+    """
+    Apply a batch of changes to the parsed content of a file.
+
+    Changes are applied in order, so a batch may add a record and update it
+    later on. The input is not modified.
+
+    Args:
+        data (list or dict): Records carrying `key`, or a mapping of key to fields.
+        changes (list): (op, record) tuples; every record must hold `key`.
+        key (str): Name of the key field, e.g. "agent_id".
+
+    Returns:
+        tuple: (new data of the same shape, Counter of added/updated/deleted).
+
+    Raises:
+        BatchError: If any change is invalid; `data` is left as it was.
+    """
+    keyed = isinstance(data, dict)
+    if keyed:
+        records = {k: dict(v) if isinstance(v, dict) else v for k, v in data.items()}
+    else:
+        records = [dict(record) if isinstance(record, dict) else record for record in data]
+        # Keys are matched as strings: a CSV cell "1" names the stored record 1
+        positions = {
+            str(record[key]): index for index, record in enumerate(records)
+            if isinstance(record, dict) and record.get(key) not in (None, "")
+        }
+
+    summary = Counter()
+    errors = []
+    for number, (op, record) in enumerate(changes, start=1):
+        record_key = record.get(key)
+        if record_key in (None, ""):
+            errors.append((number, f"missing {key}"))
+            continue
+        record_key = str(record_key)
+        # The stored key is kept as it is, so an update does not turn 1 into "1"
+        fields = {field: value for field, value in record.items() if field != key}
+        exists = record_key in records if keyed else positions.get(record_key) is not None
+        if op != "upsert" and not exists:
+            errors.append((number, f"{key} {record_key!r} does not exist"))
+            continue
+
+        if op == "delete":
+            if keyed:
+                del records[record_key]
+            else:
+                records[positions.pop(record_key)] = None
+            summary["deleted"] += 1
+        elif exists:
+            current = records[record_key] if keyed else records[positions[record_key]]
+            current.update(fields)
+            summary["updated"] += 1
+        else:
+            if keyed:
+                records[record_key] = fields
+            else:
+                positions[record_key] = len(records)
+                records.append({key: record[key], **fields})
+            summary["added"] += 1
+
+    if errors:
+        raise BatchError(errors)
+    if not keyed:
+        records = [record for record in records if record is not None]
+    return records, summary
+
+
+def commit_batch(path, changes, key, default=None):
+    """
+    Apply a batch of changes to a JSON file in one transaction and one write.
+
+    The latest state of the file is read (including edits still waiting in the
+    write buffer), the whole batch is applied in memory, and the result is
+    written once with an atomic replace. Concurrent batches on the same file
+    are serialized. A file holding a mapping of key to fields is written back
+    as a list of records.
+
+    Args:
+        path (str): JSON file to change.
+        changes (list): (op, record) tuples, see apply_batch().
+        key (str): Name of the key field.
+        default (list or dict, optional): Content of a file that does not exist yet
+            (a mapping by default).
+
+    Returns:
+        Counter: Number of records added, updated and deleted.
+
+    Raises:
+        BatchError: If any change is invalid; the file is not touched.
+        DecodeError: If the current file is not valid JSON.
+    """
+    with _path_lock(path):
+        current = WRITER.pending(path)
+        if current is MISSING:
+            try:
+                current = load(path)
+            except FileNotFoundError:
+                current = {} if default is None else default
+        if not isinstance(current, (list, dict)):
+            raise BatchError([(0, f"{path} holds neither a list nor a mapping of records")])
+        if isinstance(current, dict):
+            current = to_records(current, key)
+        data, summary = apply_batch(current, changes, key)
+        if changes:
+            # Coalesced with any pending single edit, then written now rather than after the debounce window
+            WRITER.write(path, data)
+            WRITER.flush(path)
+            error = WRITER.pop_error(path)
+            if error is not None:
+                raise error
+    return summary
+
+
+def import_events(repository, changes, timestamp=None):
+    """
+    Append imported events to a repository's event log in one write.
+
+    Args:
+        repository (Repository): Repository holding the event log.
+        changes (list): (op, event) tuples from parse_rows(); only "upsert" rows
+            (the default) are accepted, since logged events are never changed.
+        timestamp (str, optional): Timestamp of events that have none; the
+            import time (UTC, ISO format) by default.
+
+    Returns:
+        int: Number of events appended.
+
+    Raises:
+        BatchError: If a row asks for another op; nothing is appended.
+    """
+    errors = [(number, f"events can only be added, not {op}d") for number, (op, _) in enumerate(changes, start=1) if op != "upsert"]
+    if errors:
+        raise BatchError(errors)
+    timestamp = timestamp or datetime.utcnow().isoformat()
+    events = [event if event.get("timestamp") else dict(event, timestamp=timestamp) for _, event in changes]
+    if events:
+        repository.append_events(events)
+    return len(events)
+
+
+def to_records(data, key):
+    """
+    Return the content of a file as a list of records carrying `key`.
+
+    Args:
+        data (list or dict): Records, or a mapping of key to fields.
+        key (str): Name of the key field.
+
+    Returns:
+        list: Record dicts (the items of a list are returned as they are).
+    """
+    if isinstance(data, dict):
+        return [{key: k, **v} for k, v in data.items() if isinstance(v, dict)]
+    return [record for record in data if isinstance(record, dict)]
+
+
+def _filled(record):
+    # Cells left empty in a table editor come back as None or NaN
+    return {field: value for field, value in record.items() if value is not None and value == value}
+
+
+def diff_records(before, after, key):
+    """
+    Turn an edited page of records into a batch.
+
+    Empty cells are ignored, so clearing a cell leaves the stored field as it was.
+
+    Args:
+        before (list): Records as they were shown.
+        after (list): Records as edited; rows without a key are ignored.
+        key (str): Name of the key field.
+
+    Returns:
+        list: "delete" changes for keys that disappeared and "upsert" changes for
+        new or modified records.
+    """
+    old = {record.get(key): _filled(record) for record in before}
+    new = {record.get(key): _filled(record) for record in after if record.get(key) not in (None, "")}
+    changes = [("delete", {key: k}) for k in old if k not in new]
+    changes += [("upsert", record) for k, record in new.items() if old.get(k) != record]
+    return changes
+
+
+def export_bytes(records, fmt):
+    """
+    Serialize records as CSV or NDJSON.
+
+    Args:
+        records (iterable): Record dicts; may be a generator, it is consumed once.
+        fmt (str): "csv" or "ndjson".
+
+    Returns:
+        bytes: The encoded file. CSV columns are the union of all fields in the
+        order they first appear; nested values are written as JSON.
+    """
+    if fmt == "ndjson":
+        return b"".join(encode_event(record) for record in records)
+    if fmt != "csv":
+        raise ValueError(f"Unknown export format: {fmt}")
+    records = list(records)
+    fields = list(dict.fromkeys(field for record in records for field in record))
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for record in records:
+        writer.writerow({
+            field: json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+            for field, value in record.items()
+        })
+    return buffer.getvalue().encode("utf-8")
+
@@ -0,0 +1,138 @@
+class ChangeSet:
+    """
+    Keys of the records that changed between two refreshes.
+
+    Attributes:
+        added: Keys of records that did not exist before.
+        updated: Keys of records whose values changed.
+        removed: Keys of records that no longer exist.
+        bitmap: For RecordTable changes, bitmap of the changed rows that still
+            hold a record (0 otherwise).
+    """
+
+    __slots__ = ("added", "updated", "removed", "bitmap")
+
+    def __init__(self, added=(), updated=(), removed=(), bitmap=0):
+        self.added = frozenset(added)
+        self.updated = frozenset(updated)
+        self.removed = frozenset(removed)
+        self.bitmap = bitmap
+
+    @property
+    def changed(self):
+        """All keys that were added, updated or removed."""
+        return self.added | self.updated | self.removed
+
+    def __len__(self):
+        return len(self.added) + len(self.updated) + len(self.removed)
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+    def __contains__(self, key):
+        return key in self.added or key in self.updated or key in self.removed
+
+    def __repr__(self):
+        return f"ChangeSet(added={len(self.added)}, updated={len(self.updated)}, removed={len(self.removed)})"
+
+
+def _fingerprint(record):
+    # Cheap identity of a record's content; falls back to repr() for unhashable values
+    items = tuple(record.items())
+    try:
+        return hash(items)
+    except TypeError:
+        return repr(items)
+
+
+class ChangeTracker:
+    """
+    Diff successive versions of a dataset by record key.
+
+    Each call compares the current data with the version seen by the previous call
+    and returns a ChangeSet, so views can re-render only when their own slice
+    changed and show "N changed since last refresh" counters. Plain record lists are
+    diffed by a per-record fingerprint; a RecordTable is asked for its changes since
+    the table version of the previous call, which needs no per-record comparison.
+
+    Args:
+        key (str): Field identifying a record, e.g. "agent_id" or "patient_id".
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.last = ChangeSet()
+        self.refreshes = 0
+        self.total_changes = 0
+        self._fingerprints = None
+        self._table = None
+        self._version = None
+        self._undo = None
+
+    def _record(self, changes, undo):
+        self._undo = undo
+        self.last = changes
+        self.refreshes += 1
+        self.total_changes += len(changes)
+        return changes
+
+    def diff(self, records):
+        """
+        Compare a full list of records with the list seen on the previous call.
+
+        The first call only records the baseline and returns an empty ChangeSet.
+
+        Args:
+            records (iterable): Current records (dicts or read-only mappings).
+
+        Returns:
+            ChangeSet: Records added, updated and removed since the previous call.
+        """
+        previous = self._fingerprints
+        undo = (previous, self._table, self._version)
+        current = {record[self.key]: _fingerprint(record) for record in records}
+        self._fingerprints = current
+        if previous is None:
+            return self._record(ChangeSet(), undo)
+        added, updated = [], []
+        for key, fingerprint in current.items():
+            old = previous.get(key)
+            if old is None:
+                added.append(key)
+            elif old != fingerprint:
+                updated.append(key)
+        removed = [key for key in previous if key not in current]
+        return self._record(ChangeSet(added, updated, removed), undo)
+
+    def diff_table(self, table):
+        """
+        Report the changes of a RecordTable since the previous call.
+
+        A table seen for the first time (or replaced by another table object)
+        only records the baseline and returns an empty ChangeSet.
+
+        Args:
+            table (RecordTable): Table to track.
+
+        Returns:
+            ChangeSet: Records added, updated and removed since the previous call.
+        """
+        undo = (self._fingerprints, self._table, self._version)
+        since = self._version if table is self._table else table.version
+        self._table, self._version = table, table.version
+        return self._record(table.changes_since(since), undo)
+
+    def defer(self):
+        """
+        Hand the changes of the last call out again on the next call.
+
+        For a caller that could not show them (e.g. a view that had to re-run
+        before rendering): the next call diffs against the version seen before
+        the last call, so its ChangeSet holds these changes plus any newer ones.
+        """
+        if self._undo is None:
+            return
+        self._fingerprints, self._table, self._version = self._undo
+        self._undo = None
+        self.refreshes -= 1
+        self.total_changes -= len(self.last)
@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from datetime import timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from utils.atomic_io import atomic_write_bytes, dumps_compact
+from utils.health_series import HealthSeriesStore
+from utils.instrumentation import count, timed
+from utils.json_codec import load_columns
+from utils.snapshot_store import file_signature
+
+try:
+    import fcntl  # POSIX advisory file locks
+except ImportError:  # Windows: concurrent compactions are not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+# Column file name -> dtype on disk (little-endian, so snapshots are portable)
+COLUMNS = {"timestamps": "<i8", "values": "<f8", "room_codes": "<i4", "offsets": "<i8"}
+
+
+def default_directory(source):
+    """Return the snapshot directory used for a health JSON file."""
+    return source + ".columns"
+
+
+def _tz_to_meta(tz):
+    # Fixed offsets (e.g. "+02:00" timestamps) are stored in seconds, zones by name
+    if tz is None:
+        return None
+    if isinstance(tz, timezone):
+        return int(tz.utcoffset(None).total_seconds())
+    return str(tz)
+
+
+def _tz_from_meta(value):
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return timezone.utc if value == 0 else timezone(timedelta(seconds=value))
+    return ZoneInfo(value)
+
+
+def _signature_to_meta(signature):
+    return list(signature) if signature is not None else None
+
+
+@contextmanager
+def _writer_lock(directory):
+    """Hold the exclusive lock that serializes writers of a snapshot directory."""
+    fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+@timed("write_columnar")
+def write_columnar(store, directory, source_signature=None):
+    """
+    Write a HealthSeriesStore as one `.npy` file per column.
+
+    The rows are written in the store's (patient, time) order, so every patient
+    owns one contiguous slice of each column; `offsets` holds the slice bounds
+    (patient i spans offsets[i]:offsets[i + 1]). Rooms are dictionary-encoded as
+    int32 codes. The column files carry a generation suffix and `meta.json` is
+    replaced last, so a reader opening the snapshot while it is rewritten sees
+    either the old or the new generation, never a mix. Writers (in any process)
+    are serialized by a lock file, and the previous generation is kept until the
+    next rewrite so a reader that just read the old meta.json can still map it.
+
+    Args:
+        store (HealthSeriesStore): Sorted health series to write.
+        directory (str): Snapshot directory (created if missing).
+        source_signature (FileSignature, optional): Signature of the JSON file the
+            store was parsed from; used by open_health_store() to detect staleness.
+
+    Returns:
+        str: The snapshot directory.
+    """
+    import pandas as pd  # writer only; opening a snapshot does not need pandas
+    os.makedirs(directory, exist_ok=True)
+    patient_ids = store.patient_ids()
+    bounds = [store._slices[pid] for pid in patient_ids]
+    offsets = np.array([start for start, _ in bounds] + [len(store)], dtype=np.int64)
+    room_codes, room_names = pd.factorize(pd.Series(store.rooms, dtype=object))  # None -> code -1
+
+    with _writer_lock(directory):
+        _write_generation(directory, store, patient_ids, offsets, room_codes, room_names, source_signature)
+    return directory
+
+
+def _write_generation(directory, store, patient_ids, offsets, room_codes, room_names, source_signature):
+    # Called with the writer lock held
+    previous = read_meta(directory)
+    generation = f"{os.getpid()}-{np.random.default_rng().integers(1 << 62):x}"
+    columns = {
+        "timestamps": store.timestamps,
+        "values": store.values,
+        "room_codes": room_codes,
+        "offsets": offsets,
+    }
+    files = {}
+    for name, array in columns.items():
+        filename = files[name] = f"{name}.{generation}.npy"
+        path = os.path.join(directory, filename)
+        np.save(path, np.ascontiguousarray(array, dtype=COLUMNS[name]))
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "rows": len(store),
+        "patient_ids": patient_ids,
+        "room_names": list(room_names),
+        "tz": _tz_to_meta(store.tz),
+        "source_signature": _signature_to_meta(source_signature),
+        "files": files,
+        "previous_files": list(previous["files"].values()) if previous else [],
+    }
+    atomic_write_bytes(os.path.join(directory, META_FILE), dumps_compact(meta))
+
+    # Drop the generations before the previous one; sessions still mapping them
+    # keep their pages until they unmap
+    keep = set(files.values()) | set(meta["previous_files"])
+    for filename in os.listdir(directory):
+        if filename.endswith(".npy") and filename not in keep:
+            try:
+                os.unlink(os.path.join(directory, filename))
+            except OSError:
+                pass
+
+
+def read_meta(directory):
+    """Return the parsed meta.json of a snapshot, or None if there is no valid snapshot."""
+    try:
+        with open(os.path.join(directory, META_FILE), "rb") as f:
+            meta = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or meta.get("format") != FORMAT_VERSION:
+        return None
+    return meta
+
+
+def _map_columns(directory, attempts=3):
+    # A concurrent rewrite may delete the generation named by the meta.json just
+    # read; the new meta.json is already in place by then, so read it again
+    for attempt in range(attempts):
+        meta = read_meta(directory)
+        if meta is None:
+            raise FileNotFoundError(f"No columnar snapshot in {directory}")
+        # An empty file cannot be mapped; an empty snapshot is read normally
+        mmap_mode = "r" if meta["rows"] else None
+        try:
+            columns = {
+                name: np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+                for name, filename in meta["files"].items()
+            }
+        except FileNotFoundError:
+            if attempt == attempts - 1:
+                raise
+            continue
+        return meta, columns
+
+
+class ColumnarHealthStore(HealthSeriesStore):
+    """
+    HealthSeriesStore backed by memory-mapped column files.
+
+    Opening a snapshot reads only meta.json; the columns are mapped read-only with
+    `np.load(mmap_mode="r")`, so a patient's series, a time window or the latest
+    value are array views whose pages are loaded on first touch. All sessions and
+    all processes opening the same snapshot share those pages through the OS page
+    cache instead of each holding a parsed copy of the JSON file.
+
+    Args:
+        directory (str): Snapshot directory written by write_columnar().
+    """
+
+    def __init__(self, directory):
+        meta, columns = _map_columns(directory)
+        self.directory = directory
+        self.meta = meta
+        self.tz = _tz_from_meta(meta["tz"])
+        self.timestamps = columns["timestamps"]
+        self.values = columns["values"]
+        self.room_codes = columns["room_codes"]
+        # Trailing None entry: code -1 (missing room) indexes it
+        self.room_names = np.array(meta["room_names"] + [None], dtype=object)
+        self._patient_ids = np.array(meta["patient_ids"], dtype=object)
+        self._offsets = offsets = np.asarray(columns["offsets"])
+        self._ends = offsets[1:] - 1
+        self._slices = {pid: (int(start), int(end)) for pid, start, end in zip(meta["patient_ids"], offsets[:-1], offsets[1:])}
+        count("open_columnar", rows=len(self.timestamps))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def ids(self):
+        """Patient id of every row (materialized on access)."""
+        return np.repeat(self._patient_ids, np.diff(self._offsets))
+
+    @property
+    def rooms(self):
+        """Room of every row (materialized on access)."""
+        return self.room_names[self.room_codes]
+
+    def series(self, patient_id):
+        """
+        Return the full series of one patient.
+
+        Timestamps and values are zero-copy views of the mapped columns; rooms are
+        decoded for the slice only.
+        """
+        s = self._slice(patient_id)
+        return self.timestamps[s], self.values[s], self.room_names[self.room_codes[s]]
+
+    def latest(self, patient_id):
+        end = self._slices[str(patient_id)][1] - 1
+        return int(self.timestamps[end]), float(self.values[end]), self.room_names[self.room_codes[end]]
+
+    def latest_all(self):
+        ends = self._ends
+        return self._patient_ids, np.asarray(self.values[ends]), self.room_names[self.room_codes[ends]]
+
+
+def is_current(directory, source):
+    """Return True if the snapshot in `directory` was built from the current version of `source`."""
+    meta = read_meta(directory)
+    signature = file_signature(source)
+    return meta is not None and signature is not None and meta.get("source_signature") == list(signature)
+
+
+@timed("compact_health")
+def compact(source, directory=None):
+    """
+    Parse a health JSON file and write it as a columnar snapshot.
+
+    Args:
+        source (str): Path to the JSON health records ({"id", "timestamp", "value", "room"}).
+        directory (str, optional): Snapshot directory; `<source>.columns` by default.
+
+    Returns:
+        str: The snapshot directory.
+    """
+    directory = directory or default_directory(source)
+    signature = file_signature(source)
+    columns = load_columns(source, ("id", "timestamp", "value", "room"))
+    store = HealthSeriesStore(columns["id"], columns["timestamp"], columns["value"], columns["room"])
+    return write_columnar(store, directory, signature)
+
+
+def open_health_store(source, directory=None):
+    """
+    Open the health series of a JSON file through its columnar snapshot.
+
+    The snapshot is (re)built when it is missing or older than the JSON file. If
+    it cannot be written (e.g. a read-only directory), the JSON file is parsed
+    into an in-memory HealthSeriesStore instead.
+
+    Args:
+        source (str): Path to the JSON health records.
+        directory (str, optional): Snapshot directory; `<source>.columns` by default.
+
+    Returns:
+        HealthSeriesStore: A ColumnarHealthStore, or an in-memory store as fallback.
+    """
+    directory = directory or default_directory(source)
+    if not is_current(directory, source):
+        try:
+            compact(source, directory)
+        except OSError:
+            logger.exception("Writing the columnar snapshot of %s failed", source)
+            columns = load_columns(source, ("id", "timestamp", "value", "room"))
+            return HealthSeriesStore(columns["id"], columns["timestamp"], columns["value"], columns["room"])
+    return ColumnarHealthStore(directory)
+
+
+if __name__ == "__main__":
+    # python -m utils.columnar_snapshot patients.json [snapshot_dir]
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m utils.columnar_snapshot SOURCE.json [DIRECTORY]")
+    print(compact(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None))
@@ -1,35 +1,24 @@
-import json
-import os
+from utils.repository import get_repository
+
 
 def load_event_log():
     """
-    Load event log data from a JSON file.
+    Load the event log from the configured repository.
 
-    Tries to read the JSON file located at '../shared_data/event_log.json'.
-    If the file is not found, returns an empty list.
+    Reads the NDJSON event log (or the events table of the SQLite backend);
+    a legacy JSON-array log is converted once when the repository is opened.
 
     Returns:
-        list: Parsed event log data or an empty list if file is missing.
+        list: All events in time order, or an empty list if there are none.
     """
-    try:
-        with open("../shared_data/event_log.json") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    return get_repository().events()
 
 
 def load_agents():
     """
-    Load agent data from a JSON file.
-
-    Tries to read the JSON file located at '../shared_data/agents.json'.
-    If the file is not found, returns an empty list.
+    Load agent data from the configured repository.
 
     Returns:
-        list: Parsed agent data or an empty list if file is missing.
+        list: Agent records carrying their "agent_id", or an empty list if there are none.
     """
-    try:
-        with open("../shared_data/agents.json") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    return get_repository().records("agents")
@@ -0,0 +1,355 @@
+import bisect
+import os
+import threading
+from datetime import datetime, timezone
+
+from utils.atomic_io import atomic_write_bytes
+from utils.event_store import append_events, encode_event, iter_records
+from utils.json_codec import DecodeError, loads
+from utils.snapshot_store import file_signature
+
+# Sort key of events without a (parsable) timestamp: before every real time
+MISSING_TS = -(2 ** 63)
+# Integer timestamps are nanoseconds; smaller magnitudes (up to ~28 hours after the
+# epoch in ns) are Unix seconds or milliseconds and are rejected rather than misread
+MIN_INT_NS = 10 ** 14
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_ns(value):
+    """
+    Convert a timestamp to integer nanoseconds since the epoch (UTC).
+
+    Args:
+        value: ISO-8601 string (a trailing "Z" or no offset means UTC), datetime
+            (naive means UTC) or an integer that already is nanoseconds. Integers
+            below MIN_INT_NS in magnitude look like Unix seconds or milliseconds and
+            are not accepted.
+
+    Returns:
+        int: Nanoseconds since the epoch, or None if the value cannot be parsed.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if abs(value) >= MIN_INT_NS else None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+
+class _Postings:
+    # Offsets of events sorted by timestamp, as two parallel lists for bisect
+    __slots__ = ("times", "offsets")
+
+    def __init__(self):
+        self.times = []
+        self.offsets = []
+
+    def add(self, ts, offset):
+        # Events arrive mostly in time order, so this is usually an O(1) append
+        i = bisect.bisect_right(self.times, ts)
+        self.times.insert(i, ts)
+        self.offsets.insert(i, offset)
+
+    def window(self, start, end):
+        lo = 0 if start is None else bisect.bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect.bisect_right(self.times, end)
+        return lo, hi
+
+
+class EventIndex:
+    """
+    Persistent side index over an NDJSON event log.
+
+    The index keeps, for every patient and every agent, a posting list of the byte
+    offsets of their events sorted by time, plus one time-sorted offset list over
+    all events. A query bisects the relevant list for its time window and reads only
+    the matching records from the log, so "events for P001 in the last hour" costs
+    O(log N + k) instead of a scan of the whole log.
+
+    The index is persisted next to the log (`<log>.idx`, one line per event) and
+    extended in place: refresh() only parses the part of the log written since the
+    last refresh, and a rotated or truncated log triggers a rebuild.
+
+    Args:
+        path (str): Path to the NDJSON event log.
+        index_path (str, optional): Path of the side index; `<path>.idx` by default.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or path + ".idx"
+        self._lock = threading.RLock()
+        self._reset(None)
+        self._load()
+        self.refresh()
+
+    def _reset(self, inode):
+        self.inode = inode
+        self.end = 0  # log offset up to which events are indexed
+        self.count_indexed = 0
+        self._all = _Postings()
+        self._patients = {}
+        self._agents = {}
+
+    def _add(self, offset, ts, patient_id, agent_id):
+        ts = MISSING_TS if ts is None else ts
+        self._all.add(ts, offset)
+        if patient_id is not None:
+            self._patients.setdefault(patient_id, _Postings()).add(ts, offset)
+        if agent_id is not None:
+            self._agents.setdefault(agent_id, _Postings()).add(ts, offset)
+        self.count_indexed += 1
+
+    def _load(self):
+        # Replay the persisted entries; anything inconsistent with the log forces a rebuild
+        signature = file_signature(self.path)
+        entries = iter_records(self.index_path)
+        header = next(entries, None)
+        if signature is None or header is None or not isinstance(header[2], dict):
+            return
+        if header[2].get("log_inode") != signature.inode:
+            return
+        self._reset(signature.inode)
+        for _, _, entry in entries:
+            if not isinstance(entry, list) or len(entry) != 5:
+                continue
+            offset, end, ts, patient_id, agent_id = entry
+            if offset < self.end:
+                continue  # already indexed (written twice by concurrent refreshes)
+            if end > signature.size:
+                break  # stale entry: the log scan in refresh() takes over from here
+            self._add(offset, ts, patient_id, agent_id)
+            self.end = end
+
+    def rebuild(self):
+        """Re-index the whole log and rewrite the side index file."""
+        with self._lock:
+            signature = file_signature(self.path)
+            self._reset(signature.inode if signature else None)
+            lines = [encode_event({"log_inode": self.inode})]
+            for offset, end, event in iter_records(self.path):
+                entry = self._entry(offset, end, event)
+                self._add(offset, *entry[2:])
+                self.end = end
+                lines.append(encode_event(entry))
+            atomic_write_bytes(self.index_path, b"".join(lines))
+
+    @staticmethod
+    def _entry(offset, end, event):
+        if not isinstance(event, dict):
+            return [offset, end, None, None, None]
+        return [offset, end, to_ns(event.get("timestamp")), event.get("patient_id"), event.get("agent_id")]
+
+    def refresh(self):
+        """
+        Index the events appended to the log since the last refresh.
+
+        Returns:
+            int: Number of newly indexed events.
+        """
+        with self._lock:
+            signature = file_signature(self.path)
+            if signature is None:
+                if self.end:
+                    self._reset(None)
+                return 0
+            if signature.inode != self.inode or signature.size < self.end:
+                # First index of this log, or the log was rotated / truncated
+                before = self.count_indexed if signature.inode == self.inode else 0
+                self.rebuild()
+                return self.count_indexed - before
+            if signature.size == self.end:
+                return 0
+
+            new_entries = []
+            for offset, end, event in iter_records(self.path, self.end):
+                entry = self._entry(offset, end, event)
+                self._add(offset, *entry[2:])
+                self.end = end
+                new_entries.append(entry)
+            if new_entries:
+                append_events(self.index_path, new_entries)
+            return len(new_entries)
+
+    def append(self, entries):
+        """
+        Append events to the log and index them.
+
+        Args:
+            entries (list): Events (dicts) to append.
+
+        Returns:
+            list: Byte offset at which each event was written.
+        """
+        with self._lock:
+            offsets = append_events(self.path, entries)
+            self.refresh()
+            return offsets
+
+    def _postings(self, patient_id, agent_id):
+        if patient_id is not None and agent_id is not None:
+            # Walk the shorter posting list and check the other id on the events
+            patients = self._patients.get(patient_id)
+            agents = self._agents.get(agent_id)
+            if patients is None or agents is None:
+                return None, {}
+            if len(patients.offsets) <= len(agents.offsets):
+                return patients, {"agent_id": agent_id}
+            return agents, {"patient_id": patient_id}
+        if patient_id is not None:
+            return self._patients.get(patient_id), {}
+        if agent_id is not None:
+            return self._agents.get(agent_id), {}
+        return self._all, {}
+
+    def _window(self, patient_id, agent_id, start, end):
+        self.refresh()
+        postings, checks = self._postings(patient_id, agent_id)
+        if postings is None:
+            return [], checks
+        start_ns = None if start is None else to_ns(start)
+        end_ns = None if end is None else to_ns(end)
+        if start is not None and start_ns is None or end is not None and end_ns is None:
+            raise ValueError(f"Invalid time window: {start!r} to {end!r}")
+        # Events without a timestamp sort first and never match a time window
+        if start_ns is not None or end_ns is not None:
+            start_ns = max(start_ns if start_ns is not None else MISSING_TS, MISSING_TS + 1)
+        lo, hi = postings.window(start_ns, end_ns)
+        return postings.offsets[lo:hi], checks
+
+    def query(self, patient_id=None, agent_id=None, start=None, end=None, limit=None, reverse=False):
+        """
+        Iterate over the events matching the given ids and time window.
+
+        Args:
+            patient_id (str, optional): Only events of this patient.
+            agent_id (str, optional): Only events of this agent.
+            start (optional): Inclusive lower time bound (ISO string, datetime or ns).
+            end (optional): Inclusive upper time bound (ISO string, datetime or ns).
+            limit (int, optional): Stop after this many events.
+            reverse (bool): Newest events first.
+
+        Yields:
+            dict: Matching events in time order (reverse time order if requested).
+
+        Raises:
+            ValueError: If a time bound cannot be parsed (see to_ns()).
+        """
+        with self._lock:
+            offsets, checks, f = self._open_window(patient_id, agent_id, start, end)
+        if reverse:
+            offsets = offsets[::-1]
+        return self._read(f, offsets, checks, limit)
+
+    def count(self, patient_id=None, agent_id=None, start=None, end=None):
+        """
+        Count the events matching the given ids and time window.
+
+        Without combining a patient and an agent this is answered from the index
+        alone in O(log N).
+        """
+        with self._lock:
+            offsets, checks = self._window(patient_id, agent_id, start, end)
+            if not checks:
+                return len(offsets)
+            offsets, checks, f = self._open_window(patient_id, agent_id, start, end)
+        return sum(1 for _ in self._read(f, offsets, checks, None))
+
+    def _open_window(self, patient_id, agent_id, start, end, attempts=3):
+        # Called with the lock held. The offsets are only valid in the file they were
+        # indexed from: open the log and check it is still that file, re-indexing a
+        # log that write_events() replaced in between. The open file keeps reading
+        # the indexed version even if the path is replaced while the caller reads.
+        for _ in range(attempts):
+            offsets, checks = self._window(patient_id, agent_id, start, end)
+            if not offsets:
+                return offsets, checks, None
+            try:
+                f = open(self.path, "rb")
+            except FileNotFoundError:
+                continue
+            if os.fstat(f.fileno()).st_ino == self.inode:
+                return offsets, checks, f
+            f.close()
+        return [], {}, None
+
+    def _read(self, f, offsets, checks, limit):
+        if f is None:
+            return
+        with f:
+            if limit == 0:
+                return
+            found = 0
+            for offset in offsets:
+                f.seek(offset)
+                try:
+                    event = loads(f.readline())
+                except DecodeError:
+                    continue
+                if not isinstance(event, dict) or any(event.get(field) != value for field, value in checks.items()):
+                    continue
+                yield event
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+
+    def patient_ids(self):
+        """Return the sorted ids of the patients that have events."""
+        with self._lock:
+            self.refresh()
+            return sorted(self._patients, key=str)
+
+    def agent_ids(self):
+        """Return the sorted ids of the agents that have events."""
+        with self._lock:
+            self.refresh()
+            return sorted(self._agents, key=str)
+
+    def time_bounds(self, patient_id=None, agent_id=None):
+        """
+        Return the (first, last) event time in ns of a patient, an agent or the log.
+
+        Returns:
+            tuple: (first, last) or None if there are no timed events.
+        """
+        with self._lock:
+            self.refresh()
+            postings, _ = self._postings(patient_id, None) if agent_id is None else self._postings(None, agent_id)
+            if postings is None:
+                return None
+            lo = bisect.bisect_right(postings.times, MISSING_TS)
+            if lo == len(postings.times):
+                return None
+            return postings.times[lo], postings.times[-1]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_event_index(path):
+    """
+    Return the process-wide index of an event log, creating it on first use.
+
+    Args:
+        path (str): Path to the NDJSON event log.
+
+    Returns:
+        EventIndex: The shared index.
+    """
+    key = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = EventIndex(path)
+        return index
@@ -0,0 +1,225 @@
+import json
+import os
+from contextlib import contextmanager
+
+from utils.atomic_io import atomic_write_bytes
+from utils.json_codec import DecodeError, load, loads
+
+try:
+    import fcntl  # POSIX advisory file locks
+except ImportError:  # Windows: rely on O_APPEND writes being atomic
+    fcntl = None
+
+
+@contextmanager
+def _locked(fd):
+    """Hold an exclusive advisory lock on an open file descriptor."""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _open_locked(path):
+    """
+    Open a log for appending and hold its exclusive lock.
+
+    write_events() replaces the log while holding the lock of the old file, so a
+    writer that was waiting for that lock reopens the path until the file it
+    locked is still the one the path names.
+    """
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            with _locked(fd):
+                try:
+                    replaced = fcntl is not None and os.stat(path).st_ino != os.fstat(fd).st_ino
+                except FileNotFoundError:
+                    replaced = True
+                if not replaced:
+                    yield fd
+                    return
+        finally:
+            os.close(fd)
+
+
+def encode_event(entry):
+    """
+    Serialize one event as a newline-framed NDJSON record.
+
+    json.dumps escapes control characters, so the only newline in the record is
+    the terminating one.
+
+    Args:
+        entry (dict): Event to serialize.
+
+    Returns:
+        bytes: The encoded record, including the trailing newline.
+    """
+    return (json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def append_events(path, entries):
+    """
+    Append events to an NDJSON log in a single locked write.
+
+    The cost is proportional to the new records only, not to the size of the log,
+    and concurrent writers never overwrite each other's records.
+
+    Args:
+        path (str): Path to the NDJSON log file. Created if missing.
+        entries (list): Events (dicts) to append.
+
+    Returns:
+        list: Byte offset at which each event was written.
+    """
+    records = [encode_event(entry) for entry in entries]
+    with _open_locked(path) as fd:
+        offset = os.lseek(fd, 0, os.SEEK_END)
+        prefix = b""
+        if offset and os.lseek(fd, offset - 1, os.SEEK_SET) >= 0 and os.read(fd, 1) != b"\n":
+            # A previous writer crashed mid-record: terminate it so ours starts on a fresh line
+            prefix = b"\n"
+            offset += 1
+        offsets = []
+        for record in records:
+            offsets.append(offset)
+            offset += len(record)
+        # O_APPEND sends the write to the end of the file regardless of the read position
+        _write_all(fd, prefix + b"".join(records))
+    return offsets
+
+
+def append_event(path, entry):
+    """
+    Append a single event to an NDJSON log.
+
+    Args:
+        path (str): Path to the NDJSON log file. Created if missing.
+        entry (dict): Event to append.
+
+    Returns:
+        int: Byte offset at which the event was written.
+    """
+    return append_events(path, [entry])[0]
+
+
+def iter_records(path, start=0):
+    """
+    Stream the raw records of an NDJSON log without loading the whole file.
+
+    A trailing record without its newline (a write still in progress) is not
+    returned, so readers never see half-written events.
+
+    Args:
+        path (str): Path to the NDJSON log file.
+        start (int): Byte offset to start reading from.
+
+    Yields:
+        tuple: (offset, end, event) for every complete record, where `end` is the
+        offset just past the record. Torn records are skipped.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            end = offset + len(line)
+            if line.strip():
+                try:
+                    event = loads(line)
+                except DecodeError:
+                    # Torn record left behind by a crashed writer
+                    event = None
+                if event is not None:
+                    yield offset, end, event
+            offset = end
+
+
+def iter_events(path, start=0):
+    """
+    Stream the events of an NDJSON log one at a time.
+
+    Args:
+        path (str): Path to the NDJSON log file.
+        start (int): Byte offset to start reading from.
+
+    Yields:
+        dict: Each complete event in file order.
+    """
+    for _, _, event in iter_records(path, start):
+        yield event
+
+
+def read_events(path):
+    """
+    Load every event of an NDJSON log into a list.
+
+    Args:
+        path (str): Path to the NDJSON log file.
+
+    Returns:
+        list: All events, or an empty list if the file is missing.
+    """
+    return list(iter_events(path))
+
+
+def write_events(path, entries):
+    """
+    Replace the whole content of an NDJSON log atomically.
+
+    Used for manual edits of the log; regular event logging goes through
+    append_event(). The log's append lock is held through the replace, so a
+    concurrent append lands either before it (and is overwritten, as with any
+    edit) or in the new file, never in the replaced one.
+
+    Args:
+        path (str): Path to the NDJSON log file.
+        entries (list): Events to write.
+    """
+    data = b"".join(encode_event(entry) for entry in entries)
+    with _open_locked(path):
+        atomic_write_bytes(path, data)
+
+
+def migrate_json_array(src, dst):
+    """
+    Convert a JSON-array event log into an NDJSON log, once.
+
+    Does nothing if the NDJSON log already exists or the JSON file is missing.
+    The original JSON file is left untouched.
+
+    Args:
+        src (str): Path to the legacy JSON-array log.
+        dst (str): Path of the NDJSON log to create.
+
+    Returns:
+        int: Number of migrated events, or 0 if nothing was migrated.
+    """
+    if os.path.exists(dst) or not os.path.exists(src):
+        return 0
+    try:
+        entries = load(src)
+    except DecodeError:
+        entries = []
+    if not isinstance(entries, list):
+        entries = [entries]
+    write_events(dst, entries)
+    return len(entries)
@@ -0,0 +1,101 @@
+import threading
+from collections import namedtuple
+
+from utils.atomic_io import atomic_write_json
+from utils.event_store import iter_records
+from utils.json_codec import DecodeError, load
+from utils.snapshot_store import file_signature
+
+# Result of one tail read: the new events, whether the consumer was rewound to the
+# start of the log (rotation or truncation, so derived state must be rebuilt), and
+# the sequence number of the last event the consumer has now seen.
+TailBatch = namedtuple("TailBatch", ["events", "reset", "seq"])
+
+
+class EventTailer:
+    """
+    Incremental reader over an NDJSON event log with per-consumer checkpoints.
+
+    Every consumer remembers the byte offset it has read up to, so a call to
+    read_new() only parses the events appended since that consumer's last call.
+    If the log was replaced (different inode) or truncated, the consumer is rewound
+    to the start and the batch is flagged with reset=True.
+
+    Args:
+        path (str): Path to the NDJSON event log.
+        checkpoint_path (str, optional): JSON file used to persist checkpoints
+            across restarts. Checkpoints are only kept in memory when omitted.
+    """
+
+    def __init__(self, path, checkpoint_path=None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self._checkpoints = {}
+        self._lock = threading.Lock()
+        if checkpoint_path:
+            try:
+                self._checkpoints = load(checkpoint_path)
+            except (FileNotFoundError, DecodeError):
+                self._checkpoints = {}
+
+    def checkpoint(self, consumer):
+        """
+        Return the stored checkpoint of a consumer.
+
+        Args:
+            consumer (str): Consumer name.
+
+        Returns:
+            dict: offset, inode and seq of the consumer (zeros if it never read).
+        """
+        with self._lock:
+            return dict(self._checkpoints.get(consumer, {"offset": 0, "inode": None, "seq": 0}))
+
+    def reset(self, consumer):
+        """Forget a consumer's checkpoint so its next read starts from the beginning."""
+        with self._lock:
+            self._checkpoints.pop(consumer, None)
+            self._save()
+
+    def read_new(self, consumer, limit=None):
+        """
+        Return the events appended since the consumer's last read.
+
+        Args:
+            consumer (str): Consumer name; each consumer has its own checkpoint.
+            limit (int, optional): Maximum number of events to return. Remaining
+                events are returned by the next call.
+
+        Returns:
+            TailBatch: New events, reset flag and the consumer's sequence number.
+        """
+        with self._lock:
+            cp = self._checkpoints.get(consumer, {"offset": 0, "inode": None, "seq": 0})
+            signature = file_signature(self.path)
+            if signature is None:
+                return TailBatch([], False, cp["seq"])
+
+            offset, seq, reset = cp["offset"], cp["seq"], False
+            if cp["inode"] is not None and (signature.inode != cp["inode"] or signature.size < offset):
+                # Log was rewritten or truncated: start over
+                offset, seq, reset = 0, 0, True
+            if signature.size == offset and not reset:
+                # Nothing new: no need to open the file
+                return TailBatch([], False, seq)
+
+            events = []
+            for _, end, event in iter_records(self.path, offset):
+                events.append(event)
+                offset = end
+                if limit is not None and len(events) >= limit:
+                    break
+
+            seq += len(events)
+            self._checkpoints[consumer] = {"offset": offset, "inode": signature.inode, "seq": seq}
+            self._save()
+            return TailBatch(events, reset, seq)
+
+    def _save(self):
+        if not self.checkpoint_path:
+            return
+        atomic_write_json(self.checkpoint_path, self._checkpoints)
@@ -0,0 +1,87 @@
+import threading
+
+from utils.snapshot_store import SNAPSHOTS
+
+
+class WatchedJSONFile:
+    """
+    A JSON file that is only re-parsed when it really changed.
+
+    Parsing goes through the process-wide snapshot store, so a file version is parsed
+    once no matter how many sessions watch it. A cheap stat() decides whether the file
+    may have changed; a file that was touched or rewritten with identical content keeps
+    its current snapshot and does not count as a change.
+    """
+
+    def __init__(self, path, default=None):
+        self.path = path
+        self.default = default
+        self.snapshot = None
+        self.data = default
+        self.version = 0
+
+    def refresh(self):
+        """
+        Pick up the current snapshot of the file.
+
+        Returns:
+            bool: True if the parsed content changed since the last refresh.
+        """
+        snapshot = SNAPSHOTS.get(self.path, default=self.default)
+        if self.snapshot is not None and (snapshot is self.snapshot or snapshot.digest == self.snapshot.digest):
+            return False
+        if self.snapshot is not None:
+            SNAPSHOTS.release(self.snapshot)
+        self.snapshot = SNAPSHOTS.acquire(snapshot)
+        self.data = snapshot.data
+        self.version += 1
+        return True
+
+
+class DataSource:
+    """
+    A set of watched JSON files shared by every session of the dashboard.
+
+    The ingestion worker calls poll() once per interval; sessions only read the
+    current snapshot, so at most one stat() per file happens per interval no
+    matter how many sessions are open.
+
+    Args:
+        paths (dict): Mapping of dataset name to JSON file path.
+    """
+
+    def __init__(self, paths):
+        self.files = {name: WatchedJSONFile(path, default=()) for name, path in paths.items()}
+        self.version = 0
+        self._polled = False
+        self._lock = threading.Lock()
+
+    def _poll_locked(self):
+        self._polled = True
+        changed = [name for name, watched in self.files.items() if watched.refresh()]
+        if changed:
+            self.version += 1
+        return changed
+
+    def poll(self):
+        """
+        Check every file for changes now.
+
+        Returns:
+            list: Names of the datasets whose content changed.
+        """
+        with self._lock:
+            return self._poll_locked()
+
+    def snapshot(self):
+        """
+        Return the current version and parsed content of every dataset.
+
+        Returns:
+            tuple: (version, dict of dataset name to frozen parsed data). The data is
+            shared between sessions; use thaw() to get a mutable copy.
+        """
+        with self._lock:
+            if not self._polled:
+                self._poll_locked()
+            return self.version, {name: watched.data for name, watched in self.files.items()}
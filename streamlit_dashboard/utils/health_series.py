@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class HealthSeriesStore:
+    """
+    Per-patient health time series with sorted timestamp arrays.
+
+    All records are sorted once by (patient id, timestamp) into flat NumPy arrays,
+    and every patient owns a contiguous slice of them. Selecting a patient is a
+    dictionary lookup and selecting a time range within that patient is a binary
+    search (`searchsorted`) instead of a boolean mask over the whole frame.
+
+    Args:
+        ids (array-like): Patient id of every record.
+        timestamps (array-like): Timestamp of every record (anything pd.to_datetime accepts).
+        values (array-like): Health score of every record.
+        rooms (array-like): Room of every record.
+    """
+
+    def __init__(self, ids, timestamps, values, rooms):
+        import pandas as pd  # only needed to parse; snapshots and conversions skip it
+        parsed = pd.to_datetime(pd.Series(timestamps))
+        self.tz = getattr(parsed.dt, "tz", None)
+        ts = parsed.dt.tz_convert("UTC").dt.tz_localize(None) if self.tz is not None else parsed
+        ts = ts.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        ids = np.asarray(ids, dtype=object).astype(str)
+
+        # One sort for the whole data set: by patient, then by time
+        order = np.lexsort((ts, ids))
+        self.ids = ids[order]
+        self.timestamps = ts[order]  # int64 nanoseconds since the epoch (UTC)
+        self.values = np.asarray(values, dtype=np.float64)[order]
+        self.rooms = np.asarray(rooms, dtype=object)[order]
+
+        unique_ids, starts = np.unique(self.ids, return_index=True)
+        ends = np.append(starts[1:], len(self.ids))
+        self._slices = {str(pid): (int(start), int(end)) for pid, start, end in zip(unique_ids, starts, ends)}
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a store from a list of {"id", "timestamp", "value", "room"} records.
+
+        Args:
+            records (list): Health records as parsed from patients.json.
+
+        Returns:
+            HealthSeriesStore: The store.
+        """
+        return cls(
+            [r["id"] for r in records],
+            [r["timestamp"] for r in records],
+            [r["value"] for r in records],
+            [r.get("room") for r in records],
+        )
+
+    def patient_ids(self):
+        """Return the sorted list of patient ids."""
+        return list(self._slices)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _slice(self, patient_id):
+        start, end = self._slices[str(patient_id)]
+        return slice(start, end)
+
+    def series(self, patient_id):
+        """
+        Return the full series of one patient as zero-copy array views.
+
+        Args:
+            patient_id (str): Patient id.
+
+        Returns:
+            tuple: (timestamps in int64 ns, values, rooms), sorted by time.
+        """
+        s = self._slice(patient_id)
+        return self.timestamps[s], self.values[s], self.rooms[s]
+
+    def latest(self, patient_id):
+        """
+        Return the most recent record of one patient.
+
+        Returns:
+            tuple: (timestamp in int64 ns, value, room).
+        """
+        end = self._slices[str(patient_id)][1] - 1
+        return int(self.timestamps[end]), float(self.values[end]), self.rooms[end]
+
+    def latest_all(self):
+        """
+        Return the most recent record of every patient in one vectorized step.
+
+        Returns:
+            tuple: (patient ids, values, rooms) arrays, one entry per patient.
+        """
+        ends = np.fromiter((end for _, end in self._slices.values()), dtype=np.int64, count=len(self._slices)) - 1
+        return self.ids[ends], self.values[ends], self.rooms[ends]
+
+    def time_bounds(self, patient_id):
+        """Return the first and last timestamp (int64 ns) of one patient."""
+        start, end = self._slices[str(patient_id)]
+        return self.timestamps[start], self.timestamps[end - 1]
+
+    def window(self, patient_id, start, end):
+        """
+        Return the part of a patient's series inside a closed time range.
+
+        Args:
+            patient_id (str): Patient id.
+            start: Range start (datetime, Timestamp or int64 ns).
+            end: Range end (datetime, Timestamp or int64 ns).
+
+        Returns:
+            tuple: (timestamps, values, rooms) array views for the range.
+        """
+        ts, values, rooms = self.series(patient_id)
+        lo = np.searchsorted(ts, self.to_ns(start), side="left")
+        hi = np.searchsorted(ts, self.to_ns(end), side="right")
+        return ts[lo:hi], values[lo:hi], rooms[lo:hi]
+
+    def to_ns(self, moment):
+        """Convert a datetime-like value into int64 nanoseconds (UTC)."""
+        if isinstance(moment, (int, np.integer)):
+            return int(moment)
+        if type(moment) is datetime:
+            # Plain datetimes (the slider's values) are converted without pandas
+            if moment.tzinfo is None:
+                localize = getattr(self.tz, "localize", None)  # pytz zones
+                moment = localize(moment) if localize else moment.replace(tzinfo=self.tz or timezone.utc)
+            delta = moment - _EPOCH
+            return (delta.days * 86_400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1_000
+        import pandas as pd
+        stamp = pd.Timestamp(moment)
+        if stamp.tzinfo is None and self.tz is not None:
+            stamp = stamp.tz_localize(self.tz)
+        return stamp.value
+
+    def to_datetime(self, ns):
+        """Convert int64 nanoseconds back into a Python datetime in the data's timezone."""
+        moment = _EPOCH + timedelta(microseconds=int(ns) // 1_000)
+        return moment.astimezone(self.tz) if self.tz is not None else moment.replace(tzinfo=None)
+
+
+def lttb(x, y, threshold):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Keeps the first and last point and, for every bucket in between, the point
+    forming the largest triangle with the previously kept point and the average of
+    the next bucket. The visual shape of the line is preserved with `threshold`
+    points regardless of the input length.
+
+    Args:
+        x (np.ndarray): Sorted x values (e.g. int64 timestamps).
+        y (np.ndarray): y values.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Indices of the kept points, in ascending order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = xf[next_lo:next_hi].mean() if next_hi > next_lo else xf[-1]
+        avg_y = yf[next_lo:next_hi].mean() if next_hi > next_lo else yf[-1]
+        # Twice the triangle area for every candidate in the bucket, vectorized
+        area = np.abs(
+            (xf[previous] - avg_x) * (yf[lo:hi] - yf[previous])
+            - (xf[previous] - xf[lo:hi]) * (avg_y - yf[previous])
+        )
+        previous = lo + int(np.argmax(area)) if hi > lo else lo
+        kept[i + 1] = previous
+    return kept
+
+
+def minmax_downsample(x, y, n_buckets):
+    """
+    Downsample a series by keeping the minimum and maximum of every bucket.
+
+    Cheaper than LTTB and guarantees that spikes (e.g. a critical dip) stay visible.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): y values.
+        n_buckets (int): Number of equally sized buckets; at most 2 points each.
+
+    Returns:
+        np.ndarray: Indices of the kept points, in ascending order.
+    """
+    n = len(x)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    bucket = (np.arange(n) * n_buckets) // n
+    # Sort by (bucket, y): the first entry of a bucket is its min, the last its max
+    order = np.lexsort((y, bucket))
+    first = np.searchsorted(bucket[order], np.arange(n_buckets), side="left")
+    last = np.searchsorted(bucket[order], np.arange(n_buckets), side="right") - 1
+    return np.unique(np.concatenate((order[first], order[last])))
+
+
+def downsample(x, y, max_points, method="lttb"):
+    """
+    Reduce a series to at most `max_points` points for plotting.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): y values.
+        max_points (int): Point budget, typically the plot width in pixels.
+        method (str): "lttb" or "minmax".
+
+    Returns:
+        np.ndarray: Indices of the kept points.
+    """
+    if method == "minmax":
+        return minmax_downsample(x, y, max_points // 2)
+    return lttb(x, y, max_points)
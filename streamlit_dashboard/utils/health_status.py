@@ -0,0 +1,77 @@
+import numpy as np
+
+# Health score bands from lowest to highest: (lower bound, label, chart color, badge).
+# A score belongs to the last band whose lower bound it reaches. Colors are hex
+# strings, which both matplotlib and st.scatter_chart take as literal colors.
+HEALTH_BANDS = (
+    (-np.inf, "Critical", "#ff0000", "🔴"),
+    (4, "Moderate", "#ffa500", "🟡"),
+    (7, "Stable", "#008000", "🟢"),
+)
+# Chart color of a missing score
+MISSING_COLOR = "#808080"
+
+_BOUNDS = np.array([band[0] for band in HEALTH_BANDS[1:]], dtype=np.float64)
+STATUS_LABELS = [band[1] for band in HEALTH_BANDS]
+STATUS_COLORS = np.array([band[2] for band in HEALTH_BANDS], dtype=object)
+STATUS_BADGES = [band[3] for band in HEALTH_BANDS]
+
+
+def classify_codes(values):
+    """
+    Classify health scores into band codes in a single array operation.
+
+    Args:
+        values (array-like): Health scores.
+
+    Returns:
+        np.ndarray: Band index per score (0 = Critical, ...), -1 for missing scores.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.digitize(values, _BOUNDS)
+    return np.where(np.isnan(values), -1, codes)
+
+
+def classify(values):
+    """
+    Classify health scores into an ordered categorical of status labels.
+
+    Args:
+        values (array-like): Health scores.
+
+    Returns:
+        pd.Categorical: "Critical", "Moderate" or "Stable" per score (NaN if missing).
+    """
+    import pandas as pd
+    return pd.Categorical.from_codes(classify_codes(values), categories=STATUS_LABELS, ordered=True)
+
+
+def status_colors(values):
+    """
+    Return the chart color of every health score.
+
+    Args:
+        values (array-like): Health scores.
+
+    Returns:
+        np.ndarray: Hex color per score.
+    """
+    codes = classify_codes(values)
+    return np.where(codes >= 0, STATUS_COLORS[np.maximum(codes, 0)], MISSING_COLOR)
+
+
+def status_badge(value):
+    """
+    Return the badge text for a single health score, e.g. "🟢 Stable".
+
+    Args:
+        value (float): Health score.
+
+    Returns:
+        str: Emoji badge and status label.
+    """
+    code = int(classify_codes([value])[0])
+    if code < 0:
+        return "⚪ Unknown"
+    return f"{STATUS_BADGES[code]} {STATUS_LABELS[code]}"
+
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Version of a source that was never polled successfully
+_UNSET = object()
+
+
+class IngestionWorker:
+    """
+    Background thread that polls the data sources and publishes their versions.
+
+    One worker runs per process. Every `interval` seconds it calls each source's
+    poll function, which does the actual I/O (stat, re-parse, query) and returns a
+    hashable version of the source. Whenever one of the versions moves, the worker's
+    own `version` counter is bumped. Sessions never do the polling themselves: they
+    compare the published version with the one they last displayed and only then
+    read the already parsed data from the shared store, so neither a slow file nor a
+    waiting viewer ties up a script thread.
+
+    Args:
+        sources (dict): Mapping of source name to a poll function returning the
+            current version of that source.
+        interval (float): Seconds between two polls.
+    """
+
+    def __init__(self, sources, interval=2.0):
+        self.sources = dict(sources)
+        self.interval = interval
+        self.version = 0
+        self.polls = 0
+        self.errors = 0
+        self.last_poll_seconds = 0.0
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        """True while the polling thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Poll once, then start the polling thread (no-op if already running)."""
+        with self._lock:
+            if self.running:
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ingestion-worker", daemon=True)
+        self.poll()
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the polling thread and wait for it to exit."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        """
+        Poll every source now.
+
+        Returns:
+            list: Names of the sources whose version changed.
+        """
+        started = time.perf_counter()
+        versions, errors = {}, 0
+        for name, poll in self.sources.items():
+            try:
+                versions[name] = poll()
+            except Exception:
+                # A failing source keeps its last published version
+                errors += 1
+                logger.exception("Polling %s failed", name)
+        with self._lock:
+            changed = [name for name, version in versions.items() if self._versions.get(name, _UNSET) != version]
+            self._versions.update(versions)
+            self.polls += 1
+            self.errors += errors
+            self.last_poll_seconds = time.perf_counter() - started
+            if changed:
+                self.version += 1
+        return changed
+
+    def stats(self):
+        """Return the worker's counters."""
+        with self._lock:
+            return {
+                "running": self.running,
+                "version": self.version,
+                "polls": self.polls,
+                "errors": self.errors,
+                "last_poll_ms": round(self.last_poll_seconds * 1000, 3),
+                "interval_s": self.interval,
+            }
@@ -0,0 +1,291 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Profiling is off unless DASHBOARD_PROFILE is set; it can also be toggled at runtime
+_enabled = os.environ.get("DASHBOARD_PROFILE", "").lower() in ("1", "true", "yes")
+_NOOP = nullcontext()
+
+
+def enabled():
+    """Return True if timings are being recorded."""
+    return _enabled
+
+
+def set_enabled(value):
+    """Turn recording on or off for the whole process."""
+    global _enabled
+    _enabled = bool(value)
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets.
+
+    Args:
+        buckets (tuple): Sorted bucket upper bounds in seconds.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class RunRecord:
+    """
+    Timings and volumes of one script run (one Streamlit rerun).
+
+    Attributes:
+        stages: Mapping of stage name to {"calls", "seconds", "bytes", "rows"}.
+        started: perf_counter() value when the run started.
+        total: Wall time of the whole run in seconds, set by end_run().
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.total = None
+
+    def add(self, stage, seconds=0.0, bytes_read=0, rows=0, calls=1):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = {"calls": 0, "seconds": 0.0, "bytes": 0, "rows": 0}
+        entry["calls"] += calls
+        entry["seconds"] += seconds
+        entry["bytes"] += bytes_read
+        entry["rows"] += rows
+
+
+class Metrics:
+    """
+    Process-wide stage metrics: latency histograms plus bytes read and rows rendered.
+
+    Stages observed while a run is active on the calling thread (Streamlit runs each
+    session's script in its own thread) are also added to that run's record.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.bytes_read = {}
+        self.rows = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start_run(self):
+        """Start recording a new run on this thread and return its record."""
+        record = self._local.run = RunRecord()
+        return record
+
+    def end_run(self):
+        """Finish the run of this thread and return its record (None if none was active)."""
+        record = getattr(self._local, "run", None)
+        self._local.run = None
+        if record is not None:
+            record.total = time.perf_counter() - record.started
+            self.observe("rerun", record.total)
+        return record
+
+    def observe(self, stage, seconds=0.0, bytes_read=0, rows=0, calls=1):
+        """
+        Record one observation of a stage.
+
+        Args:
+            stage (str): Stage name, e.g. "load_json".
+            seconds (float): Time spent in the stage.
+            bytes_read (int): Bytes read by the stage.
+            rows (int): Rows rendered by the stage.
+            calls (int): 1 for a timed call, 0 for a volume-only observation
+                (which does not touch the latency histogram).
+        """
+        with self._lock:
+            if calls:
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = Histogram()
+                histogram.observe(seconds)
+            if bytes_read:
+                self.bytes_read[stage] = self.bytes_read.get(stage, 0) + bytes_read
+            if rows:
+                self.rows[stage] = self.rows.get(stage, 0) + rows
+        record = getattr(self._local, "run", None)
+        if record is not None:
+            record.add(stage, seconds, bytes_read, rows, calls)
+
+    def reset(self):
+        """Drop every recorded metric."""
+        with self._lock:
+            self.histograms.clear()
+            self.bytes_read.clear()
+            self.rows.clear()
+
+    def to_dict(self):
+        """Return the metrics as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {
+                        "count": h.count,
+                        "sum": h.sum,
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.counts)),
+                    }
+                    for stage, h in self.histograms.items()
+                },
+                "bytes_read": dict(self.bytes_read),
+                "rows_rendered": dict(self.rows),
+            }
+
+    def to_json(self):
+        """Return the metrics as a JSON document."""
+        return json.dumps(self.to_dict(), default=str)
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP dashboard_stage_seconds Latency of dashboard stages.",
+            "# TYPE dashboard_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'dashboard_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'dashboard_stage_seconds_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'dashboard_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            lines += ["# HELP dashboard_bytes_read_total Bytes read per stage.", "# TYPE dashboard_bytes_read_total counter"]
+            lines += [f'dashboard_bytes_read_total{{stage="{s}"}} {v}' for s, v in sorted(self.bytes_read.items())]
+            lines += ["# HELP dashboard_rows_rendered_total Rows rendered per stage.", "# TYPE dashboard_rows_rendered_total counter"]
+            lines += [f'dashboard_rows_rendered_total{{stage="{s}"}} {v}' for s, v in sorted(self.rows.items())]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def _timing(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe(name, time.perf_counter() - start)
+
+
+def stage(name):
+    """
+    Context manager timing a block as one call of stage `name`.
+
+    Returns a shared no-op context manager when profiling is disabled.
+
+    Example:
+        with stage("build_dataframe"):
+            df = pd.DataFrame(rows)
+    """
+    if not _enabled:
+        return _NOOP
+    return _timing(name)
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as stage `name`.
+
+    When profiling is disabled the wrapper only checks one flag before calling
+    the function.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                METRICS.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def count(name, bytes_read=0, rows=0):
+    """Record bytes read and/or rows rendered by stage `name` (no-op when disabled)."""
+    if _enabled:
+        METRICS.observe(name, bytes_read=bytes_read, rows=rows, calls=0)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = METRICS.to_json().encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = METRICS.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=None, host="127.0.0.1"):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a background thread.
+
+    Only one server is started per process; later calls return the running one.
+
+    Args:
+        port (int, optional): Port to listen on. Defaults to DASHBOARD_METRICS_PORT;
+            nothing is started when neither is set.
+        host (str): Interface to bind.
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if no port is configured.
+    """
+    global _server
+    port = port or int(os.environ.get("DASHBOARD_METRICS_PORT", 0) or 0)
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
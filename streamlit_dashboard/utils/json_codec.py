@@ -0,0 +1,152 @@
+import json
+
+from utils.instrumentation import count, stage, timed
+
+# Fastest available decoder; the stdlib json module is always there as a fallback.
+# orjson and msgspec both return the same plain Python values as json.loads.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+    DecodeError = orjson.JSONDecodeError  # subclass of json.JSONDecodeError
+    _loads = orjson.loads
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    DecodeError = msgspec.DecodeError
+    _loads = msgspec.json.decode
+else:
+    BACKEND = "json"
+    DecodeError = json.JSONDecodeError
+    _loads = json.loads
+
+
+def loads(raw):
+    """
+    Decode a JSON document with the fastest available backend.
+
+    Args:
+        raw (bytes | str): Encoded document.
+
+    Returns:
+        The decoded value (dicts, lists, str, int, float, bool or None).
+
+    Raises:
+        DecodeError: If the document is not valid JSON.
+    """
+    return _loads(raw)
+
+
+def read_bytes(path):
+    """Return the raw content of a file."""
+    with stage("read_file"), open(path, "rb") as f:
+        raw = f.read()
+    count("read_file", bytes_read=len(raw))
+    return raw
+
+
+@timed("load_json")
+def load(path):
+    """
+    Read and decode a JSON file.
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        The decoded value.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        DecodeError: If the file is not valid JSON.
+    """
+    return _loads(read_bytes(path))
+
+
+def decode_models(raw, model):
+    """
+    Decode a JSON array straight into a list of pydantic models.
+
+    The bytes go directly to pydantic-core's parser through a list[model] adapter,
+    so no intermediate list of dicts is built.
+
+    Args:
+        raw (bytes | str): Encoded JSON array of records.
+        model: Pydantic model class, e.g. Agent or Patient.
+
+    Returns:
+        list: Model instances.
+
+    Raises:
+        pydantic.ValidationError: If the document is not valid JSON or a record
+            does not match the model.
+    """
+    from models.validation import get_list_adapter  # models import this module
+
+    return get_list_adapter(model).validate_json(raw)
+
+
+_row_types = {}
+
+
+def _row_type(fields):
+    # msgspec struct holding only the requested fields; unknown keys are skipped
+    row_type = _row_types.get(fields)
+    if row_type is None:
+        row_type = _row_types[fields] = list[msgspec.defstruct("Row", [(field, object, None) for field in fields])]
+    return row_type
+
+
+def decode_columns(raw, fields):
+    """
+    Decode a JSON array of records into one list per field.
+
+    With msgspec the records are decoded into slotted structs that only hold the
+    requested fields, so no per-record dict is built; the other backends decode
+    the array and transpose it in a single pass. Missing fields become None.
+
+    Args:
+        raw (bytes | str): Encoded JSON array of records.
+        fields (list): Names of the fields to extract.
+
+    Returns:
+        dict: Mapping of field name to the list of its values, in record order.
+
+    Raises:
+        DecodeError: If the document is not valid JSON.
+    """
+    fields = tuple(fields)
+    if msgspec is not None:
+        try:
+            rows = msgspec.json.decode(raw, type=_row_type(fields))
+        except msgspec.DecodeError:
+            # Not an array of objects (msgspec.ValidationError) or not JSON at all: the
+            # generic path skips the former and raises this module's DecodeError for the latter
+            rows = None
+        if rows is not None:
+            return {field: [getattr(row, field) for row in rows] for field in fields}
+    records = _loads(raw)
+    if not isinstance(records, list):
+        records = [records]
+    records = [record for record in records if isinstance(record, dict)]
+    return {field: [record.get(field) for record in records] for field in fields}
+
+
+def load_columns(path, fields):
+    """
+    Read a JSON file of records into one list per field (see decode_columns).
+
+    Args:
+        path (str): Path to the JSON file.
+        fields (list): Names of the fields to extract.
+
+    Returns:
+        dict: Mapping of field name to the list of its values.
+    """
+    return decode_columns(read_bytes(path), fields)
@@ -0,0 +1,300 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.event_tail import EventTailer
+from utils.instrumentation import timed
+
+DISCHARGE_EVENT = "discharged"
+# Dwell time of a stay that has not ended yet
+ONGOING = -1
+
+SUMMARY_COLUMNS = [
+    "patient_id", "events", "first_seen", "last_seen", "current_location",
+    "transfers", "locations", "discharged", "length_of_stay_h",
+]
+
+
+def to_columns(events):
+    """
+    Extract the journey columns of a batch of events in one vectorized pass.
+
+    Events without a patient id or a parsable timestamp are dropped.
+
+    Args:
+        events (list): Event dicts from the log.
+
+    Returns:
+        tuple: (patient ids, int64 ns timestamps, locations, event names) arrays.
+    """
+    n = len(events)
+    patient_ids = np.array([event.get("patient_id") for event in events], dtype=object)
+    # ISO8601 with or without an offset; naive timestamps are taken as UTC
+    stamps = pd.to_datetime(
+        pd.Series([event.get("timestamp") for event in events], dtype=object),
+        utc=True, format="ISO8601", errors="coerce",
+    )
+    timestamps = stamps.dt.tz_convert(None).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    locations = np.array([event.get("location") for event in events], dtype=object)
+    names = np.array([event.get("event") for event in events], dtype=object)
+    keep = stamps.notna().to_numpy() & (patient_ids != None)  # noqa: E711 (element-wise)
+    if n and not keep.all():
+        return patient_ids[keep], timestamps[keep], locations[keep], names[keep]
+    return patient_ids, timestamps, locations, names
+
+
+def _dwell(timestamps, events):
+    # Time until the next event of the same journey; the last stay is open unless discharged
+    dwell = np.empty(len(timestamps), dtype=np.int64)
+    dwell[:-1] = np.diff(timestamps)
+    if len(dwell):
+        dwell[-1] = 0 if events[-1] == DISCHARGE_EVENT else ONGOING
+    return dwell
+
+
+class Journey:
+    """
+    The time-ordered events of one patient.
+
+    Attributes:
+        patient_id: Patient id.
+        timestamps: int64 ns timestamps (UTC), ascending.
+        locations: Location of every event.
+        events: Event name of every event (admitted, transferred, ...).
+        dwell: Nanoseconds spent at the event's location until the next event;
+            ONGOING for a stay that has not ended.
+    """
+
+    __slots__ = ("patient_id", "timestamps", "locations", "events", "dwell", "summary")
+
+    def __init__(self, patient_id, timestamps, locations, events, dwell=None):
+        self.patient_id = patient_id
+        self.timestamps = timestamps
+        self.locations = locations
+        self.events = events
+        self.dwell = _dwell(timestamps, events) if dwell is None else dwell
+        self.summary = self._summarize()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def transfers(self):
+        """Number of moves to a different location."""
+        return int(np.count_nonzero(self.locations[1:] != self.locations[:-1]))
+
+    @property
+    def discharged(self):
+        """True if the last event of the journey is a discharge."""
+        return len(self.events) > 0 and self.events[-1] == DISCHARGE_EVENT
+
+    def _summarize(self):
+        first, last = int(self.timestamps[0]), int(self.timestamps[-1])
+        return (
+            self.patient_id, len(self), first, last, self.locations[-1], self.transfers,
+            len(set(self.locations.tolist())), self.discharged, (last - first) / 3.6e12,
+        )
+
+    def extend(self, timestamps, locations, events):
+        """
+        Return the journey with more events merged in (in time order).
+
+        Events arriving in order, the common case, are appended without a sort.
+        """
+        timestamps = np.concatenate((self.timestamps, timestamps))
+        locations = np.concatenate((self.locations, locations))
+        events = np.concatenate((self.events, events))
+        if np.any(np.diff(timestamps) < 0):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, locations, events = timestamps[order], locations[order], events[order]
+        return Journey(self.patient_id, timestamps, locations, events)
+
+    def stays(self, now_ns=None):
+        """
+        Return the journey as one row per event with its start, end and dwell time.
+
+        Args:
+            now_ns (int, optional): End of an ongoing stay; the last event time by default.
+
+        Returns:
+            pd.DataFrame: location, event, start, end and dwell_h columns.
+        """
+        ends = self.timestamps + np.where(self.dwell == ONGOING, 0, self.dwell)
+        if len(self) and self.dwell[-1] == ONGOING and now_ns is not None:
+            ends[-1] = max(int(now_ns), int(self.timestamps[-1]))
+        return pd.DataFrame({
+            "location": self.locations,
+            "event": self.events,
+            "start": pd.to_datetime(self.timestamps, utc=True),
+            "end": pd.to_datetime(ends, utc=True),
+            "dwell_h": (ends - self.timestamps) / 3.6e12,
+        })
+
+    def dwell_by_location(self, now_ns=None):
+        """Return the total hours spent per location, longest first."""
+        stays = self.stays(now_ns)
+        return stays.groupby("location", sort=False)["dwell_h"].sum().sort_values(ascending=False)
+
+
+class JourneyEngine:
+    """
+    Per-patient journeys reconstructed from the NDJSON event log.
+
+    The first build groups the whole log in one vectorized pass: the events are
+    sorted once by (patient, time) and every journey is a slice of the sorted
+    arrays. After that, refresh() tails the log and only the journeys of patients
+    with new events are extended; a rewritten or truncated log is rebuilt. The
+    summary table of all journeys is cached until a journey changes.
+
+    Args:
+        path (str): Path to the NDJSON event log.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self.journeys = {}
+        self._tailer = EventTailer(path)
+        self._summary = None
+        self._lock = threading.RLock()
+
+    @timed("journeys_build")
+    def build(self, events):
+        """
+        Replace all journeys with the ones of a full list of events.
+
+        Args:
+            events (list): Event dicts, in any order.
+        """
+        patient_ids, timestamps, locations, names = to_columns(events)
+        if not len(patient_ids):
+            with self._lock:
+                self.journeys = {}
+                self._changed()
+            return
+        codes, uniques = pd.factorize(patient_ids)
+        # One stable sort by (patient, time); ties keep their order in the log
+        order = np.lexsort((timestamps, codes))
+        codes, timestamps = codes[order], timestamps[order]
+        locations, names = locations[order], names[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+
+        # Dwell times of all journeys at once; the last event of each journey is patched
+        dwell = np.empty(len(timestamps), dtype=np.int64)
+        dwell[:-1] = np.diff(timestamps)
+        last = ends - 1
+        dwell[last] = np.where(names[last] == DISCHARGE_EVENT, 0, ONGOING)
+
+        with self._lock:
+            self.journeys = {
+                uniques[codes[start]]: Journey(
+                    uniques[codes[start]], timestamps[start:end], locations[start:end], names[start:end], dwell[start:end]
+                )
+                for start, end in zip(starts, ends)
+            }
+            self._changed()
+
+    @timed("journeys_update")
+    def update(self, events):
+        """
+        Merge newly appended events into the journeys of their patients.
+
+        Args:
+            events (list): New event dicts.
+
+        Returns:
+            int: Number of journeys that changed.
+        """
+        patient_ids, timestamps, locations, names = to_columns(events)
+        if not len(patient_ids):
+            return 0
+        codes, uniques = pd.factorize(patient_ids)
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        with self._lock:
+            for start, end in zip(starts, ends):
+                rows = order[start:end]
+                patient_id = uniques[codes[start]]
+                journey = self.journeys.get(patient_id)
+                if journey is None:
+                    rows = rows[np.argsort(timestamps[rows], kind="stable")]
+                    self.journeys[patient_id] = Journey(patient_id, timestamps[rows], locations[rows], names[rows])
+                else:
+                    self.journeys[patient_id] = journey.extend(timestamps[rows], locations[rows], names[rows])
+            self._changed()
+        return len(starts)
+
+    def _changed(self):
+        self.version += 1
+        self._summary = None
+
+    def refresh(self):
+        """
+        Catch up with the event log.
+
+        Returns:
+            bool: True if any journey changed.
+        """
+        with self._lock:
+            batch = self._tailer.read_new("journeys")
+            if batch.reset or self.version == 0:
+                self.build(batch.events)
+                return True
+            if batch.events:
+                return self.update(batch.events) > 0
+            return False
+
+    def journey(self, patient_id):
+        """Return the journey of a patient, or None."""
+        with self._lock:
+            return self.journeys.get(patient_id)
+
+    def patient_ids(self):
+        """Return the sorted ids of the patients with a journey."""
+        with self._lock:
+            return sorted(self.journeys, key=str)
+
+    def summary(self):
+        """
+        Return one row per journey (cached until a journey changes).
+
+        Returns:
+            pd.DataFrame: SUMMARY_COLUMNS, with first_seen/last_seen as UTC datetimes.
+        """
+        with self._lock:
+            if self._summary is None:
+                df = pd.DataFrame.from_records(
+                    [journey.summary for journey in self.journeys.values()], columns=SUMMARY_COLUMNS
+                )
+                df["first_seen"] = pd.to_datetime(df["first_seen"], utc=True)
+                df["last_seen"] = pd.to_datetime(df["last_seen"], utc=True)
+                self._summary = df.sort_values("patient_id", ignore_index=True)
+            return self._summary
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_journey_engine(path):
+    """
+    Return the process-wide journey engine of an event log, brought up to date.
+
+    Args:
+        path (str): Path to the NDJSON event log.
+
+    Returns:
+        JourneyEngine: The shared engine.
+    """
+    key = os.path.abspath(path)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = JourneyEngine(path)
+    engine.refresh()
+    return engine
@@ -1,13 +1,27 @@
 # --- Imports ---
 import streamlit as st               # Streamlit for building the web-based UI
 import json                         # JSON module for reading and writing data
-import os                           # OS module to check file existence
+from collections import Counter     # Counting the operations of an import
 from datetime import datetime       # Used for timestamping events
+from functools import partial       # Deferred export callbacks
 
-# --- File Paths ---
-AGENT_FILE = "shared_data/agents.json"     # File to store agent records
-PATIENT_FILE = "shared_data/patient.json"  # File to store patient records
-EVENT_FILE = "shared_data/event_log.json"  # File to store event logs
+from utils.atomic_io import MISSING, WRITER
+from utils.batch_ops import BatchError, diff_records, export_bytes, import_events, parse_rows
+from utils.event_store import read_events, write_events
+from utils.json_codec import DecodeError, load
+from utils.repository import SCHEMAS, get_repository
+from utils.snapshot_store import file_signature
+
+# --- Data Access ---
+# Every tab reads and writes through the same repository as the dashboard: the JSON
+# files by default, the SQLite database with DASHBOARD_BACKEND=sqlite
+repo = get_repository()
+
+# Datasets offered by the editor and the bulk import/export
+DATASETS = {"Agents": "agents", "Patients": "patients", "Event Log": "events"}
+ACTIONS = {"Add": "upsert", "Update": "update", "Delete": "delete"}  # Form action -> batch op
+RAW_EDIT_LIMIT = 1_000_000  # bytes; larger files are only edited page by page
+PAGE_SIZE = 50  # records per page of the tables
 
 # --- Utility Functions ---
 
@@ -15,156 +29,320 @@ def load_json(path, default={}):
     """
     Loads JSON data from a file.
     Returns the content if successful, otherwise returns the provided default.
-    Handles file not found or malformed JSON gracefully.
+    Edits that are still waiting in the write buffer are returned first, so the
+    UI always shows the latest saved state. Malformed JSON is reported with a
+    warning instead of silently showing an empty view.
     """
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return default
-    return default
+    pending = WRITER.pending(path)
+    if pending is not MISSING:
+        return pending
+    error = WRITER.pop_error(path)
+    if error is not None:
+        st.error(f"Error saving JSON: {error}")
+    try:
+        return load(path)
+    except FileNotFoundError:
+        return default
+    except DecodeError as e:
+        st.warning(f"Could not parse {path}: {e}")
+        return default
 
 def save_json(path, data):
     """
     Saves Python data as JSON to the specified file path.
-    Displays an error using Streamlit if the write operation fails.
+    The write is atomic (temp file + fsync + rename), so a crash can never leave
+    a truncated file behind, and it is done before returning, so the
+    repository's next read sees it.
+    Displays an error using Streamlit if the write fails.
+    """
+    WRITER.write(path, data)
+    WRITER.flush(path)
+    error = WRITER.pop_error(path)
+    if error is not None:
+        st.error(f"Error saving JSON: {error}")
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _format_file(path, signature):
+    # Parsed and pretty-printed once per file version, shared by all sessions
+    content = read_events(path) if path.endswith(".ndjson") else load(path)
+    return json.dumps(content, indent=2)
+
+def file_text(path):
     """
+    Returns the pretty-printed content of a file for the raw editor.
+    Formatting a large file is the slowest part of the editor, so the text is
+    cached per file version (inode, size, mtime). Edits still waiting in the
+    write buffer, and files that do not exist yet, are formatted on the fly.
+    """
+    signature = file_signature(path)
+    if WRITER.pending(path) is not MISSING or signature is None:
+        content = read_events(path) if path.endswith(".ndjson") else load_json(path, default=[])
+        return json.dumps(content, indent=2)
+    error = WRITER.pop_error(path)
+    if error is not None:
+        st.error(f"Error saving JSON: {error}")
     try:
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        st.error(f"Error saving JSON: {e}")
+        return _format_file(path, signature)
+    except DecodeError as e:
+        st.warning(f"Could not parse {path}: {e}")
+        return json.dumps([], indent=2)
+
+def show_batch_error(error):
+    """
+    Reports a rejected batch with the offending rows.
+    """
+    st.error(f"Nothing was saved: {error}")
+    st.dataframe([{"row": row, "error": message} for row, message in error.errors[:100]], hide_index=True)
 
-def append_json(path, entry):
+def apply_changes(dataset, changes):
     """
-    Appends a dictionary entry to a JSON file.
-    Converts file content into a list if it isn't one already.
-    Handles errors and displays them via Streamlit.
+    Applies a batch of changes to a dataset with a single write.
+    Events are appended to the log in one write; agents and patients are
+    changed in one transaction that is rejected as a whole if any change is
+    invalid.
+    Returns True if the batch was saved.
     """
     try:
-        existing = load_json(path, default=[])
-        if not isinstance(existing, list):
-            existing = [existing]
-        existing.append(entry)
-        save_json(path, existing)
+        if dataset == "events":
+            st.success(f"✅ {import_events(repo, changes)} events added.")
+        else:
+            summary = repo.commit_batch(dataset, changes)
+            done = ", ".join(f"{n} {what}" for what, n in summary.items()) or "nothing changed"
+            st.success(f"✅ Batch saved: {done}.")
+        return True
+    except BatchError as e:
+        show_batch_error(e)
     except Exception as e:
-        st.error(f"Error appending JSON: {e}")
+        st.error(f"Error saving data: {e}")
+    return False
+
+def save_record(dataset, action, record):
+    """
+    Adds, updates or deletes one record from the agent and patient forms.
+    Returns True if it was saved, False if the ID is missing, or unknown for an
+    update or delete.
+    """
+    try:
+        repo.commit_batch(dataset, [(ACTIONS[action], record)])
+        return True
+    except BatchError:
+        return False
+
+def show_records(dataset, filter_fields, key):
+    """
+    Shows one page of a dataset, filtered by the given fields.
+    Filtering, counting and paging are done by the repository, i.e. in SQL with
+    the SQLite backend, so only the shown page is loaded.
+    """
+    filters = {}
+    for column, field in zip(st.columns(len(filter_fields)), filter_fields):
+        options = ["All"] + repo.distinct(dataset, field)
+        choice = column.selectbox(field.replace("_", " ").title(), options, key=f"{key}_{field}")
+        if choice != "All":
+            filters[field] = choice
+    total = repo.count(dataset, **filters)
+    n_pages = max(1, -(-total // PAGE_SIZE))
+    # A new page control per filter, so a narrower filter starts on its first page
+    page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key=f"{key}_page_{sorted(filters.items())}")
+    st.caption(f"Page {page} of {n_pages} · {total} records")
+    records = repo.records(dataset, order_by=SCHEMAS[dataset][0], limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE, **filters)
+    st.dataframe(records, use_container_width=True)
+
+def export_dataset(dataset, fmt):
+    """
+    Returns a dataset encoded as CSV or NDJSON for download.
+    Only called when the download button is clicked.
+    """
+    return export_bytes(repo.events() if dataset == "events" else repo.records(dataset), fmt)
 
 # --- Streamlit UI Setup ---
 
 st.title("🧠 Agent-Patient-Event Manager")  # App title
 
-# Create four interactive tabs
-tab1, tab2, tab3, tab4 = st.tabs(["🧑 Agents", "🏥 Patients", "📝 Add Event", "📂 View/Edit Files"])
+# Create five interactive tabs. Only the open tab's body runs, so a rerun loads
+# just the data that tab shows instead of all three datasets.
+tab1, tab2, tab3, tab4, tab5 = st.tabs(
+    ["🧑 Agents", "🏥 Patients", "📝 Add Event", "📂 View/Edit Files", "📦 Bulk Import/Export"],
+    key="manager_tab", on_change="rerun",
+)
 
 # --- AGENT TAB ---
-with tab1:
-    st.header("Manage Agents")
-    agents = load_json(AGENT_FILE, default={})  # Load current agents
-
-    # Select action type
-    action = st.radio("Action", ["Add", "Update", "Delete"])
-    agent_id = st.text_input("Agent ID")  # Input for unique agent ID
-
-    # Additional inputs for Add/Update
-    if action in ["Add", "Update"]:
-        name = st.text_input("Name")
-        role = st.text_input("Role")
-
-    # Action button
-    if st.button(f"{action} Agent"):
-        if action == "Add" and agent_id:
-            agents[agent_id] = {"name": name, "role": role}
-        elif action == "Update" and agent_id in agents:
-            agents[agent_id].update({"name": name, "role": role})
-        elif action == "Delete" and agent_id in agents:
-            del agents[agent_id]
-        else:
-            st.warning("Invalid Agent ID or Action.")
-        save_json(AGENT_FILE, agents)  # Save updated data
-        st.success(f"Agent {action}d successfully.")
+if tab1.open:
+    with tab1:
+        st.header("Manage Agents")
+
+        # Select action type
+        action = st.radio("Action", ["Add", "Update", "Delete"])
+        agent_id = st.text_input("Agent ID")  # Input for unique agent ID
+        agent = {"agent_id": agent_id}
 
-    st.subheader("Current Agents")
-    st.json(agents)  # Display agent data as JSON
+        # Additional inputs for Add/Update
+        if action in ["Add", "Update"]:
+            agent["name"] = st.text_input("Name")
+            agent["role"] = st.text_input("Role")
+
+        # Action button
+        if st.button(f"{action} Agent"):
+            if save_record("agents", action, agent):  # Saved in one write
+                st.success(f"Agent {action}d successfully.")
+            else:
+                st.warning("Invalid Agent ID or Action.")
+
+        st.subheader("Current Agents")
+        show_records("agents", ("current_room", "status"), key="agents")  # One filtered page
 
 # --- PATIENT TAB ---
-with tab2:
-    st.header("Manage Patients")
-    patients = load_json(PATIENT_FILE, default={})  # Load current patients
-
-    # Select action type
-    action = st.radio("Action", ["Add", "Update", "Delete"], key="patient_action")
-    patient_id = st.text_input("Patient ID")  # Input for patient ID
-
-    # Additional inputs for Add/Update
-    if action in ["Add", "Update"]:
-        name = st.text_input("Patient Name")
-        condition = st.text_input("Condition")
-
-    # Action button
-    if st.button(f"{action} Patient"):
-        if action == "Add" and patient_id:
-            patients[patient_id] = {"name": name, "condition": condition}
-        elif action == "Update" and patient_id in patients:
-            patients[patient_id].update({"name": name, "condition": condition})
-        elif action == "Delete" and patient_id in patients:
-            del patients[patient_id]
-        else:
-            st.warning("Invalid Patient ID or Action.")
-        save_json(PATIENT_FILE, patients)  # Save updated data
-        st.success(f"Patient {action}d successfully.")
+if tab2.open:
+    with tab2:
+        st.header("Manage Patients")
+
+        # Select action type
+        action = st.radio("Action", ["Add", "Update", "Delete"], key="patient_action")
+        patient_id = st.text_input("Patient ID")  # Input for patient ID
+        patient = {"patient_id": patient_id}
+
+        # Additional inputs for Add/Update
+        if action in ["Add", "Update"]:
+            patient["name"] = st.text_input("Patient Name")
+            patient["condition"] = st.text_input("Condition")
+
+        # Action button
+        if st.button(f"{action} Patient"):
+            if save_record("patients", action, patient):  # Saved in one write
+                st.success(f"Patient {action}d successfully.")
+            else:
+                st.warning("Invalid Patient ID or Action.")
 
-    st.subheader("Current Patients")
-    st.json(patients)  # Display patient data as JSON
+        st.subheader("Current Patients")
+        show_records("patients", ("location", "status"), key="patients")  # One filtered page
 
 # --- EVENT TAB ---
-with tab3:
-    st.header("Add Event")
-
-    # Input fields for event creation
-    agent_id = st.text_input("Agent ID (Event)")
-    patient_id = st.text_input("Patient ID (Event)")
-    description = st.text_area("Event Description")
-
-    # Add event to log
-    if st.button("➕ Add Event"):
-        if agent_id and patient_id and description:
-            event = {
-                "agent_id": agent_id,
-                "patient_id": patient_id,
-                "description": description,
-                "timestamp": datetime.utcnow().isoformat()  # Timestamp in ISO format
-            }
-            append_json(EVENT_FILE, event)  # Add event to log
-            st.success("✅ Event added successfully.")
-        else:
-            st.warning("Please fill in all fields.")
+if tab3.open:
+    with tab3:
+        st.header("Add Event")
+
+        # Input fields for event creation
+        agent_id = st.text_input("Agent ID (Event)")
+        patient_id = st.text_input("Patient ID (Event)")
+        description = st.text_area("Event Description")
+
+        # Add event to log
+        if st.button("➕ Add Event"):
+            if agent_id and patient_id and description:
+                event = {
+                    "agent_id": agent_id,
+                    "patient_id": patient_id,
+                    "description": description,
+                    "timestamp": datetime.utcnow().isoformat()  # Timestamp in ISO format
+                }
+                repo.append_event(event)  # Add event to log
+                st.success("✅ Event added successfully.")
+            else:
+                st.warning("Please fill in all fields.")
 
 # --- JSON VIEW / EDIT TAB ---
-with tab4:
-    st.header("View/Edit Raw Files")
-
-    # Map display names to file paths
-    file_map = {
-        "Agents": AGENT_FILE,
-        "Patients": PATIENT_FILE,
-        "Event Log": EVENT_FILE
-    }
-
-    selected_file = st.selectbox("Select a file to edit", list(file_map.keys()))
-    file_path = file_map[selected_file]
-    content = load_json(file_path, default={})  # Load content of selected file
-
-    # Display and edit JSON manually
-    st.subheader(f"Raw content of {selected_file}")
-    edited_text = st.text_area("Edit JSON manually", json.dumps(content, indent=2), height=400)
-
-    # Save edited JSON
-    if st.button("💾 Save Edited JSON"):
-        try:
-            new_content = json.loads(edited_text)
-            save_json(file_path, new_content)
-            st.success("✅ File saved.")
-        except json.JSONDecodeError as e:
-            st.error(f"Invalid JSON: {e}")
+if tab4.open:
+    with tab4:
+        st.header("View/Edit Raw Files")
+
+        selected_file = st.selectbox("Select a file to edit", list(DATASETS.keys()))
+        dataset = DATASETS[selected_file]
+
+        # Small JSON files can still be edited as raw JSON; large ones (and the database) only page by page
+        modes = ["Paged table"]
+        if not repo.pushdown:
+            file_path = repo.paths[dataset]
+            signature = file_signature(file_path)
+            if signature is None or signature[1] <= RAW_EDIT_LIMIT:
+                modes.append("Raw JSON")
+        mode = st.radio("Edit as", modes, horizontal=True, key="edit_mode")
+
+        if mode == "Raw JSON":
+            # Display and edit JSON manually (the event log is stored as NDJSON)
+            st.subheader(f"Raw content of {selected_file}")
+            edited_text = st.text_area("Edit JSON manually", file_text(file_path), height=400)
+
+            # Save edited JSON
+            if st.button("💾 Save Edited JSON"):
+                try:
+                    new_content = json.loads(edited_text)
+                    if dataset == "events":
+                        write_events(file_path, new_content if isinstance(new_content, list) else [new_content])
+                    else:
+                        save_json(file_path, new_content)
+                    st.success("✅ File saved.")
+                except json.JSONDecodeError as e:
+                    st.error(f"Invalid JSON: {e}")
+
+        elif dataset == "events":
+            # The event log is append-only: read one page of it without loading the rest
+            page = st.number_input("Page", min_value=1, value=1, key="event_page")
+            events = repo.events(limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE)
+            st.caption(f"Events {(page - 1) * PAGE_SIZE + 1}–{(page - 1) * PAGE_SIZE + len(events)} · add events in bulk from the import tab")
+            st.dataframe(events, use_container_width=True)
+
+        else:
+            key_field = SCHEMAS[dataset][0]
+            total = repo.count(dataset)
+            n_pages = max(1, -(-total // PAGE_SIZE))
+            page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key=f"page_{selected_file}")
+            st.caption(f"Page {page} of {n_pages} · {total} records")
+            shown = repo.records(dataset, order_by=key_field, limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE)
+
+            # A new data version gets a fresh editor, so saved edits are not replayed onto it
+            edited = st.data_editor(
+                shown, num_rows="dynamic", use_container_width=True,
+                key=f"editor_{selected_file}_{page}_{repo.version()}",
+            )
+
+            # Only the changed rows of the page are saved, in one write
+            if st.button("💾 Save Page"):
+                changes = diff_records(shown, edited, key_field)
+                if changes:
+                    apply_changes(dataset, changes)
+                else:
+                    st.info("No changes on this page.")
+
+# --- BULK IMPORT / EXPORT TAB ---
+if tab5.open:
+    with tab5:
+        st.header("Bulk Import/Export")
+
+        selected_file = st.selectbox("Dataset", list(DATASETS.keys()), key="bulk_file")
+        dataset = DATASETS[selected_file]
+        fmt = st.radio("Format", ["csv", "ndjson"], format_func=str.upper, horizontal=True, key="bulk_format")
+
+        st.subheader("Import")
+        if dataset == "events":
+            st.caption("Every row is appended to the event log; rows without a timestamp get the import time.")
+        else:
+            st.caption(
+                f"One record per row, identified by `{SCHEMAS[dataset][0]}`. An optional `op` column selects "
+                "upsert (default), update or delete; empty cells leave a field unchanged. The whole file is "
+                "applied with one write, or not at all if any row is invalid."
+            )
+        # A new uploader after every import, so the same file is not applied twice
+        uploads = st.session_state.get("bulk_uploads", 0)
+        uploaded = st.file_uploader(
+            f"{fmt.upper()} file", type=["csv"] if fmt == "csv" else ["ndjson", "jsonl"], key=f"bulk_upload_{uploads}"
+        )
+        if uploaded is not None:
+            try:
+                changes = parse_rows(uploaded.getvalue(), fmt)
+            except BatchError as e:
+                show_batch_error(e)
+            else:
+                ops = Counter(op for op, _ in changes)
+                st.markdown(f"**{len(changes)} rows:** " + (", ".join(f"{n} {op}" for op, n in ops.items()) or "none"))
+                if st.button(f"⬆️ Apply {len(changes)} changes", disabled=not changes):
+                    if apply_changes(dataset, changes):
+                        st.session_state.bulk_uploads = uploads + 1
+
+        st.subheader("Export")
+        # The data is encoded on click, not on every rerun of this tab
+        st.download_button(
+            f"⬇️ Download {selected_file} as {fmt.upper()}",
+            data=partial(export_dataset, dataset, fmt),
+            file_name=f"{dataset}.{fmt}",
+            mime="text/csv" if fmt == "csv" else "application/x-ndjson",
+        )
@@ -0,0 +1,446 @@
+from utils.change_tracker import ChangeSet
+from utils.instrumentation import timed
+
+
+def bitmap_to_rows(bitmap):
+    """
+    Convert a bitmap into the sorted list of row ids whose bit is set.
+
+    Args:
+        bitmap (int): Python integer used as a bitset.
+
+    Returns:
+        list: Row ids in ascending order.
+    """
+    # Scanning the reversed binary string is done in C and is far faster than peeling bits one by one
+    bits = bin(bitmap)[:1:-1]
+    return [row for row, bit in enumerate(bits) if bit == "1"]
+
+
+def popcount(bitmap):
+    """Return the number of set bits in a bitmap."""
+    return bin(bitmap).count("1")
+
+
+def _unhashable_message(record):
+    for field, value in record.items():
+        try:
+            hash(value)
+        except TypeError:
+            return (
+                f"Field {field!r} holds an unhashable {type(value).__name__}; "
+                "RecordTable columns only hold scalar values"
+            )
+    return "Record holds an unhashable value"
+
+
+# Distinct values above which an indexed field drops its bitmaps and is scanned instead
+MAX_INDEX_VALUES = 1024
+# Deletions kept for changes_since() beyond one per live record
+REMOVED_HISTORY = 1024
+
+
+class RecordTable:
+    """
+    Persistent, columnar store of records with categorical columns and bitmap indexes.
+
+    Every column is dictionary-encoded: each distinct value gets an integer code and
+    the column stores one code per row. Indexed columns additionally keep, for every
+    code, a bitmap (a Python int used as a bitset) of the rows holding that value.
+    Equality filters are therefore dictionary lookups, and combined filters are
+    bitwise ANDs of the bitmaps. Records are upserted by key, and only rows whose
+    values actually changed touch the indexes. Every row remembers the table version
+    of its last change, so changes_since() can report what changed by key.
+
+    Every bitmap is about as wide as the table, so indexes are meant for
+    low-cardinality fields such as status or room: the key cannot be indexed (it
+    is looked up in the key -> row map), and an indexed field that grows past
+    `max_index_values` distinct values drops its index and is scanned instead.
+    Codes of values no longer held by any row are released and reused.
+
+    Args:
+        key (str): Field that uniquely identifies a record (e.g. "agent_id").
+        indexed (iterable): Low-cardinality fields to maintain bitmap indexes for.
+        records (iterable, optional): Initial records.
+        max_index_values (int): Distinct values an indexed field may hold.
+    """
+
+    def __init__(self, key, indexed=(), records=(), max_index_values=MAX_INDEX_VALUES):
+        if key in indexed:
+            raise ValueError(f"The key field {key!r} cannot be bitmap-indexed; it is looked up by key already")
+        self.key = key
+        self.indexed = tuple(indexed)
+        self.max_index_values = max_index_values
+        self.columns = {}       # field -> list of codes, one per row id
+        self.categories = {}    # field -> list of values, indexed by code
+        self._codes = {}        # field -> {value: code}
+        self._refs = {}         # field -> number of rows holding each code
+        self._free_codes = {}   # field -> released codes, reused first
+        self.indexes = {field: {} for field in self.indexed}  # field -> {code: bitmap}
+        self._rows = {}         # key value -> row id
+        self._live = 0          # bitmap of rows that hold a record
+        self._free = []         # row ids of deleted records, reused first
+        self._capacity = 0
+        self._stamps = []       # row id -> table version of the row's last change
+        self._created = []      # row id -> table version the row's record was inserted at
+        self._removed = {}      # key value -> table version it was deleted at
+        self._token = None
+        self._aggregates = []   # GroupCounts maintained by upsert() and delete()
+        self.version = 0
+        for record in records:
+            self.upsert(record)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _encode(self, field, value):
+        codes = self._codes.get(field)
+        if codes is None:
+            # New field: backfill existing rows with None
+            codes = self._codes[field] = {None: 0}
+            self.categories[field] = [None]
+            self._refs[field] = [0]
+            self._free_codes[field] = []
+            self.columns[field] = [0] * self._capacity
+            if field in self.indexes:
+                self.indexes[field][0] = self._live
+        code = codes.get(value)
+        if code is None:
+            free = self._free_codes[field]
+            if free:
+                code = free.pop()
+                self.categories[field][code] = value
+            else:
+                code = len(self.categories[field])
+                self.categories[field].append(value)
+                self._refs[field].append(0)
+            codes[value] = code
+            if field in self.indexes and len(codes) > self.max_index_values:
+                # Too many distinct values for bitmaps: fall back to scanning the column
+                del self.indexes[field]
+        return code
+
+    def _unref(self, field, code):
+        # One row less holds `code`; release the value once no row does (None stays at 0)
+        if not code:
+            return
+        refs = self._refs[field]
+        refs[code] -= 1
+        if not refs[code]:
+            categories = self.categories[field]
+            del self._codes[field][categories[code]]
+            categories[code] = None
+            self._free_codes[field].append(code)
+            index = self.indexes.get(field)
+            if index is not None:
+                index.pop(code, None)
+
+    def _allocate_row(self):
+        if self._free:
+            return self._free.pop()
+        row = self._capacity
+        self._capacity += 1
+        for column in self.columns.values():
+            column.append(0)
+        self._stamps.append(0)
+        self._created.append(0)
+        return row
+
+    def _set(self, row, field, code):
+        column = self.columns[field]
+        old = column[row]
+        if old == code:
+            return False
+        column[row] = code
+        index = self.indexes.get(field)
+        if index is not None:
+            bit = 1 << row
+            index[old] = index.get(old, 0) & ~bit
+            index[code] = index.get(code, 0) | bit
+        if code:
+            self._refs[field][code] += 1
+        self._unref(field, old)
+        return True
+
+    def upsert(self, record):
+        """
+        Insert a record or update the stored record with the same key.
+
+        Args:
+            record (dict or Mapping): Record to store.
+
+        Returns:
+            bool: True if anything changed.
+
+        Raises:
+            TypeError: If a value is unhashable (e.g. a nested mapping or list); the
+                table is left unchanged.
+        """
+        try:
+            # One C-level pass; every value becomes a dictionary key in _encode()
+            hash(tuple(record.values()))
+        except TypeError:
+            raise TypeError(_unhashable_message(record)) from None
+        key = record[self.key]
+        row = self._rows.get(key)
+        changed = False
+        groups = self._group_keys(row) if self._aggregates and row is not None else None
+        if row is None:
+            row = self._allocate_row()
+            self._rows[key] = row
+            bit = 1 << row
+            self._live |= bit
+            # A fresh row starts at code 0 (None) in every column
+            for field, index in self.indexes.items():
+                if field in self.columns:
+                    index[0] = index.get(0, 0) | bit
+            changed = True
+        for field, value in record.items():
+            code = self._encode(field, value)
+            changed = self._set(row, field, code) or changed
+        if len(record) < len(self.columns):
+            # Fields missing from the record are cleared
+            for field in self.columns:
+                if field not in record:
+                    changed = self._set(row, field, 0) or changed
+        if changed:
+            self.version += 1
+            self._stamps[row] = self.version
+            if not self._created[row]:
+                # First write of a newly inserted record
+                self._created[row] = self.version
+                self._removed.pop(key, None)
+            if self._aggregates:
+                for aggregate, old, new in zip(self._aggregates, groups or [None] * len(self._aggregates), self._group_keys(row)):
+                    if old is None:
+                        aggregate.add(new)
+                    else:
+                        aggregate.move(old, new)
+        return changed
+
+    def delete(self, key):
+        """
+        Remove the record with the given key.
+
+        Args:
+            key: Key value of the record.
+
+        Returns:
+            bool: True if a record was removed.
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        for aggregate, group in zip(self._aggregates, self._group_keys(row)):
+            aggregate.remove(group)
+        bit = 1 << row
+        self._live &= ~bit
+        for field, column in self.columns.items():
+            code = column[row]
+            index = self.indexes.get(field)
+            if index is not None:
+                index[code] = index.get(code, 0) & ~bit
+            column[row] = 0
+            self._unref(field, code)
+        self._free.append(row)
+        self.version += 1
+        self._removed[key] = self.version
+        self._created[row] = 0
+        if len(self._removed) > len(self._rows) + REMOVED_HISTORY:
+            # Forget the oldest half of the deletions (the dict is in deletion order)
+            for old_key in list(self._removed)[:len(self._removed) // 2]:
+                del self._removed[old_key]
+        return True
+
+    def _group_keys(self, row):
+        # Group of a row in every attached aggregate
+        return [
+            tuple(self.value(row, field) if field in self.columns else None for field in aggregate.fields)
+            for aggregate in self._aggregates
+        ]
+
+    def attach(self, aggregate):
+        """
+        Maintain a GroupCounts aggregate from now on.
+
+        The aggregate is filled with the current records once; after that every
+        upsert and delete adjusts it by the changed record only.
+
+        Args:
+            aggregate (GroupCounts): Aggregate over fields of this table.
+
+        Returns:
+            GroupCounts: The attached aggregate.
+        """
+        self._aggregates.append(aggregate)
+        for row in self._rows.values():
+            aggregate.add(tuple(self.value(row, field) if field in self.columns else None for field in aggregate.fields))
+        return aggregate
+
+    def changes_since(self, version):
+        """
+        Report which records changed after a given table version.
+
+        Args:
+            version (int): Table version seen by the caller, e.g. the value of
+                `table.version` at its previous refresh.
+
+        Returns:
+            ChangeSet: Keys of the added, updated and removed records, plus the
+                bitmap of the changed rows that still hold a record. Only the
+                most recent deletions are remembered (at least REMOVED_HISTORY
+                more than the live records), which covers callers that ask
+                once per refresh.
+        """
+        if version >= self.version:
+            return ChangeSet()
+        keys = {row: key for key, row in self._rows.items()} if self._rows else {}
+        added, updated, bitmap = set(), set(), 0
+        for row, stamp in enumerate(self._stamps):
+            if stamp > version and row in keys:
+                bitmap |= 1 << row
+                (added if self._created[row] > version else updated).add(keys[row])
+        removed = {key for key, stamp in self._removed.items() if stamp > version and key not in self._rows}
+        return ChangeSet(added, updated, removed, bitmap)
+
+    @timed("index_sync")
+    def sync(self, records, token=None):
+        """
+        Bring the table in line with a full list of records.
+
+        New records are inserted, changed records updated and records missing from
+        the list deleted. Unchanged records leave the indexes untouched.
+
+        Args:
+            records (iterable): Current records.
+            token (optional): Version of `records` (e.g. a snapshot version). When
+                it equals the token of the previous sync the call is a no-op.
+
+        Returns:
+            int: Number of inserted, updated or deleted records.
+        """
+        if token is not None and token == self._token:
+            return 0
+        changed = 0
+        seen = set()
+        for record in records:
+            seen.add(record[self.key])
+            changed += self.upsert(record)
+        for key in [key for key in self._rows if key not in seen]:
+            changed += self.delete(key)
+        self._token = token
+        return changed
+
+    def _match(self, field, value):
+        # Bitmap of live rows where `field` equals `value` (or any of several values)
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+        if field == self.key:
+            # The key is looked up in the row map rather than indexed
+            bitmap = 0
+            for item in values:
+                row = self._rows.get(item)
+                if row is not None:
+                    bitmap |= 1 << row
+            return bitmap
+        if field not in self.columns:
+            # No record has this field yet: every row holds None
+            return self._live if None in values else 0
+        codes = self._codes[field]
+        index = self.indexes.get(field)
+        bitmap = 0
+        for item in values:
+            code = codes.get(item)
+            if code is None:
+                continue
+            if index is not None:
+                bitmap |= index.get(code, 0)
+            else:
+                # Unindexed field: fall back to a scan of the code column
+                for row, row_code in enumerate(self.columns[field]):
+                    if row_code == code:
+                        bitmap |= 1 << row
+        return bitmap & self._live
+
+    def filter_bitmap(self, **predicates):
+        """
+        Return the bitmap of rows matching all predicates.
+
+        Args:
+            **predicates: field=value pairs. A list, tuple or set value matches any
+                of its elements.
+
+        Returns:
+            int: Bitmap of matching row ids.
+        """
+        bitmap = self._live
+        for field, value in predicates.items():
+            if not bitmap:
+                break
+            bitmap &= self._match(field, value)
+        return bitmap
+
+    def filter(self, **predicates):
+        """
+        Return the row ids of the records matching all predicates.
+
+        Args:
+            **predicates: field=value pairs, see filter_bitmap().
+
+        Returns:
+            list: Matching row ids in ascending order.
+        """
+        return bitmap_to_rows(self.filter_bitmap(**predicates))
+
+    def count(self, **predicates):
+        """Return the number of records matching all predicates."""
+        return popcount(self.filter_bitmap(**predicates))
+
+    def distinct(self, field):
+        """
+        Return the sorted distinct values currently present in a field.
+
+        Indexed fields are answered from their bitmaps without scanning the rows.
+
+        Args:
+            field (str): Field name.
+
+        Returns:
+            list: Distinct non-null values.
+        """
+        if field not in self.columns:
+            return []
+        categories = self.categories[field]
+        index = self.indexes.get(field)
+        if index is not None:
+            present = [categories[code] for code, bitmap in index.items() if bitmap & self._live]
+        else:
+            present = [categories[code] for code in set(self.columns[field][row] for row in self.filter())]
+        return sorted(value for value in present if value is not None)
+
+    def value(self, row, field):
+        """Return the decoded value of one cell."""
+        return self.categories[field][self.columns[field][row]]
+
+    def select(self, rows, fields=None):
+        """
+        Decode the given rows into columns.
+
+        Args:
+            rows (list): Row ids, e.g. from filter().
+            fields (list, optional): Fields to return; all fields by default.
+
+        Returns:
+            dict: Field name to list of values, ready for pd.DataFrame().
+        """
+        fields = fields if fields is not None else list(self.columns)
+        result = {}
+        for field in fields:
+            column = self.columns[field]
+            categories = self.categories[field]
+            result[field] = [categories[column[row]] for row in rows]
+        return result
+
+    def records(self, rows):
+        """Decode the given rows into a list of dicts."""
+        columns = self.select(rows)
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
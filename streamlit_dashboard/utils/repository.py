@@ -0,0 +1,443 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+from types import MappingProxyType
+
+from utils.atomic_io import atomic_write_json
+from utils.batch_ops import apply_batch, commit_batch as commit_file_batch
+from utils.event_index import get_event_index
+from utils.event_store import migrate_json_array
+from utils.snapshot_store import SNAPSHOTS, file_signature, thaw
+
+# Dataset name -> (key field, fields stored as real SQL columns)
+SCHEMAS = {
+    "agents": ("agent_id", ("agent_id", "name", "role", "current_room", "status")),
+    "patients": ("patient_id", ("patient_id", "event", "location", "timestamp", "status")),
+}
+
+# Secondary indexes of the SQLite backend
+INDEXES = {
+    "agents": ("current_room", "status", "role"),
+    "patients": ("status", "location", "timestamp"),
+}
+
+DEFAULT_PATHS = {
+    "agents": "shared_data/agents.json",
+    "patients": "shared_data/patient.json",
+    "events": "shared_data/event_log.ndjson",
+}
+LEGACY_EVENT_FILE = "shared_data/event_log.json"
+DEFAULT_DB = "shared_data/hospital.db"
+# Keys per IN (...) lookup, well below SQLite's limit on bound parameters
+KEY_CHUNK = 500
+
+
+def _matches(record, filters):
+    for field, value in filters.items():
+        if isinstance(value, (list, tuple, set, frozenset)):
+            if record.get(field) not in value:
+                return False
+        elif record.get(field) != value:
+            return False
+    return True
+
+
+def _as_records(data, key):
+    # Files written by the old manager map key -> fields; every reader gets records carrying their key
+    if isinstance(data, MappingProxyType):
+        return tuple(
+            MappingProxyType({key: k, **fields}) for k, fields in data.items() if isinstance(fields, MappingProxyType)
+        )
+    return data
+
+
+class Repository(ABC):
+    """
+    Storage interface for agents, patients and the event log.
+
+    Every record is a flat dict carrying its key field ("agent_id" or
+    "patient_id"), whatever the backend stores. Filters are field=value keyword
+    arguments (a list/tuple/set value matches any of its elements). Backends
+    that can evaluate them natively (SQL) never load rows that are not returned.
+    """
+
+    # True when filters, ordering and paging are evaluated by the storage engine
+    pushdown = False
+
+    @abstractmethod
+    def records(self, dataset, order_by=None, descending=False, limit=None, offset=0, **filters):
+        """Return the records of `dataset` ("agents" or "patients") matching the filters."""
+
+    @abstractmethod
+    def count(self, dataset, **filters):
+        """Return the number of records of `dataset` matching the filters."""
+
+    @abstractmethod
+    def distinct(self, dataset, field):
+        """Return the sorted distinct non-null values of a field."""
+
+    @abstractmethod
+    def group_counts(self, dataset, fields, **filters):
+        """Return {value tuple: number of records} grouped by `fields`, like SQL GROUP BY."""
+
+    @abstractmethod
+    def upsert(self, dataset, records):
+        """Insert or replace records (matched by key) in one write."""
+
+    @abstractmethod
+    def delete(self, dataset, keys):
+        """Delete the records with the given keys in one write."""
+
+    @abstractmethod
+    def commit_batch(self, dataset, changes):
+        """
+        Apply (op, record) changes (see utils.batch_ops) in one transaction.
+
+        Returns a Counter of added/updated/deleted records; raises BatchError and
+        changes nothing if any change is invalid.
+        """
+
+    @abstractmethod
+    def append_event(self, event):
+        """Append one event to the event log."""
+
+    @abstractmethod
+    def append_events(self, events):
+        """Append several events to the event log in one write."""
+
+    @abstractmethod
+    def events(self, patient_id=None, agent_id=None, start=None, end=None, limit=None, offset=0):
+        """Return events filtered by patient, agent and ISO timestamp range, in time order."""
+
+    @abstractmethod
+    def version(self):
+        """Return a value that changes whenever the stored data changes."""
+
+
+class JSONRepository(Repository):
+    """
+    The flat JSON files under shared_data/ behind the Repository interface.
+
+    Reads go through the shared snapshot store, so every file version is parsed
+    once per process; filters are evaluated in Python over the parsed records.
+
+    Args:
+        paths (dict, optional): Paths of the "agents", "patients" and "events" files.
+    """
+
+    def __init__(self, paths=None):
+        self.paths = dict(DEFAULT_PATHS, **(paths or {}))
+        self._lock = threading.Lock()
+        if paths is None:
+            # Same one-shot conversion of the JSON-array log as the manager performs
+            migrate_json_array(LEGACY_EVENT_FILE, self.paths["events"])
+
+    def _load(self, dataset):
+        return _as_records(SNAPSHOTS.get(self.paths[dataset]).data, SCHEMAS[dataset][0])
+
+    def records(self, dataset, order_by=None, descending=False, limit=None, offset=0, **filters):
+        rows = [dict(record) for record in self._load(dataset) if _matches(record, filters)]
+        if order_by is not None:
+            rows.sort(key=lambda record: (record.get(order_by) is None, str(record.get(order_by))), reverse=descending)
+        end = None if limit is None else offset + limit
+        return rows[offset:end]
+
+    def count(self, dataset, **filters):
+        return sum(1 for record in self._load(dataset) if _matches(record, filters))
+
+    def distinct(self, dataset, field):
+        return sorted({record[field] for record in self._load(dataset) if record.get(field) is not None})
+
+    def group_counts(self, dataset, fields, **filters):
+        return dict(Counter(
+            tuple(record.get(field) for field in fields)
+            for record in self._load(dataset) if _matches(record, filters)
+        ))
+
+    def upsert(self, dataset, records):
+        key = SCHEMAS[dataset][0]
+        with self._lock:
+            current = thaw(self._load(dataset))
+            positions = {record.get(key): index for index, record in enumerate(current)}
+            for record in records:
+                index = positions.get(record[key])
+                if index is None:
+                    positions[record[key]] = len(current)
+                    current.append(dict(record))
+                else:
+                    current[index] = dict(record)
+            atomic_write_json(self.paths[dataset], current)
+
+    def delete(self, dataset, keys):
+        key = SCHEMAS[dataset][0]
+        keys = set(keys)
+        with self._lock:
+            current = [record for record in thaw(self._load(dataset)) if record.get(key) not in keys]
+            atomic_write_json(self.paths[dataset], current)
+
+    def commit_batch(self, dataset, changes):
+        # Also sees, and coalesces with, edits still waiting in the write buffer
+        return commit_file_batch(self.paths[dataset], changes, SCHEMAS[dataset][0], default=[])
+
+    def append_event(self, event):
+        self.append_events([event])
+
+    def append_events(self, events):
+        get_event_index(self.paths["events"]).append(events)
+
+    def events(self, patient_id=None, agent_id=None, start=None, end=None, limit=None, offset=0):
+        # Posting-list lookup in the side index instead of a scan of the whole log
+        matches = get_event_index(self.paths["events"]).query(patient_id, agent_id, start, end)
+        return list(islice(matches, offset, None if limit is None else offset + limit))
+
+    def version(self):
+        return tuple(file_signature(path) for path in self.paths.values())
+
+
+class SQLiteRepository(Repository):
+    """
+    Embedded SQLite storage with WAL journaling and indexed columns.
+
+    Known fields live in real, indexed columns; any other fields of a record are
+    kept in a JSON `extra` column so records round-trip unchanged. Filters,
+    ordering and paging become parameterized SQL (statements are cached by the
+    sqlite3 module), so showing one page of a large table only reads that page.
+    Connections are pooled: each call borrows one, so the short-lived threads
+    Streamlit runs scripts on reuse open connections (and their statement
+    caches) instead of opening a new one each.
+
+    Args:
+        path (str): Database file path.
+        pool_size (int): Idle connections kept open for reuse.
+    """
+
+    pushdown = True
+
+    def __init__(self, path=DEFAULT_DB, pool_size=4):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        self._create_schema()
+
+    @contextmanager
+    def _connect(self):
+        """Borrow a connection from the pool for the duration of the block."""
+        with self._pool_lock:
+            conn = self._pool.pop() if self._pool else None
+        if conn is None:
+            # Used by one thread at a time, but not always the thread that opened it
+            conn = sqlite3.connect(self.path, cached_statements=256, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        finally:
+            with self._pool_lock:
+                if len(self._pool) < self.pool_size:
+                    self._pool.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def _create_schema(self):
+        with self._connect() as conn, conn:
+            for dataset, (key, columns) in SCHEMAS.items():
+                defs = ", ".join(f"{column} TEXT PRIMARY KEY" if column == key else f"{column} TEXT" for column in columns)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {dataset} ({defs}, extra TEXT)")
+                for column in INDEXES[dataset]:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{dataset}_{column} ON {dataset} ({column})")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, patient_id TEXT, agent_id TEXT, timestamp TEXT, body TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_patient ON events (patient_id, timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_agent ON events (agent_id, timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+
+    @staticmethod
+    def _column(dataset, field):
+        # Only known column names ever reach the SQL text
+        if field not in SCHEMAS[dataset][1]:
+            raise ValueError(f"Unknown {dataset} field: {field}")
+        return field
+
+    def _where(self, dataset, filters):
+        clauses, params = [], []
+        for field, value in filters.items():
+            column = self._column(dataset, field)
+            if isinstance(value, (list, tuple, set, frozenset)):
+                values = list(value)
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def _to_record(columns, row):
+        record = {column: value for column, value in zip(columns, row[:-1]) if value is not None}
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        return record
+
+    def records(self, dataset, order_by=None, descending=False, limit=None, offset=0, **filters):
+        columns = SCHEMAS[dataset][1]
+        where, params = self._where(dataset, filters)
+        sql = f"SELECT {', '.join(columns)}, extra FROM {dataset}{where}"
+        if order_by is not None:
+            sql += f" ORDER BY {self._column(dataset, order_by)} {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._connect() as conn:
+            return [self._to_record(columns, row) for row in conn.execute(sql, params)]
+
+    def count(self, dataset, **filters):
+        where, params = self._where(dataset, filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {dataset}{where}", params).fetchone()[0]
+
+    def distinct(self, dataset, field):
+        column = self._column(dataset, field)
+        sql = f"SELECT DISTINCT {column} FROM {dataset} WHERE {column} IS NOT NULL ORDER BY {column}"
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(sql)]
+
+    def group_counts(self, dataset, fields, **filters):
+        columns = ", ".join(self._column(dataset, field) for field in fields)
+        where, params = self._where(dataset, filters)
+        sql = f"SELECT {columns}, COUNT(*) FROM {dataset}{where} GROUP BY {columns}"
+        with self._connect() as conn:
+            return {tuple(row[:-1]): row[-1] for row in conn.execute(sql, params)}
+
+    def _bump_version(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def upsert(self, dataset, records):
+        with self._connect() as conn, conn:
+            self._upsert(conn, dataset, records)
+            self._bump_version(conn)
+
+    def _upsert(self, conn, dataset, records):
+        key, columns = SCHEMAS[dataset]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+        sql = (
+            f"INSERT INTO {dataset} ({', '.join(columns)}, extra) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates}, extra = excluded.extra"
+        )
+        rows = []
+        for record in records:
+            extra = {field: value for field, value in record.items() if field not in columns}
+            rows.append([record.get(column) for column in columns] + [json.dumps(extra) if extra else None])
+        conn.executemany(sql, rows)
+
+    def delete(self, dataset, keys):
+        key = SCHEMAS[dataset][0]
+        with self._connect() as conn, conn:
+            conn.executemany(f"DELETE FROM {dataset} WHERE {key} = ?", [(k,) for k in keys])
+            self._bump_version(conn)
+
+    def commit_batch(self, dataset, changes):
+        key, columns = SCHEMAS[dataset]
+        keys = list({str(record[key]) for _, record in changes if record.get(key) not in (None, "")})
+        select = f"SELECT {', '.join(columns)}, extra FROM {dataset} WHERE {key} IN "
+        with self._connect() as conn, conn:
+            # Reserve the write lock before reading, so no other writer slips in between
+            conn.execute("BEGIN IMMEDIATE")
+            current = []
+            for i in range(0, len(keys), KEY_CHUNK):
+                chunk = keys[i:i + KEY_CHUNK]
+                rows = conn.execute(select + f"({', '.join('?' * len(chunk))})", chunk)
+                current += [self._to_record(columns, row) for row in rows]
+            # Only the records the batch touches are loaded; the batch is validated against them
+            records, summary = apply_batch(current, changes, key)
+            kept = {str(record[key]) for record in records}
+            conn.executemany(
+                f"DELETE FROM {dataset} WHERE {key} = ?",
+                [(record[key],) for record in current if str(record[key]) not in kept],
+            )
+            self._upsert(conn, dataset, records)
+            self._bump_version(conn)
+        return summary
+
+    def append_event(self, event):
+        self.append_events([event])
+
+    def append_events(self, events):
+        """Append several events in one transaction."""
+        rows = [(e.get("patient_id"), e.get("agent_id"), e.get("timestamp"), json.dumps(e)) for e in events]
+        with self._connect() as conn, conn:
+            conn.executemany("INSERT INTO events (patient_id, agent_id, timestamp, body) VALUES (?, ?, ?, ?)", rows)
+            self._bump_version(conn)
+
+    def events(self, patient_id=None, agent_id=None, start=None, end=None, limit=None, offset=0):
+        clauses, params = [], []
+        for clause, value in (("patient_id = ?", patient_id), ("agent_id = ?", agent_id),
+                              ("timestamp >= ?", start), ("timestamp <= ?", end)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT body FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp, seq"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        with self._connect() as conn:
+            return [json.loads(row[0]) for row in conn.execute(sql, params)]
+
+    def version(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+
+def copy_repository(source, target):
+    """
+    Copy all agents, patients and events from one repository into another.
+
+    Args:
+        source (Repository): Repository to read from.
+        target (Repository): Repository to write to.
+    """
+    for dataset in SCHEMAS:
+        target.upsert(dataset, source.records(dataset))
+    target.append_events(source.events())
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """
+    Return the process-wide repository selected by the environment.
+
+    DASHBOARD_BACKEND selects "json" (default) or "sqlite"; DASHBOARD_DB sets the
+    SQLite file. A new SQLite database is seeded once from the JSON files.
+
+    Returns:
+        Repository: The shared repository.
+    """
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            backend = os.environ.get("DASHBOARD_BACKEND", "json").lower()
+            if backend == "sqlite":
+                path = os.environ.get("DASHBOARD_DB", DEFAULT_DB)
+                seed = not os.path.exists(path)
+                _repository = SQLiteRepository(path)
+                if seed:
+                    copy_repository(JSONRepository(), _repository)
+            else:
+                _repository = JSONRepository()
+        return _repository
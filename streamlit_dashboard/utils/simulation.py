@@ -0,0 +1,209 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.instrumentation import timed
+
+AGENT_STATUSES = ["On Duty", "Off Duty"]
+PATIENT_STATUSES = ["Active", "Idle", "Completed"]
+
+# Per-tick transition probabilities: row = current status, column = next status.
+# Agents mostly stay on or off duty; doctors change shifts less often than nurses.
+AGENT_TRANSITIONS = {
+    None: [[0.85, 0.15], [0.15, 0.85]],
+    "Doctor": [[0.92, 0.08], [0.10, 0.90]],
+    "Nurse": [[0.85, 0.15], [0.20, 0.80]],
+    "EMT": [[0.80, 0.20], [0.25, 0.75]],
+}
+# Patients move Active -> Idle -> Completed; a completed patient is occasionally readmitted
+PATIENT_TRANSITIONS = {
+    None: [[0.70, 0.20, 0.10], [0.25, 0.65, 0.10], [0.02, 0.00, 0.98]],
+}
+
+
+def uniform_transitions(n_states, rate=0.3):
+    """
+    Return the matrix of the former simulate_updates() behaviour.
+
+    With probability `rate` a record is assigned a uniformly chosen status
+    (possibly its current one), otherwise it keeps its status.
+
+    Args:
+        n_states (int): Number of statuses.
+        rate (float): Probability that a record is re-rolled in a tick.
+
+    Returns:
+        np.ndarray: n_states x n_states row-stochastic matrix.
+    """
+    return (1 - rate) * np.eye(n_states) + rate / n_states
+
+
+class Delta:
+    """
+    Records changed by one simulation tick.
+
+    Attributes:
+        tick: Tick number (1 for the first tick).
+        rows: Row positions of the changed records.
+        keys: Keys of the changed records.
+        values: New values of the simulated field.
+        timestamp: UTC ISO timestamp of the tick.
+    """
+
+    __slots__ = ("tick", "rows", "keys", "values", "timestamp")
+
+    def __init__(self, tick, rows, keys, values, timestamp):
+        self.tick = tick
+        self.rows = rows
+        self.keys = keys
+        self.values = values
+        self.timestamp = timestamp
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class StatusSimulator:
+    """
+    Seeded Markov simulation of one categorical field over a set of records.
+
+    The current state of every record is held as an integer array. A tick draws one
+    uniform number per record from a seeded `numpy.random.Generator` and picks the
+    next state from the cumulative transition row of the record's group and state,
+    all as array operations. Only the records whose state changed are reported, as
+    a Delta, and the input records are never modified; the same seed and records
+    always produce the same sequence of deltas.
+
+    Args:
+        records (list): Records to simulate (dicts or read-only mappings).
+        key (str, optional): Field identifying a record, e.g. "agent_id". Deltas
+            report row positions as keys when omitted.
+        field (str): Field to simulate, e.g. "status".
+        states (list): Possible values of the field. Records holding another value
+            are moved to a uniformly drawn state by the first tick.
+        transitions (dict or array, optional): Transition matrix (len(states) square,
+            rows summing to 1), or a dict of matrices keyed by the value of
+            `group_field`; the None entry is used for other groups. Defaults to the
+            uniform re-roll of uniform_transitions(len(states), rate).
+        group_field (str, optional): Field selecting the matrix of a record, e.g. "role".
+        rate (float): Re-roll probability of the default uniform matrix.
+        seed (int, optional): Seed of the random generator.
+        timestamp_field (str, optional): Field set to the tick time on changed
+            records; None to leave timestamps alone.
+    """
+
+    def __init__(self, records, key, field, states, transitions=None, group_field=None,
+                 rate=0.3, seed=None, timestamp_field="timestamp"):
+        self.records = records
+        self.key = key
+        self.field = field
+        self.states = list(states)
+        self.timestamp_field = timestamp_field
+        self.rng = np.random.default_rng(seed)
+        self.ticks = 0
+
+        n_states = len(self.states)
+        if transitions is None:
+            transitions = uniform_transitions(n_states, rate)
+        if not isinstance(transitions, dict):
+            transitions = {None: transitions}
+        default = transitions.get(None, uniform_transitions(n_states, rate))
+        groups = [group for group in transitions if group is not None]
+        matrices = [np.asarray(transitions[group], dtype=np.float64) for group in groups] + [np.asarray(default, dtype=np.float64)]
+        for matrix in matrices:
+            if matrix.shape != (n_states, n_states) or not np.allclose(matrix.sum(axis=1), 1):
+                raise ValueError(f"Transition matrices must be {n_states}x{n_states} with rows summing to 1")
+
+        # Cumulative rows, one extra row per group for values outside `states`. Row
+        # (group, state) lives at group * (n_states + 1) + state; column k holds the
+        # probability of moving to a state <= k, stored column-wise for 1-D lookups.
+        # The last column is always 1 and never needs to be compared against.
+        uniform = np.full((1, n_states), 1 / n_states)
+        cumulative = np.vstack([np.cumsum(np.vstack([m, uniform]), axis=1) for m in matrices])
+        self._thresholds = [np.ascontiguousarray(cumulative[:, k]) for k in range(n_states - 1)]
+        self._stride = n_states + 1
+
+        codes = {state: code for code, state in enumerate(self.states)}
+        group_codes = {group: code for code, group in enumerate(groups)}
+        n_records = len(records)
+        self.keys = np.array([record[key] for record in records], dtype=object) if key else np.arange(n_records)
+        self.state = np.fromiter((codes.get(record.get(field), n_states) for record in records), dtype=np.intp, count=n_records)
+        self.group = np.fromiter(
+            (group_codes.get(record.get(group_field), len(groups)) if group_field else len(groups) for record in records),
+            dtype=np.intp, count=n_records,
+        )
+        self.timestamps = np.full(n_records, None, dtype=object)  # last tick time of each changed record
+
+    def __len__(self):
+        return len(self.keys)
+
+    def step(self):
+        """
+        Advance every record by one tick without building a Delta.
+
+        Returns:
+            np.ndarray: Row positions of the records whose state changed.
+        """
+        draws = self.rng.random(len(self.state))
+        rows = self.group * self._stride + self.state
+        # Next state = number of cumulative thresholds the draw reached
+        new_state = np.zeros(len(draws), dtype=np.intp)
+        for thresholds in self._thresholds:
+            new_state += draws >= thresholds[rows]
+        changed = np.flatnonzero(new_state != self.state)
+        self.state = new_state
+        self.ticks += 1
+        return changed
+
+    @timed("simulate_tick")
+    def tick(self):
+        """
+        Advance every record by one tick.
+
+        Returns:
+            Delta: The records whose state changed in this tick.
+        """
+        rows = self.step()
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        if self.timestamp_field:
+            self.timestamps[rows] = timestamp
+        states = self.states
+        return Delta(self.ticks, rows, self.keys[rows].tolist(), [states[code] for code in self.state[rows]], timestamp)
+
+    def run(self, n_ticks):
+        """
+        Advance by `n_ticks` ticks as fast as possible, e.g. for stress tests.
+
+        Returns:
+            int: Total number of state changes.
+        """
+        return sum(len(self.step()) for _ in range(n_ticks))
+
+    def value(self, row):
+        """Return the current simulated value of a record (its original one if never changed)."""
+        code = self.state[row]
+        return self.states[code] if code < len(self.states) else self.records[row].get(self.field)
+
+    def record(self, row):
+        """
+        Return a new dict holding the current simulated version of a record.
+
+        Args:
+            row (int): Row position of the record.
+
+        Returns:
+            dict: The original record with the simulated field (and timestamp) applied.
+        """
+        record = dict(self.records[row])
+        record[self.field] = self.value(row)
+        if self.timestamp_field and self.timestamps[row] is not None and self.timestamp_field in record:
+            record[self.timestamp_field] = self.timestamps[row]
+        return record
+
+    def changed_records(self, delta):
+        """Return the current versions of the records changed in a Delta."""
+        return [self.record(row) for row in delta.rows]
+
+    def current_records(self):
+        """Return new dicts for all records with the simulated values applied."""
+        return [self.record(row) for row in range(len(self.keys))]
@@ -0,0 +1,455 @@
+"""
+Snapshot broker for running the dashboard as several Streamlit processes.
+
+One ingestion process owns the files under shared_data/: it polls them, parses
+and validates every new version once, and publishes it under a version number.
+Streamlit worker processes subscribe read-only over a local socket and only
+fetch a dataset when its version moved, so N workers cost one parse of each
+file version in the broker plus one decode per worker, instead of every session
+stat()ing and re-reading the files itself.
+
+    # ingestion process
+    python -m utils.snapshot_broker --address shared_data/broker.sock
+    # any number of workers behind a load balancer
+    DASHBOARD_BROKER=shared_data/broker.sock streamlit run app.py --server.port 8501
+
+LocalBroker is the broker itself and can be used in-process (tests, a single
+server); BrokerServer exposes it on a Unix socket (or host:port) and
+BrokerClient is the remote stand-in with the same versions/fetch methods.
+
+multiprocessing.connection unpickles what it receives, so the socket is never
+served without authentication: the shared secret comes from
+DASHBOARD_BROKER_AUTHKEY or from a key file readable only by its owner
+(shared_data/broker.key by default, created by the broker on first start).
+Workers running as another user must be given the secret through the variable.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import secrets
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from utils.json_codec import DecodeError, loads
+from utils.snapshot_store import file_signature, freeze
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = {"agents": "shared_data/agents.json", "patients": "shared_data/patient.json"}
+DEFAULT_KEY_FILE = "shared_data/broker.key"
+# Published for files that do not exist (yet)
+EMPTY = b"[]"
+
+
+def parse_address(address):
+    """
+    Return (address, family) for a Unix socket path or a "host:port" string.
+
+    Args:
+        address (str): Socket path, or host:port for platforms without Unix sockets.
+
+    Returns:
+        tuple: Address in the form multiprocessing.connection expects, and its family.
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in address:
+        return (host or "127.0.0.1", int(port)), "AF_INET"
+    return address, "AF_UNIX"
+
+
+def load_authkey(key_file=None, create=False):
+    """
+    Return the broker's shared secret.
+
+    DASHBOARD_BROKER_AUTHKEY wins; otherwise the secret is read from the key
+    file (DASHBOARD_BROKER_KEYFILE or shared_data/broker.key). With `create`,
+    a missing key file is generated with a random secret and mode 0600.
+
+    Args:
+        key_file (str, optional): Path of the key file.
+        create (bool): Generate the key file if it does not exist.
+
+    Returns:
+        bytes: The secret.
+
+    Raises:
+        RuntimeError: If no secret is configured (and none may be created).
+    """
+    authkey = os.environ.get("DASHBOARD_BROKER_AUTHKEY")
+    if authkey:
+        return authkey.encode()
+    key_file = key_file or os.environ.get("DASHBOARD_BROKER_KEYFILE") or DEFAULT_KEY_FILE
+    if create:
+        try:
+            fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+    try:
+        with open(key_file) as f:
+            authkey = f.read().strip()
+    except FileNotFoundError:
+        authkey = ""
+    if not authkey:
+        raise RuntimeError(
+            f"No snapshot broker secret: set DASHBOARD_BROKER_AUTHKEY or provide the key file {key_file}"
+        )
+    return authkey.encode()
+
+
+def _require_authkey(authkey):
+    # Connections unpickle what they receive; an unauthenticated socket would run anyone's code
+    if not authkey:
+        raise ValueError("The snapshot broker requires an authkey")
+    return authkey
+
+
+class LocalBroker:
+    """
+    Polls a set of JSON files and publishes every new, valid version.
+
+    A version is published when a file's content changed (same bytes under a new
+    mtime do not count) and it parses; a half-written file keeps the previous
+    version published. Subscribers ask for the current versions and fetch the raw
+    bytes of the datasets that moved.
+
+    Args:
+        paths (dict): Mapping of dataset name to JSON file path.
+    """
+
+    def __init__(self, paths=None):
+        self.paths = dict(paths or DEFAULT_PATHS)
+        self.version = 0
+        self.polls = 0
+        self._signatures = {}
+        self._published = {}  # dataset -> (version, digest, raw bytes)
+        self._poll_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _read(self, name, path):
+        signature = file_signature(path)
+        if signature is not None and signature == self._signatures.get(name):
+            return None
+        if signature is None:
+            raw = EMPTY
+        else:
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+            except FileNotFoundError:
+                raw = EMPTY
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        published = self._published.get(name)
+        if published is not None and published[1] == digest:
+            self._signatures[name] = signature
+            return None
+        try:
+            loads(raw)
+        except DecodeError:
+            return None  # caught a writer mid-way; retried on the next poll
+        self._signatures[name] = signature
+        return digest, raw
+
+    def poll(self):
+        """
+        Publish the datasets whose files changed since the last poll.
+
+        Returns:
+            list: Names of the datasets that got a new version.
+        """
+        with self._poll_lock:
+            # File I/O happens outside the state lock so subscribers are never blocked by it
+            updates = {name: self._read(name, path) for name, path in self.paths.items()}
+            with self._lock:
+                self.polls += 1
+                changed = [name for name, update in updates.items() if update is not None]
+                if changed:
+                    self.version += 1
+                    for name in changed:
+                        digest, raw = updates[name]
+                        self._published[name] = (self.version, digest, raw)
+                return changed
+
+    def versions(self):
+        """Return the published version of every dataset (0 until its first poll)."""
+        with self._lock:
+            return {name: self._published.get(name, (0,))[0] for name in self.paths}
+
+    def fetch(self, name):
+        """
+        Return the published content of a dataset.
+
+        Returns:
+            tuple: (version, raw JSON bytes).
+        """
+        with self._lock:
+            version, _, raw = self._published.get(name, (0, None, EMPTY))
+            return version, raw
+
+    def stats(self):
+        """Return the broker's counters."""
+        with self._lock:
+            return {
+                "version": self.version,
+                "polls": self.polls,
+                "datasets": {name: {"version": v, "nbytes": len(raw)} for name, (v, _, raw) in self._published.items()},
+            }
+
+
+class BrokerServer:
+    """
+    Serves a LocalBroker to other processes and polls it in the background.
+
+    Every subscriber connection gets its own thread; requests are (method, *args)
+    tuples for the broker's versions, fetch and stats methods. A malformed
+    request is answered with an error and the connection is closed.
+
+    Args:
+        broker (LocalBroker): The broker to serve.
+        address (str): Unix socket path, or host:port.
+        interval (float): Seconds between two polls of the files.
+        authkey (bytes): Shared secret subscribers must present (required).
+    """
+
+    METHODS = ("versions", "fetch", "stats")
+
+    def __init__(self, broker, address, authkey, interval=2.0):
+        self.broker = broker
+        self.address, self.family = parse_address(address)
+        self.interval = interval
+        self.authkey = _require_authkey(authkey)
+        self.connections = 0
+        self._listener = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Poll once, start listening and start the polling thread."""
+        if self.family == "AF_UNIX" and os.path.exists(self.address):
+            os.unlink(self.address)  # left behind by a previous broker
+        self.broker.poll()
+        self._listener = Listener(self.address, family=self.family, authkey=self.authkey)
+        if self.family == "AF_UNIX":
+            os.chmod(self.address, 0o600)
+        threading.Thread(target=self._poll_loop, name="broker-poll", daemon=True).start()
+        threading.Thread(target=self._accept_loop, name="broker-accept", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop polling and accepting subscribers."""
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+
+    def serve_forever(self):
+        """Run until interrupted (Ctrl+C)."""
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.broker.poll()
+            except Exception:
+                logger.exception("Polling the data files failed")
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn = self._listener.accept()
+            except (AuthenticationError, EOFError):
+                logger.warning("Rejected a subscriber that failed authentication")
+                continue
+            except OSError:
+                if self._stop.is_set():
+                    return
+                logger.exception("Accepting a subscriber failed")
+                continue
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), name="broker-conn", daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while not self._stop.is_set():
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    logger.warning("Dropping a subscriber after an undecodable request: %s", e)
+                    return
+                try:
+                    method, *args = request
+                    if method not in self.METHODS:
+                        raise ValueError(f"Unknown broker method: {method!r}")
+                    result = getattr(self.broker, method)(*args)
+                except Exception as e:
+                    # Malformed request: report it and drop the connection
+                    logger.warning("Dropping a subscriber after a bad request: %s", e)
+                    try:
+                        conn.send(ValueError(f"Bad broker request: {e}"))
+                    except (EOFError, OSError):
+                        pass
+                    return
+                try:
+                    conn.send(result)
+                except (EOFError, OSError):
+                    return
+
+
+class BrokerClient:
+    """
+    Read-only subscriber of a BrokerServer, with the methods of LocalBroker.
+
+    Connections are not thread-safe, so every thread uses its own; a lost
+    connection is re-opened on the next call.
+
+    Args:
+        address (str): Unix socket path, or host:port.
+        authkey (bytes): Shared secret of the server (required).
+    """
+
+    def __init__(self, address, authkey):
+        self.address, self.family = parse_address(address)
+        self.authkey = _require_authkey(authkey)
+        self._local = threading.local()
+
+    def _call(self, method, *args):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, family=self.family, authkey=self.authkey)
+        try:
+            conn.send((method, *args))
+            result = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            conn.close()
+            raise ConnectionError(f"Lost the connection to the snapshot broker at {self.address}")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def versions(self):
+        return self._call("versions")
+
+    def fetch(self, name):
+        return self._call("fetch", name)
+
+    def stats(self):
+        return self._call("stats")
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+
+class BrokerDataSource:
+    """
+    Drop-in replacement for DataSource that reads from a snapshot broker.
+
+    poll() costs one round trip while nothing changed; a dataset whose version
+    moved is fetched and decoded once per process and then shared, frozen, by
+    every session of that process.
+
+    Args:
+        broker (LocalBroker or BrokerClient): Where the snapshots come from.
+        names (iterable): Datasets to subscribe to.
+    """
+
+    def __init__(self, broker, names):
+        self.broker = broker
+        self.names = tuple(names)
+        self.version = 0
+        self.fetches = 0
+        self._versions = {}
+        self._data = {name: freeze([]) for name in self.names}
+        self._polled = False
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """
+        Fetch the datasets whose published version moved.
+
+        Returns:
+            list: Names of the datasets whose content changed.
+        """
+        published = self.broker.versions()
+        stale = [name for name in self.names if published.get(name) != self._versions.get(name)]
+        # Fetch and decode outside the lock; sessions keep reading the previous data meanwhile
+        fetched = {}
+        for name in stale:
+            version, raw = self.broker.fetch(name)
+            fetched[name] = (version, freeze(loads(raw)))
+        with self._lock:
+            self._polled = True
+            for name, (version, data) in fetched.items():
+                self._versions[name] = version
+                self._data[name] = data
+            self.fetches += len(fetched)
+            if fetched:
+                self.version += 1
+            return list(fetched)
+
+    def snapshot(self):
+        """
+        Return the current version and parsed content of every dataset.
+
+        Returns:
+            tuple: (version, dict of dataset name to frozen parsed data).
+        """
+        if not self._polled:
+            self.poll()
+        with self._lock:
+            return self.version, dict(self._data)
+
+
+def get_broker_source(names, address=None):
+    """
+    Return a BrokerDataSource when a broker is configured.
+
+    Args:
+        names (iterable): Datasets to subscribe to.
+        address (str, optional): Broker address; DASHBOARD_BROKER by default.
+
+    Returns:
+        BrokerDataSource: The subscriber, or None if no broker is configured.
+
+    Raises:
+        RuntimeError: If a broker is configured but its secret is not available.
+    """
+    address = address or os.environ.get("DASHBOARD_BROKER")
+    if not address:
+        return None
+    return BrokerDataSource(BrokerClient(address, load_authkey()), names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the dashboard's snapshot broker (ingestion process).")
+    parser.add_argument("--address", default="shared_data/broker.sock", help="Unix socket path or host:port")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between two polls of the files")
+    parser.add_argument("--agents", default=DEFAULT_PATHS["agents"])
+    parser.add_argument("--patients", default=DEFAULT_PATHS["patients"])
+    parser.add_argument("--key-file", help="Secret file, created if missing (DASHBOARD_BROKER_AUTHKEY takes precedence)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    authkey = load_authkey(args.key_file, create=True)
+    broker = LocalBroker({"agents": args.agents, "patients": args.patients})
+    logger.info("Serving snapshots of %s on %s", ", ".join(broker.paths.values()), args.address)
+    BrokerServer(broker, args.address, authkey, args.interval).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
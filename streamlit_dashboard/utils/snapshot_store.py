@@ -0,0 +1,298 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+
+from utils.instrumentation import count, stage
+from utils.json_codec import DecodeError, loads
+
+# Identity of a file on disk: a change in any of these means it may have been rewritten
+FileSignature = namedtuple("FileSignature", ["inode", "size", "mtime_ns"])
+# Parsed JSON types that freeze() converts; JSON decoders only produce exact dicts and lists
+_CONTAINERS = (dict, list)
+
+
+def file_signature(path):
+    """
+    Return the stat signature of a file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        FileSignature or None: (inode, size, mtime_ns) of the file, or None if it does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return FileSignature(st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def freeze(obj):
+    """
+    Convert parsed JSON into an immutable structure.
+
+    Dictionaries become read-only mapping proxies and lists become tuples, so a
+    single parsed copy can be handed to every session without defensive copies.
+
+    Args:
+        obj: Parsed JSON value.
+
+    Returns:
+        The same value built from immutable containers.
+    """
+    if isinstance(obj, dict):
+        # Scalars are kept without a call per value; flat records are the common case
+        return MappingProxyType({
+            key: freeze(value) if type(value) in _CONTAINERS else value for key, value in obj.items()
+        })
+    if isinstance(obj, list):
+        return tuple([freeze(value) if type(value) in _CONTAINERS else value for value in obj])
+    return obj
+
+
+def thaw(obj):
+    """
+    Convert a frozen structure back into plain, mutable dicts and lists.
+
+    Args:
+        obj: Value returned by freeze().
+
+    Returns:
+        A mutable deep copy of the value.
+    """
+    if isinstance(obj, MappingProxyType):
+        return {key: thaw(value) for key, value in obj.items()}
+    if isinstance(obj, tuple):
+        return [thaw(value) for value in obj]
+    return obj
+
+
+def deep_sizeof(obj):
+    """
+    Estimate the memory footprint of a (frozen) JSON structure in bytes.
+
+    Args:
+        obj: Parsed or frozen JSON value.
+
+    Returns:
+        int: Approximate number of bytes held by the value and its children.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (dict, MappingProxyType)):
+        if isinstance(obj, MappingProxyType):
+            # The proxy wraps a private dict that holds the actual entries
+            size += sys.getsizeof(dict(obj))
+        for key, value in obj.items():
+            size += deep_sizeof(key) + deep_sizeof(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            size += deep_sizeof(value)
+    return size
+
+
+def estimate_sizeof(obj, sample=64):
+    """
+    Estimate the memory footprint of a (frozen) JSON structure from a sample.
+
+    A top-level list of records is measured on `sample` evenly spaced records and
+    scaled to its length, so the cost does not grow with the number of records.
+    Anything smaller is measured completely with deep_sizeof().
+
+    Args:
+        obj: Parsed or frozen JSON value.
+        sample (int): Number of records to measure.
+
+    Returns:
+        int: Approximate number of bytes held by the value and its children.
+    """
+    if not isinstance(obj, (list, tuple)) or len(obj) <= sample:
+        return deep_sizeof(obj)
+    step = len(obj) / sample
+    measured = sum(deep_sizeof(obj[int(i * step)]) for i in range(sample))
+    return sys.getsizeof(obj) + measured * len(obj) // sample
+
+
+class Snapshot:
+    """
+    An immutable, versioned view of one file's parsed content.
+
+    Attributes:
+        path: File the snapshot was parsed from.
+        version: Per-file version number, increased each time the content changes.
+        signature: FileSignature of the file when it was parsed.
+        digest: Hash of the raw file content.
+        data: Frozen parsed content (tuples and read-only mappings).
+        nbytes: Approximate memory footprint of `data`, estimated on first access.
+        refcount: Number of holders that pinned the snapshot against eviction.
+    """
+
+    __slots__ = ("path", "version", "signature", "digest", "data", "_nbytes", "refcount")
+
+    def __init__(self, path, version, signature, digest, data):
+        self.path = path
+        self.version = version
+        self.signature = signature
+        self.digest = digest
+        self.data = data
+        self._nbytes = None
+        self.refcount = 0
+
+    @property
+    def nbytes(self):
+        # Only measured when stats are asked for, never on the load path
+        if self._nbytes is None:
+            self._nbytes = estimate_sizeof(self.data)
+        return self._nbytes
+
+    def thaw(self):
+        """Return a mutable deep copy of the snapshot data."""
+        return thaw(self.data)
+
+    def __repr__(self):
+        return f"Snapshot({self.path!r}, version={self.version}, nbytes={self.nbytes})"
+
+
+class SnapshotStore:
+    """
+    Process-wide cache of parsed JSON files shared by all Streamlit sessions.
+
+    Each file version (identified by its stat signature) is parsed once. A file that
+    was rewritten with identical content keeps its current snapshot. Old versions are
+    evicted least-recently-used first once more than `max_versions` are cached, but
+    snapshots pinned with acquire() are never evicted until released.
+
+    Args:
+        max_versions (int): Number of file versions to keep across all paths.
+    """
+
+    def __init__(self, max_versions=16):
+        self.max_versions = max_versions
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (path, signature) -> Snapshot
+        self._latest = {}              # path -> most recent Snapshot
+        self._current = {}             # path -> cache key of the file as last seen on disk
+        self._lock = threading.Lock()
+
+    def get(self, path, default=()):
+        """
+        Return the snapshot for the current version of a file.
+
+        Args:
+            path (str): Path to the JSON file.
+            default: Value to expose when the file is missing.
+
+        Returns:
+            Snapshot: Shared snapshot of the file content.
+        """
+        signature = file_signature(path)
+        with self._lock:
+            if signature is None:
+                return Snapshot(path, 0, None, None, freeze(default))
+
+            key = (path, signature)
+            snapshot = self._entries.get(key)
+            if snapshot is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                self._current[path] = key
+                return snapshot
+
+        # Read and parse outside the lock so slow I/O does not block other sessions
+        with stage("read_file"), open(path, "rb") as f:
+            raw = f.read()
+        count("read_file", bytes_read=len(raw))
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+
+        with self._lock:
+            latest = self._latest.get(path)
+            if latest is not None and latest.digest == digest:
+                # Touched or rewritten with identical content: keep the current version
+                self.hits += 1
+                self._entries[key] = latest
+                self._current[path] = key
+                self._evict()
+                return latest
+
+            try:
+                with stage("parse_json"):
+                    data = loads(raw)
+            except DecodeError:
+                # Caught a writer mid-way: serve the last good version if there is one
+                if latest is not None:
+                    return latest
+                return Snapshot(path, 0, None, None, freeze(default))
+
+            self.misses += 1
+            version = latest.version + 1 if latest is not None else 1
+            snapshot = Snapshot(path, version, signature, digest, freeze(data))
+            self._entries[key] = snapshot
+            self._latest[path] = snapshot
+            self._current[path] = key
+            self._evict()
+            return snapshot
+
+    def acquire(self, snapshot):
+        """Pin a snapshot so it is not evicted while still in use."""
+        with self._lock:
+            snapshot.refcount += 1
+        return snapshot
+
+    def release(self, snapshot):
+        """Release a snapshot pinned with acquire()."""
+        with self._lock:
+            snapshot.refcount = max(0, snapshot.refcount - 1)
+            self._evict()
+
+    def _evict(self):
+        # Drop least-recently-used, unpinned entries until within budget
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_versions:
+                break
+            snapshot = self._entries[key]
+            if snapshot.refcount > 0 or self._current.get(snapshot.path) == key:
+                continue
+            del self._entries[key]
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Report cache counters and memory footprint.
+
+        Returns:
+            dict: hits, misses, evictions, number of cached entries and distinct
+            snapshots, and their estimated total size in bytes.
+        """
+        with self._lock:
+            unique = {id(s): s for s in self._entries.values()}
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "snapshots": len(unique),
+                "nbytes": sum(s.nbytes for s in unique.values()),
+            }
+
+
+# Single store shared by every session running in this process
+SNAPSHOTS = SnapshotStore()
+
+
+def get_snapshot(path, default=()):
+    """
+    Return the shared snapshot of a JSON file.
+
+    Args:
+        path (str): Path to the JSON file.
+        default: Value to expose when the file is missing.
+
+    Returns:
+        Snapshot: Shared, immutable snapshot of the file.
+    """
+    return SNAPSHOTS.get(path, default=default)